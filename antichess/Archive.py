@@ -0,0 +1,186 @@
+# Binary archive of games, written a game at a time and read through mmap.
+#
+# Layout (little-endian):
+#   header: magic, version, number of games, offset of the index
+#   games:  plies (2 bytes), result (1 byte: 0 Black won, 1 drawn, 2 White
+#           won), FEN length (1 byte, 0 for the starting position), the FEN,
+#           then one 16-bit move per ply (packed move without flags)
+#   index:  8 byte offset of each game
+#
+# The index and header are written by close(). An archive which was never
+# closed is still readable: its games are found by scanning the file.
+#
+# python -m antichess.Archive games.bin
+# python -m antichess.Archive games.bin --from-text games.txt
+# python -m antichess.Archive games.bin --to-text games.txt
+
+import array
+import mmap
+import os
+import struct
+import sys
+from optparse import OptionParser
+
+import Board
+import Move
+
+MAGIC = "ACGA"
+VERSION = 1
+# Magic, version, games, index offset
+HEADER = struct.Struct("<4sBxxxQQ")
+# Plies, result, FEN length
+GAME = struct.Struct("<HBB")
+OFFSET = struct.Struct("<Q")
+# Most plies in one game
+MAX_PLIES = (1 << 16) - 1
+
+class ArchiveError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+class ArchiveWriter:
+    """Writes games to a new archive file."""
+    def __init__(self, filename):
+        self.filename = filename
+        self.f = open(filename, "wb")
+        self.f.write(HEADER.pack(MAGIC, VERSION, 0, 0))
+        self.offsets = array.array('L')
+        self.offset = HEADER.size
+
+    def addGame(self, codes, score, fen=None):
+        """Add a game of packed moves from fen (default the starting position);
+        score is White's (1, 0.5 or 0)."""
+        if len(codes) > MAX_PLIES:
+            raise ArchiveError("Game too long: %d plies" % len(codes))
+        if fen is None or fen==Board.START_FEN:
+            fen = ""
+        if len(fen) > 255:
+            raise ArchiveError("FEN too long: " + fen)
+        moves = array.array('H', [code & Move.MOVE_MASK for code in codes])
+        if sys.byteorder=="big":
+            moves.byteswap()
+        self.offsets.append(self.offset)
+        record = GAME.pack(len(codes), int(2*score), len(fen)) + fen + moves.tostring()
+        self.f.write(record)
+        self.offset += len(record)
+
+    def close(self):
+        """Write the index and header, and close the file."""
+        for offset in self.offsets:
+            self.f.write(OFFSET.pack(offset))
+        self.f.seek(0)
+        self.f.write(HEADER.pack(MAGIC, VERSION, len(self.offsets), self.offset))
+        self.f.close()
+
+class ArchiveReader:
+    """Random access to the games in an archive file, read through mmap."""
+    def __init__(self, filename):
+        self.filename = filename
+        f = open(filename, "rb")
+        try:
+            if os.path.getsize(filename) < HEADER.size:
+                raise ArchiveError("Not an archive: " + filename)
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        magic, version, self.size, self.indexOffset = HEADER.unpack_from(self.data, 0)
+        if not magic==MAGIC or not version==VERSION:
+            raise ArchiveError("Not an archive: " + filename)
+        self.offsets = None
+        if self.indexOffset==0:
+            # Never closed: find the games
+            self.offsets = list(self.scan())
+            self.size = len(self.offsets)
+        elif not len(self.data)==self.indexOffset + self.size * OFFSET.size:
+            raise ArchiveError("Bad archive: " + filename)
+
+    def scan(self):
+        # Offsets of the complete games, in order
+        offset = HEADER.size
+        stop = self.indexOffset or len(self.data)
+        while offset + GAME.size <= stop:
+            plies, result, fenLength = GAME.unpack_from(self.data, offset)
+            end = offset + GAME.size + fenLength + 2*plies
+            if end > stop:
+                break
+            yield offset
+            offset = end
+
+    def __len__(self):
+        return self.size
+
+    def offset(self, i):
+        if self.offsets is not None:
+            return self.offsets[i]
+        return OFFSET.unpack_from(self.data, self.indexOffset + i*OFFSET.size)[0]
+
+    def readGame(self, offset):
+        plies, result, fenLength = GAME.unpack_from(self.data, offset)
+        start = offset + GAME.size
+        fen = self.data[start:start + fenLength] or Board.START_FEN
+        moves = array.array('H', self.data[start + fenLength:start + fenLength + 2*plies])
+        if sys.byteorder=="big":
+            moves.byteswap()
+        return moves.tolist(), result / 2.0, fen
+
+    def __getitem__(self, i):
+        """(codes, score, fen) for game i: packed moves (without flags), White's score and the starting position."""
+        if i < 0:
+            i += self.size
+        if not 0 <= i < self.size:
+            raise IndexError("No game %d" % i)
+        return self.readGame(self.offset(i))
+
+    def __iter__(self):
+        # Games are stored in order, so no need for the index
+        for offset in self.scan():
+            yield self.readGame(offset)
+
+    def close(self):
+        self.data.close()
+
+def replay(codes, fen=Board.START_FEN, board=None):
+    """Board with the game played out."""
+    if board is None:
+        board = Board.Board()
+    board.setFEN(fen)
+    for code in codes:
+        board.makeMove(code)
+    return board
+
+def main():
+    parser = OptionParser(usage="python -m antichess.Archive [options] ARCHIVE")
+    parser.add_option("--from-text", dest="fromText", default=None,
+                      help="write the games in FILE (one per line, as for antichess.Book) to ARCHIVE", metavar="FILE")
+    parser.add_option("--to-text", dest="toText", default=None,
+                      help="write the games in ARCHIVE to FILE, one per line", metavar="FILE")
+    (options, args) = parser.parse_args()
+    if not len(args)==1:
+        parser.error("need an archive")
+    # Book reads archives, so imports this module
+    import Book
+
+    if options.fromText is not None:
+        writer = ArchiveWriter(args[0])
+        for codes, score in Book.readGames(options.fromText):
+            writer.addGame(codes, score)
+        writer.close()
+    reader = ArchiveReader(args[0])
+    if options.toText is not None:
+        f = open(options.toText, "w")
+        for codes, score, fen in reader:
+            # Text games start from the starting position
+            if fen==Board.START_FEN:
+                f.write(Book.formatGame(codes, score) + "\n")
+        f.close()
+    results = [0, 0, 0]
+    plies = 0
+    for codes, score, fen in reader:
+        results[int(2*score)] += 1
+        plies += len(codes)
+    print "%s: %d games, %d plies, White +%d =%d -%d" % (args[0], len(reader), plies, results[2], results[1], results[0])
+
+if __name__=="__main__":
+    main()
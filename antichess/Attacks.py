@@ -0,0 +1,59 @@
+# Move and attack tables, built once at import. Squares and bitboards use the
+# same indexing as Board.pieces (square = row*8 + col).
+
+import Bitboard
+
+# Directions as (row step, col step). Rook directions come first.
+DIRECTIONS = [(-1,0), (+1,0), (0,-1), (0,+1), (-1,-1), (-1,+1), (+1,-1), (+1,+1)]
+ROOK_DIRECTIONS = [0, 1, 2, 3]
+BISHOP_DIRECTIONS = [4, 5, 6, 7]
+QUEEN_DIRECTIONS = ROOK_DIRECTIONS + BISHOP_DIRECTIONS
+
+KNIGHT_STEPS = [(-2,-1), (-2,+1), (-1,-2), (-1,+2), (+1,-2), (+1,+2), (+2,-1), (+2,+1)]
+
+def onBoard(row, col):
+    return 0<=row<=7 and 0<=col<=7
+
+def stepTargets(square, steps):
+    r, c = square/8, square%8
+    return [(r+dr)*8 + c+dc for dr, dc in steps if onBoard(r+dr, c+dc)]
+
+def rayTargets(square, direction):
+    # Squares from square outwards in direction, nearest first
+    dr, dc = DIRECTIONS[direction]
+    r, c = square/8 + dr, square%8 + dc
+    ray = []
+    while onBoard(r, c):
+        ray.append(r*8 + c)
+        r, c = r+dr, c+dc
+    return ray
+
+def toMask(squares):
+    mask = 0
+    for sq in squares:
+        mask |= Bitboard.BIT[sq]
+    return mask
+
+# Target squares of a knight or king on each square, as lists and as masks
+KNIGHT_TARGETS = [stepTargets(sq, KNIGHT_STEPS) for sq in range(64)]
+KING_TARGETS = [stepTargets(sq, DIRECTIONS) for sq in range(64)]
+KNIGHT_ATTACKS = [toMask(targets) for targets in KNIGHT_TARGETS]
+KING_ATTACKS = [toMask(targets) for targets in KING_TARGETS]
+
+# RAYS[sq][direction]: squares from sq outwards, nearest first
+RAYS = [[rayTargets(sq, d) for d in range(8)] for sq in range(64)]
+RAY_MASKS = [[toMask(ray) for ray in RAYS[sq]] for sq in range(64)]
+
+# Every square a rook or bishop could reach from each square on an empty board
+ROOK_TARGETS = [sum([RAYS[sq][d] for d in ROOK_DIRECTIONS], []) for sq in range(64)]
+BISHOP_TARGETS = [sum([RAYS[sq][d] for d in BISHOP_DIRECTIONS], []) for sq in range(64)]
+
+def betweenMask(fr, to):
+    # Squares strictly between fr and to if they share a line, else 0
+    for ray in RAYS[fr]:
+        if to in ray:
+            return toMask(ray[:ray.index(to)])
+    return 0
+
+# BETWEEN[fr][to]
+BETWEEN = [[betweenMask(fr, to) for to in range(64)] for fr in range(64)]
@@ -0,0 +1,186 @@
+# Move counting and evaluation for many positions at once, with NumPy.
+#
+# A batch is three arrays: squares, (N, 64) int8 with kind+1 for White's
+# pieces and -(kind+1) for Black's (0 for empty), the side to move (N,), and
+# the file of a pawn which has just made a double push (N,), -1 if none. Work
+# is done from the side to move's point of view, with the board flipped when
+# Black is to move, so every step is an array operation over the whole batch.
+#
+# NumPy is optional: everything else works without it, and using this module
+# without it raises BatchError.
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import array
+
+import Board
+import Move
+import Pieces
+import Player
+
+INFINITY = Player.AIPlayer.INFINITY
+PROMOTIONS = len(Pieces.PROMOTIONS[0])
+KNIGHT_STEPS = [(-2,-1), (-2,+1), (-1,-2), (-1,+2), (+1,-2), (+1,+2), (+2,-1), (+2,+1)]
+ROOK_STEPS = [(-1,0), (+1,0), (0,-1), (0,+1)]
+BISHOP_STEPS = [(-1,-1), (-1,+1), (+1,-1), (+1,+1)]
+
+class BatchError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def available():
+    return numpy is not None
+
+def requireNumpy():
+    if numpy is None:
+        raise BatchError("NumPy is needed for batch evaluation")
+
+def pack(boards):
+    """(squares, sides, enpassant) arrays for a list of Boards."""
+    requireNumpy()
+    rows = []
+    sides = []
+    enpassant = []
+    for board in boards:
+        row = [0] * 64
+        for colour, sign in [(0, 1), (1, -1)]:
+            for sq in board.pieceSquares[colour]:
+                row[sq] = sign * (board.pieces[sq].kind + 1)
+        rows.append(row)
+        sides.append(board.sideToMove)
+        if board.enpassant is not None:
+            enpassant.append(board.enpassant % 8)
+        else:
+            enpassant.append(-1)
+    squares = numpy.array(rows, dtype=numpy.int8).reshape(len(boards), 64)
+    return squares, numpy.array(sides, dtype=numpy.int8), numpy.array(enpassant, dtype=numpy.int8)
+
+# Rows of FEN piece placement already seen, as 8 signed piece codes
+FEN_ROWS = {}
+
+def packFENs(source):
+    """(squares, sides, enpassant) arrays for the FEN lines of source (see
+    Board.fenLines), without setting up Boards."""
+    requireNumpy()
+    squares = array.array('b')
+    sides = array.array('b')
+    enpassant = array.array('b')
+    lines = Board.fenLines(source)
+    try:
+        for fen in lines:
+            fields = fen.split()
+            rows = fields[0].split("/")
+            if len(fields)<2 or not len(rows)==8 or not fields[1] in ["w", "b"]:
+                raise Board.FENError("Bad FEN: " + fen)
+            for text in rows:
+                codes = FEN_ROWS.get(text)
+                if codes is None:
+                    if len(FEN_ROWS)>=Board.FEN_ROWS_LIMIT:
+                        FEN_ROWS.clear()
+                    codes = [0 if p is None else (1 - 2*p.colour) * (p.kind + 1) for p in Board.parseFENRow(text, fen)]
+                    FEN_ROWS[text] = codes
+                squares.extend(codes)
+            sides.append(fields[1]=="b")
+            if len(fields)>3 and fields[3] in Move.SQUARES:
+                enpassant.append(Move.SQUARES[fields[3]] % 8)
+            else:
+                enpassant.append(-1)
+    finally:
+        lines.close()
+    return (numpy.frombuffer(squares, dtype=numpy.int8).reshape(-1, 64).copy(),
+            numpy.frombuffer(sides, dtype=numpy.int8).copy(), numpy.frombuffer(enpassant, dtype=numpy.int8).copy())
+
+def shift(a, dr, dc):
+    # Move every square of a (N, 8, 8) by dr rows and dc columns, dropping what falls off
+    out = numpy.zeros_like(a)
+    out[:, max(dr,0):8+min(dr,0), max(dc,0):8+min(dc,0)] = a[:, max(-dr,0):8+min(-dr,0), max(-dc,0):8+min(-dc,0)]
+    return out
+
+def relative(squares, sides):
+    # (N, 8, 8) boards with the side to move's pieces positive, moving up the board
+    boards = squares.reshape(-1, 8, 8).astype(numpy.int8)
+    black = sides==1
+    boards[black] = -boards[black][:, ::-1, :]
+    return boards
+
+def countMoves(squares, sides, enpassant):
+    """(moves, captures, own, theirs) arrays: the number of legal moves and
+    of captures for the side to move (moves equals captures when there are
+    any, as they are compulsory), and the numbers of pieces of each side."""
+    requireNumpy()
+    boards = relative(squares, sides)
+    own = boards > 0
+    theirs = boards < 0
+    empty = boards==0
+    notOwn = ~own
+    # Moves to each square, summed once at the end (at most 5 per piece)
+    counts = numpy.zeros(boards.shape, dtype=numpy.int8)
+
+    def count(targets, weight=1):
+        if weight==1:
+            counts[:] += targets
+        else:
+            counts[:] += targets.astype(numpy.int8) * weight
+
+    def piece(kind):
+        return boards==kind+1
+
+    # Knights and kings: one step
+    for kind, steps in [(Pieces.KNIGHT, KNIGHT_STEPS), (Pieces.KING, ROOK_STEPS + BISHOP_STEPS)]:
+        pieces = piece(kind)
+        for dr, dc in steps:
+            count(shift(pieces, dr, dc) & notOwn)
+    # Sliders: step along each direction through empty squares
+    queens = piece(Pieces.QUEEN)
+    for kind, steps in [(Pieces.ROOK, ROOK_STEPS), (Pieces.BISHOP, BISHOP_STEPS)]:
+        sliders = piece(kind) | queens
+        for dr, dc in steps:
+            frontier = sliders
+            for distance in range(7):
+                frontier = shift(frontier, dr, dc)
+                count(frontier & notOwn)
+                frontier &= empty
+                if not frontier.any():
+                    break
+    # Pawns move up; each move to the last row is one move per promotion piece
+    pawns = piece(Pieces.PAWN)
+    lastRow = numpy.zeros((1, 8, 8), dtype=bool)
+    lastRow[:, 0, :] = True
+    for targets in [shift(pawns, -1, 0) & empty, shift(pawns, -1, -1) & theirs, shift(pawns, -1, +1) & theirs]:
+        count(targets)
+        count(targets & lastRow, PROMOTIONS - 1)
+    startRow = numpy.zeros((1, 8, 8), dtype=bool)
+    startRow[:, 6, :] = True
+    count(shift(shift(pawns & startRow, -1, 0) & empty, -1, 0) & empty)
+    # En passant: a pawn beside the one which pushed, on the fourth row from the top
+    total = counts.sum(axis=(1, 2))
+    captures = (counts * theirs).sum(axis=(1, 2))
+    index = numpy.nonzero(enpassant >= 0)[0]
+    col = enpassant[index].astype(numpy.int64)
+    for dc in [-1, +1]:
+        beside = col + dc
+        valid = (beside >= 0) & (beside <= 7)
+        rows, cols = index[valid], beside[valid]
+        hits = (pawns[rows, 3, cols] & (boards[rows, 3, col[valid]]==-(Pieces.PAWN+1))).astype(numpy.int64)
+        numpy.add.at(total, rows, hits)
+        numpy.add.at(captures, rows, hits)
+
+    moves = numpy.where(captures > 0, captures, total)
+    return moves, captures, own.sum(axis=(1, 2)), theirs.sum(axis=(1, 2))
+
+def evaluate(squares, sides, enpassant):
+    """AIPlayer.heuristic for the side to move in every position of the batch."""
+    return score(*countMoves(squares, sides, enpassant))
+
+def score(moves, captures, own, theirs):
+    """AIPlayer.heuristic from the arrays returned by countMoves."""
+    freedom = numpy.where(captures==0, 3, numpy.where(captures==1, -3, 0))
+    score = theirs - own + freedom
+    score = numpy.where(moves==0, INFINITY, score)
+    score = numpy.where(theirs==0, -INFINITY, score)
+    return numpy.where(own==0, INFINITY, score)
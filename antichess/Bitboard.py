@@ -0,0 +1,29 @@
+# 64-bit occupancy masks. Bit n corresponds to board square n = row*8 + col,
+# so bit 0 is a8 and bit 63 is h1 (same indexing as Board.pieces).
+
+BIT = [1 << sq for sq in range(64)]
+FULL = (1 << 64) - 1
+
+def popcount(bb):
+    """Number of set bits in bb."""
+    return bin(bb).count("1")
+
+def lsb(bb):
+    """Index of the lowest set bit in bb (bb must be non-zero)."""
+    return (bb & -bb).bit_length() - 1
+
+def squares(bb):
+    """Iterate over the indices of the set bits in bb, lowest first."""
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+def toList(bb):
+    """Indices of the set bits in bb, lowest first."""
+    result = []
+    while bb:
+        low = bb & -bb
+        result.append(low.bit_length() - 1)
+        bb ^= low
+    return result
@@ -1,62 +1,235 @@
 import Pieces
 import Rules
 import Move
+import Bitboard
+import Attacks
+import Zobrist
 import sys
 
-class Board:
-	pieces = []
+class HashError(Exception):
+	def __init__(self, value):
+		self.value = value
+	def __str__(self):
+		return repr(self.value)
+
+class FENError(Exception):
+	def __init__(self, value):
+		self.value = value
+	def __str__(self):
+		return repr(self.value)
+
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"
+# FEN letters indexed by piece kind, and piece kinds by lowercase letter
+FEN_LETTERS = "pnbrqk"
+FEN_PIECES = dict(p=Pieces.PAWN, n=Pieces.KNIGHT, b=Pieces.BISHOP, r=Pieces.ROOK, q=Pieces.QUEEN, k=Pieces.KING)
+# Rows of FEN piece placement already seen, each as a list of 8 pieces or None
+# (forgotten once there are FEN_ROWS_LIMIT of them)
+FEN_ROWS = {}
+FEN_ROWS_LIMIT = 100000
+# Piece kinds along the back rank, from the a-file
+BACK_RANK = [Pieces.ROOK, Pieces.KNIGHT, Pieces.BISHOP, Pieces.QUEEN, Pieces.KING, Pieces.BISHOP, Pieces.KNIGHT, Pieces.ROOK]
+
+class Board(object):
 	WHITE = 0
 	BLACK = 1
-	movesMade = []
-        doublePawnPush = []
-        madeEnPassant = []
-	def __init__(self, textmode=False):
+	def __init__(self, textmode=False, verifyHash=False):
                 self.textmode = textmode
-		self.pieces.append(Pieces.Rook(self.BLACK))
-		self.pieces.append(Pieces.Knight(self.BLACK))
-		self.pieces.append(Pieces.Bishop(self.BLACK))
-		self.pieces.append(Pieces.Queen(self.BLACK))
-		self.pieces.append(Pieces.King(self.BLACK))
-		self.pieces.append(Pieces.Bishop(self.BLACK))
-		self.pieces.append(Pieces.Knight(self.BLACK))
-		self.pieces.append(Pieces.Rook(self.BLACK))
-
-		for i in range(9,17):
-			self.pieces.append(Pieces.Pawn(self.BLACK))
-
-		for i in range(17, 65-16):
-			self.pieces.append(None)
-
-		for i in range(65-16,65-8):
-			self.pieces.append(Pieces.Pawn(self.WHITE))
-
-		self.pieces.append(Pieces.Rook(self.WHITE))
-		self.pieces.append(Pieces.Knight(self.WHITE))
-		self.pieces.append(Pieces.Bishop(self.WHITE))
-		self.pieces.append(Pieces.Queen(self.WHITE))
-		self.pieces.append(Pieces.King(self.WHITE))
-		self.pieces.append(Pieces.Bishop(self.WHITE))
-		self.pieces.append(Pieces.Knight(self.WHITE))
-		self.pieces.append(Pieces.Rook(self.WHITE))
+                # If set, the incremental hash is checked against a full recomputation after every move
+                self.verifyHash = verifyHash
+                self.pieces = []
+                # [move, captured piece, enpassant and halfmoveClock before the move] for each move made
+                self.movesMade = []
+                self.madeEnPassant = []
+                # Square passed over by a pawn which has just pushed two squares (None if none)
+                self.enpassant = None
+                # Plies since the last capture or pawn move, and the FEN move number
+                self.halfmoveClock = 0
+                self.fullmoveNumber = 1
+		black = Pieces.PIECES[self.BLACK]
+		white = Pieces.PIECES[self.WHITE]
+		self.pieces += [black[kind] for kind in BACK_RANK]
+		self.pieces += [black[Pieces.PAWN]] * 8
+		self.pieces += [None] * 32
+		self.pieces += [white[Pieces.PAWN]] * 8
+		self.pieces += [white[kind] for kind in BACK_RANK]
+
+		self.rebuildBitboards()
+		self.sideToMove = self.WHITE
+		self.hash = Zobrist.computeHash(self)
 
         def clear(self):
                 """Remove all pieces and moves."""
                 for i in range(0,64):
                     self.pieces[i] = None
                 self.movesMade = []
-                self.doublePawnPush = []
                 self.madeEnPassant = []
+                self.enpassant = None
+                self.halfmoveClock = 0
+                self.fullmoveNumber = 1
+                self.rebuildBitboards()
+                self.sideToMove = self.WHITE
+                self.hash = Zobrist.computeHash(self)
+
+        def copy(self):
+                """Independent copy of the board, sharing the (never modified) piece and move objects."""
+                other = Board.__new__(Board)
+                other.__dict__.update(self.__dict__)
+                other.pieces = self.pieces[:]
+                other.movesMade = self.movesMade[:]
+                other.madeEnPassant = self.madeEnPassant[:]
+                other.bitboards = [self.bitboards[0][:], self.bitboards[1][:]]
+                other.occupancy = self.occupancy[:]
+                other.pieceSquares = [self.pieceSquares[0][:], self.pieceSquares[1][:]]
+                other.pieceIndex = self.pieceIndex[:]
+                other.material = [self.material[0][:], self.material[1][:]]
+                return other
+
+        def rebuildBitboards(self):
+                """Recompute the occupancy masks, piece lists and material counts from the piece list."""
+                # bitboards[colour][kind] has bit n set if square n holds that piece
+                self.bitboards = bitboards = [[0]*6, [0]*6]
+                self.occupancy = occupancy = [0, 0]
+                # pieceSquares[colour] lists the squares holding colour's pieces, in no
+                # particular order, and pieceIndex[sq] is sq's position in that list
+                self.pieceSquares = pieceSquares = [[], []]
+                self.pieceIndex = pieceIndex = [0]*64
+                # material[colour][kind] counts the pieces of each type
+                self.material = material = [[0]*6, [0]*6]
+                BIT = Bitboard.BIT
+                for sq, p in enumerate(self.pieces):
+                        if p is not None:
+                                colour = p.colour
+                                bitboards[colour][p.kind] |= BIT[sq]
+                                occupancy[colour] |= BIT[sq]
+                                squares = pieceSquares[colour]
+                                pieceIndex[sq] = len(squares)
+                                squares.append(sq)
+                                material[colour][p.kind] += 1
+
+        def placePiece(self, square, piece):
+                """Put piece on an empty square, keeping the bitboards in step."""
+                self.pieces[square] = piece
+                if piece is None:
+                        return
+                bit = Bitboard.BIT[square]
+                self.bitboards[piece.colour][piece.kind] |= bit
+                self.occupancy[piece.colour] |= bit
+                self.hash ^= Zobrist.PIECES[piece.colour][piece.kind][square]
+                squares = self.pieceSquares[piece.colour]
+                self.pieceIndex[square] = len(squares)
+                squares.append(square)
+                self.material[piece.colour][piece.kind] += 1
+
+        def removePiece(self, square):
+                """Take the piece off square and return it (None if the square is empty)."""
+                piece = self.pieces[square]
+                if piece is not None:
+                        self.pieces[square] = None
+                        bit = Bitboard.BIT[square]
+                        self.bitboards[piece.colour][piece.kind] ^= bit
+                        self.occupancy[piece.colour] ^= bit
+                        self.hash ^= Zobrist.PIECES[piece.colour][piece.kind][square]
+                        # The last square in the list fills the gap
+                        squares = self.pieceSquares[piece.colour]
+                        last = squares.pop()
+                        if not last==square:
+                                i = self.pieceIndex[square]
+                                squares[i] = last
+                                self.pieceIndex[last] = i
+                        self.material[piece.colour][piece.kind] -= 1
+                return piece
+
+        def enpassantKey(self):
+                """Zobrist key for the file of a pawn which has just pushed two squares (0 if none)."""
+                if self.enpassant is None:
+                        return 0
+                return Zobrist.ENPASSANT[ self.enpassant%8 ]
+
+        def checkHash(self):
+                """Raise HashError if the incremental hash differs from a full recomputation."""
+                expected = Zobrist.computeHash(self)
+                if not self.hash==expected:
+                        raise HashError("Hash %016x should be %016x after %d moves" % (self.hash, expected, len(self.movesMade)))
 
         def stringToSquare(self, squareString):
                 # E.g. squareString = e2
-		conv = dict(a=0, b=1, c=2, d=3, e=4, f=5, g=6, h=7)
-		row = 7 - (int(squareString[1]) - 1)
-                col = conv[squareString[0]]
-		return row*8 + col
+                return Move.SQUARES[squareString]
 
         def setPiece(self, squareString, piece):
                 square = self.stringToSquare(squareString)
-                self.pieces[square] = piece
+                self.removePiece(square)
+                if piece is not None:
+                        self.placePiece(square, piece)
+
+        def setFEN(self, fen):
+                """Set up the position described by a FEN string, e.g. START_FEN.
+
+                There is no castling in antichess, so the castling field is ignored.
+                The move counters default to 0 and 1."""
+                fields = fen.split()
+                if len(fields)<2:
+                        raise FENError("Need at least piece placement and side to move: " + fen)
+                rows = fields[0].split("/")
+                if not len(rows)==8:
+                        raise FENError("Need 8 rows: " + fen)
+                pieces = []
+                for text in rows:
+                        row = FEN_ROWS.get(text)
+                        if row is None:
+                                row = parseFENRow(text, fen)
+                        pieces += row
+                if fields[1]=="w":
+                        sideToMove = self.WHITE
+                elif fields[1]=="b":
+                        sideToMove = self.BLACK
+                else:
+                        raise FENError("Bad side to move: " + fen)
+                enpassant = None
+                if len(fields)>3 and not fields[3]=="-":
+                        enpassant = Move.SQUARES.get(fields[3])
+                        # Behind a pawn of the side which just moved, e.g. e3 with Black to move
+                        if enpassant is None or not enpassant/8==[2, 5][sideToMove]:
+                                raise FENError("Bad en passant square: " + fen)
+                try:
+                        halfmoveClock = int(fields[4]) if len(fields)>4 else 0
+                        fullmoveNumber = int(fields[5]) if len(fields)>5 else 1
+                except ValueError:
+                        raise FENError("Bad move counters: " + fen)
+                self.pieces = pieces
+                self.movesMade = []
+                self.madeEnPassant = []
+                self.enpassant = enpassant
+                self.halfmoveClock = halfmoveClock
+                self.fullmoveNumber = fullmoveNumber
+                self.rebuildBitboards()
+                self.sideToMove = sideToMove
+                self.hash = Zobrist.computeHash(self)
+
+        def getFEN(self):
+                """FEN string for the current position."""
+                rows = []
+                for row in range(8):
+                        text = ""
+                        empty = 0
+                        for col in range(8):
+                                p = self.pieces[row*8 + col]
+                                if p is None:
+                                        empty += 1
+                                        continue
+                                if empty>0:
+                                        text += str(empty)
+                                        empty = 0
+                                if p.colour==self.WHITE:
+                                        text += FEN_LETTERS[p.kind].upper()
+                                else:
+                                        text += FEN_LETTERS[p.kind]
+                        if empty>0:
+                                text += str(empty)
+                        rows.append(text)
+                ep = "-"
+                if self.enpassant is not None:
+                        ep = Move.colNotation[self.enpassant%8] + Move.rowNotation[self.enpassant/8]
+                return "%s %s - %s %d %d" % ("/".join(rows), "wb"[self.sideToMove], ep, self.halfmoveClock, self.fullmoveNumber)
 
         def display(self):
                 if self.textmode:
@@ -66,6 +239,9 @@ class Board:
 
 	def displayAsText(self):
 		lastMove = self.getLastMove()
+		# Nothing to highlight after a pass
+		if lastMove==Move.PASS:
+			lastMove = Move.NONE
 		print "--a-b-c-d-e-f-g-h--"
 		for row in range(8):
 			sys.stdout.write(str(9 - (row+1)))
@@ -89,6 +265,8 @@ class Board:
 
 	def displayAsUnicode(self):
 		lastMove = self.getLastMove()
+		if lastMove==Move.PASS:
+			lastMove = Move.NONE
 		print "  a b c d e f g h"
 		for row in range(8):
 			sys.stdout.write(str(9 - (row+1)))
@@ -113,66 +291,105 @@ class Board:
 		print "  a b c d e f g h"
 
 	def makeMove(self, move):
-		# Allow null moves (passes)
+		# Allow null moves (passes), which only hand the move to the other side
 		if move==Move.PASS:
+			self.hash ^= self.enpassantKey()
+			self.movesMade.append( [Move.PASS_CODE, None, self.enpassant, self.halfmoveClock] )
+			self.madeEnPassant.append(False)
+			self.enpassant = None
+			self.halfmoveClock += 1
+			if self.sideToMove==self.BLACK:
+				self.fullmoveNumber += 1
+			self.sideToMove = 1-self.sideToMove
+			self.hash ^= Zobrist.SIDE
+			if self.verifyHash:
+				self.checkHash()
 			return
                 # Retractions and resignations should not be made here
                 if move==Move.RETRACT or move==Move.RESIGN:
                         print "Move error."
                         exit()
 
-		fr, to = move.unpack()
-		self.movesMade.append( [move, self.pieces[to]] )
-
-                # Record double pawn pushes for en passant
-                if isinstance(self.pieces[fr], Pieces.Pawn) and abs(move.to[0]-move.fr[0])==2:
-                        self.doublePawnPush.append(True)
-                else:
-                        self.doublePawnPush.append(False)
-                if move.isEnpassant(self):
-                        self.madeEnPassant.append(True)
-                        # The captured pawn will be in same column, but one row behind
-                        # We don't store it explicitly.
-                        # This is ok because if we want to retract the move, we know it's
-                        # an en passant and therefore which piece to replace and where.
-                        capturedPieceCol = move.to[1]
-                        # Offset is -1 for black, +1 for white
-                        if self.pieces[fr].colour==self.WHITE:
-                                offset = +1
-                        else:
-                                offset = -1
-                        capturedPieceRow = move.to[0] + offset
-                        self.pieces[ capturedPieceRow*8 + capturedPieceCol ] = None
-                else:
-                        self.madeEnPassant.append(False)
-
-		self.pieces[ to ] = self.pieces[ fr ]
-		self.pieces[ fr ] = None
-		if isinstance(move, Move.PromotionMove):
-			self.pieces[ to ] = move.promoteTo
+		# Work on the packed move, so the search makes no Move objects
+		if isinstance(move, Move.Move):
+			code = move.code
+		else:
+			code = move
+		fr, to = code & 63, code >> Move.TO_SHIFT & 63
+		piece = self.pieces[fr]
+		# Previous en passant file no longer counts towards the hash
+		self.hash ^= self.enpassantKey()
+		self.movesMade.append( [code, self.pieces[to], self.enpassant, self.halfmoveClock] )
+
+		isPawn = isinstance(piece, Pieces.Pawn)
+		if isPawn or self.pieces[to] is not None:
+			self.halfmoveClock = 0
+		else:
+			self.halfmoveClock += 1
+		if self.sideToMove==self.BLACK:
+			self.fullmoveNumber += 1
+		# Record double pawn pushes for en passant
+		if isPawn and abs(to-fr)==16:
+			self.enpassant = (fr + to)/2
+		else:
+			self.enpassant = None
+		# En passant if a pawn moves diagonally to an empty square
+		if isPawn and not (to-fr)%8==0 and self.pieces[to] is None:
+			self.madeEnPassant.append(True)
+			# The captured pawn is in the same column, one row behind. It
+			# isn't stored: retractMove knows where to put it back.
+			if piece.colour==self.WHITE:
+				self.removePiece( to + 8 )
+			else:
+				self.removePiece( to - 8 )
+		else:
+			self.madeEnPassant.append(False)
+
+		self.removePiece( fr )
+		self.removePiece( to )
+		promotion = code >> Move.PROMOTION_SHIFT & 7
+		if promotion:
+			piece = Pieces.PIECES[piece.colour][promotion]
+		self.placePiece( to, piece )
+
+		self.sideToMove = 1-self.sideToMove
+		self.hash ^= Zobrist.SIDE ^ self.enpassantKey()
+		if self.verifyHash:
+			self.checkHash()
 
 	def retractMove(self):
 		if len(self.movesMade)==0:
 			return
-		[move, piece] = self.movesMade.pop()
-		fr, to = move.unpack()
-		self.pieces[ fr ] = self.pieces[ to ]
+		self.hash ^= Zobrist.SIDE ^ self.enpassantKey()
+		self.sideToMove = 1-self.sideToMove
+		[code, piece, self.enpassant, self.halfmoveClock] = self.movesMade.pop()
+		if self.sideToMove==self.BLACK:
+			self.fullmoveNumber -= 1
+		if code==Move.PASS_CODE:
+			self.madeEnPassant.pop()
+			self.hash ^= self.enpassantKey()
+			if self.verifyHash:
+				self.checkHash()
+			return
+		fr, to = code & 63, code >> Move.TO_SHIFT & 63
+		moved = self.removePiece( to )
+		if code >> Move.PROMOTION_SHIFT & 7:
+			moved = Pieces.PIECES[moved.colour][Pieces.PAWN]
+		self.placePiece( fr, moved )
                 # Put captured piece back in the correct place in case of en passant
                 if self.madeEnPassant[-1]:
-                        capturedPieceCol = move.to[1]
-                        # Offset is -1 for black, +1 for white
-                        if self.pieces[fr].colour==self.WHITE:
-                                offset = +1
+                        # Offset is -1 row for black, +1 for white
+                        if moved.colour==self.WHITE:
+                                offset = +8
                         else:
-                                offset = -1
-                        capturedPieceRow = move.to[0] + offset
-                        self.pieces[ capturedPieceRow*8 + capturedPieceCol ] = Pieces.Pawn( 1-self.pieces[fr].colour )
-                else:
-		        self.pieces[ to ] = piece
-		if isinstance(move, Move.PromotionMove):
-			self.pieces[ fr ] = Pieces.Pawn( self.pieces[fr].colour )
-                self.doublePawnPush.pop()
+                                offset = -8
+                        self.placePiece( to + offset, Pieces.PIECES[1-moved.colour][Pieces.PAWN] )
+                elif piece is not None:
+		        self.placePiece( to, piece )
                 self.madeEnPassant.pop()
+		self.hash ^= self.enpassantKey()
+		if self.verifyHash:
+			self.checkHash()
 
         def retractTurn(self):
                 # Try to pop two moves, to get back to the same player
@@ -185,23 +402,24 @@ class Board:
 	def getLastMove(self):
 		if len(self.movesMade)==0:
 			return Move.NONE
-		return self.movesMade[-1][0]
+		return moveFromCode(self.movesMade[-1][0])
 
 	def getSecondLastMove(self):
                 if len(self.movesMade)<2:
 			return Move.NONE
-		return self.movesMade[-2][0]
+		return moveFromCode(self.movesMade[-2][0])
 	
 	def getLastMovedPiece(self):
 		if len(self.movesMade)==0:
 			return None
-		fr, to = self.getLastMove().unpack()
-		return self.pieces[to]
+		return self.pieces[self.movesMade[-1][0] >> Move.TO_SHIFT & 63]
 
 	def hasCaptures(self, colour):
 		# Important that we don't enforce captures here, otherwise enter infinite loop
-                _, isCapture = Rules.Suicide().getAllValidMoves(self, colour, enforceCaptures=False)
-                return sum(isCapture)>0
+                for code in Rules.Suicide().generateCodes(self, colour):
+                        if code & Move.CAPTURE:
+                                return True
+                return False
 
 	def hasPieceOn(self, row, col):
 		return not (self.pieces[row*8+col] == None)
@@ -212,62 +430,70 @@ class Board:
 		return self.pieces[row*8+col]
 
 	def hasClearPath(self, fr, to):
-		def sign(x):
-			if x > 0:
-				return 1
-			if x < 0:
-				return -1
-			return 0
-		# check for bishop move first
-		if abs(fr[0]-to[0]) == abs(fr[1]-to[1]):
-			if fr[1]>to[1]:
-				fr, to = to, fr
-			s = [sign(to[0] - fr[0]), sign(to[1]-fr[1])]
-			for inc in range(1, to[1]-fr[1]):
-				if self.hasPieceOn(fr[0]+s[0]*inc, fr[1]+s[1]*inc):
-					return False
-			return True
-		# Now straight-line moves
-		if fr[0]==to[0]:
-			if fr[1]>to[1]:
-				fr, to = to, fr
-			for col in range(fr[1]+1,to[1]):
-				if self.hasPieceOn(fr[0], col):
-					return False
-		if fr[1]==to[1]:
-			if fr[0]>to[0]:
-				fr, to = to, fr
-			for row in range(fr[0]+1,to[0]):
-				if self.hasPieceOn(row, fr[1]):
-					return False
-		# Anything else, just return True
-		return True
+		# True unless a piece stands between two squares on the same line
+		between = Attacks.BETWEEN[fr[0]*8 + fr[1]][to[0]*8 + to[1]]
+		return not between & (self.occupancy[0] | self.occupancy[1])
 
 	def getAllPieces(self, colour):
-		pieces = []
-		for row in range(0, 8):
-			for col in range(0, 8):
-				if self.hasPieceOn(row, col):
-					p = self.getPieceOn([row,col])
-					if p.colour==colour:
-						pieces.append( [row,col] )
-		return pieces
+		# Square order
+		return [ [sq/8, sq%8] for sq in sorted(self.pieceSquares[colour]) ]
 
 	def getNumPieces(self, colour):
-		return len( self.getAllPieces(colour) )
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+		return len(self.pieceSquares[colour])
+
+
+def moveFromCode(code):
+        """Move object for a packed move from movesMade (Move.PASS for a pass)."""
+        if code==Move.PASS_CODE:
+                return Move.PASS
+        return Move.Move.fromCode(code)
+
+def parseFENRow(text, fen):
+        """List of the 8 pieces (or None) in one row of FEN piece placement, remembered in FEN_ROWS."""
+        row = []
+        for ch in text:
+                if ch.isdigit():
+                        row += [None] * int(ch)
+                        continue
+                if len(row)>7 or not ch.lower() in FEN_PIECES:
+                        raise FENError("Bad row '%s': %s" % (text, fen))
+                if ch.isupper():
+                        row.append(Pieces.PIECES[Board.WHITE][FEN_PIECES[ch.lower()]])
+                else:
+                        row.append(Pieces.PIECES[Board.BLACK][FEN_PIECES[ch.lower()]])
+        if not len(row)==8:
+                raise FENError("Bad row '%s': %s" % (text, fen))
+        if len(FEN_ROWS)>=FEN_ROWS_LIMIT:
+                FEN_ROWS.clear()
+        FEN_ROWS[text] = row
+        return row
+
+def fenLines(source):
+        """Generate the FEN strings in source (a filename, or an open file or other
+        iterable of lines), skipping blank lines and # comments. Anything after
+        ';' on a line (e.g. EPD operations) is dropped."""
+        opened = isinstance(source, basestring)
+        if opened:
+                source = open(source)
+        try:
+                for line in source:
+                        fen = line.split(";", 1)[0].strip()
+                        if fen and not fen.startswith("#"):
+                                yield fen
+        finally:
+                # Also when the caller stops early
+                if opened:
+                        source.close()
+
+def readFENs(source, board=None):
+        """Generate a Board set up from each FEN line of source (see fenLines).
+        The same board is set up for every line, so copy it to keep a position."""
+        if board is None:
+                board = Board()
+        lines = fenLines(source)
+        try:
+                for fen in lines:
+                        board.setFEN(fen)
+                        yield board
+        finally:
+                lines.close()
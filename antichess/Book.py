@@ -0,0 +1,229 @@
+# Opening book: the moves played from positions seen in earlier games, with
+# how often they were played and how well they scored, keyed by Zobrist hash.
+#
+# A book file is a header followed by fixed size records sorted by hash and
+# move: hash, packed move (without flags), games, and points scored by the
+# side to move in half points. Lookups binary search the memory-mapped file.
+#
+# Games are read and written one per line, as moves in coordinate notation
+# followed by the result:
+#
+#   e2e3 b7b5 f1b5 c7c6 ... 1-0
+#
+# python -m antichess.Book --selfplay 200 -d 3 -t 1 --save-games games.txt -o book.bin
+# python -m antichess.Book --games games.txt -o book.bin
+
+import mmap
+import os
+import random
+import struct
+import sys
+from optparse import OptionParser
+
+import Archive
+import Board
+import Move
+
+MAGIC = "ACBK"
+VERSION = 1
+# Magic, version, number of records
+HEADER = struct.Struct("<4sBxxxI")
+# Hash, move, games, half points
+RECORD = struct.Struct("<QHII")
+# Only positions up to this many plies into a game go in the book
+MAX_PLY = 20
+RESULTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+
+class BookError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def resultText(score):
+    """"1-0", "1/2-1/2" or "0-1" for White's score."""
+    return [text for text, value in RESULTS.items() if value==score][0]
+
+def formatGame(codes, score):
+    """A game as a line of text; score is White's (1, 0.5 or 0)."""
+    return " ".join([str(Move.Move.fromCode(code)) for code in codes] + [resultText(score)])
+
+def parseGame(line):
+    """(codes, score) from a line written by formatGame."""
+    words = line.split()
+    if len(words)==0 or not words[-1] in RESULTS:
+        raise BookError("Bad game: " + line)
+    board = Board.Board()
+    codes = []
+    for word in words[:-1]:
+        move = Move.Move.fromNotation(word, board.sideToMove)
+        codes.append(move.code)
+        board.makeMove(move)
+    return codes, RESULTS[words[-1]]
+
+def readGames(filename):
+    """Generate (codes, score) for each game in a file, skipping blank and # lines."""
+    f = open(filename)
+    try:
+        for line in f:
+            if line.strip() and not line.startswith("#"):
+                yield parseGame(line)
+    finally:
+        f.close()
+
+def selfPlay(numGames, depth, maxTime, randomPlies=2, seed=None):
+    """Generate (codes, score) for games between two AIPlayers. The first
+    randomPlies moves are random, so the games don't all repeat each other."""
+    # Player probes books, so imports this module
+    import Game
+    import Player
+    rng = random.Random(seed)
+    for i in range(numGames):
+        players = [Player.AIPlayer(colour, depth, quiet=True) for colour in [0, 1]]
+        board = Board.Board()
+        opening = []
+        for ply in range(rng.randint(0, randomPlies)):
+            moves = players[board.sideToMove].rules.getAllValidCodes(board, board.sideToMove)
+            if len(moves)==0:
+                break
+            opening.append(rng.choice(moves))
+            board.makeMove(opening[-1])
+        codes, score = Game.playQuietGame(players, maxTime, board=board)
+        yield opening + codes, score
+
+class BookBuilder:
+    """Collects move statistics from games and writes them as a book."""
+    def __init__(self, maxPly=MAX_PLY):
+        self.maxPly = maxPly
+        # (hash, move): [games, half points for the side to move]
+        self.entries = {}
+        self.games = 0
+
+    def addGame(self, codes, score):
+        """Add a game from the starting position; score is White's (1, 0.5 or 0)."""
+        board = Board.Board()
+        for code in codes[:self.maxPly]:
+            entry = self.entries.setdefault( (board.hash, code & Move.MOVE_MASK), [0, 0] )
+            entry[0] += 1
+            if board.sideToMove==0:
+                entry[1] += int(2*score)
+            else:
+                entry[1] += int(2*(1-score))
+            board.makeMove(code)
+        self.games += 1
+
+    def write(self, filename, minGames=1):
+        """Write the moves played in at least minGames games to filename."""
+        records = sorted([(key, entry) for key, entry in self.entries.items() if entry[0] >= minGames])
+        f = open(filename + ".tmp", "wb")
+        try:
+            f.write(HEADER.pack(MAGIC, VERSION, len(records)))
+            for (key, move), (games, halfPoints) in records:
+                f.write(RECORD.pack(key, move, games, halfPoints))
+        finally:
+            f.close()
+        os.rename(filename + ".tmp", filename)
+        return len(records)
+
+class OpeningBook:
+    """Read-only access to a book file."""
+    def __init__(self, filename, minGames=1):
+        self.filename = filename
+        # Moves from fewer games than this are not played
+        self.minGames = minGames
+        f = open(filename, "rb")
+        try:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close()
+        magic, version, self.size = HEADER.unpack_from(self.data, 0)
+        if not magic==MAGIC or not version==VERSION or not len(self.data)==HEADER.size + self.size * RECORD.size:
+            raise BookError("Bad book file: " + filename)
+
+    def probe(self, key):
+        """List of (move, games, half points) for the position with hash key."""
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if RECORD.unpack_from(self.data, HEADER.size + mid*RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        result = []
+        while lo < self.size:
+            record = RECORD.unpack_from(self.data, HEADER.size + lo*RECORD.size)
+            if not record[0]==key:
+                break
+            result.append(record[1:])
+            lo += 1
+        return result
+
+    def chooseMove(self, board, validMoves):
+        """The legal code in validMoves with the best book score, or None if the
+        position is not in the book. Scores are smoothed towards 1/2, so moves
+        from more games are preferred among equally good ones."""
+        legal = dict([(code & Move.MOVE_MASK, code) for code in validMoves])
+        best, bestScore = None, -1.0
+        for move, games, halfPoints in self.probe(board.hash):
+            if games < self.minGames or not move in legal:
+                continue
+            score = (halfPoints/2.0 + 1) / (games + 2)
+            if score > bestScore:
+                best, bestScore = legal[move], score
+        return best
+
+    def close(self):
+        self.data.close()
+
+def main():
+    parser = OptionParser(usage="python -m antichess.Book [options]")
+    parser.add_option("-o", "--output", dest="output", default="book.bin",
+                      help="write the book to FILE", metavar="FILE")
+    parser.add_option("--games", action="append", dest="games", default=[],
+                      help="add the games in FILE (may be repeated)", metavar="FILE")
+    parser.add_option("--archive", action="append", dest="archives", default=[],
+                      help="add the games in the binary archive FILE (may be repeated)", metavar="FILE")
+    parser.add_option("--selfplay", type="int", dest="selfplay", default=0,
+                      help="add N games played by the AI against itself", metavar="N")
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=3,
+                      help="AI search depth for self-play", metavar="DEPTH")
+    parser.add_option("-t", "--time", type="float", dest="maxTime", default=1.0,
+                      help="AI thinking time per move for self-play", metavar="SECONDS")
+    parser.add_option("--random-plies", type="int", dest="randomPlies", default=2,
+                      help="start self-play games with up to N random moves", metavar="N")
+    parser.add_option("--save-games", dest="saveGames", default=None,
+                      help="append the self-play games to FILE", metavar="FILE")
+    parser.add_option("--plies", type="int", dest="maxPly", default=MAX_PLY,
+                      help="book positions up to N plies into each game", metavar="N")
+    parser.add_option("--min-games", type="int", dest="minGames", default=1,
+                      help="leave out moves played in fewer than N games", metavar="N")
+    parser.add_option("--seed", type="int", dest="seed", default=None,
+                      help="random seed for self-play", metavar="SEED")
+    (options, args) = parser.parse_args()
+
+    builder = BookBuilder(options.maxPly)
+    for filename in options.games:
+        for codes, score in readGames(filename):
+            builder.addGame(codes, score)
+    for filename in options.archives:
+        reader = Archive.ArchiveReader(filename)
+        for codes, score, fen in reader:
+            if fen==Board.START_FEN:
+                builder.addGame(codes, score)
+        reader.close()
+    if options.saveGames is not None:
+        saved = open(options.saveGames, "a")
+    for codes, score in selfPlay(options.selfplay, options.depth, options.maxTime, options.randomPlies, options.seed):
+        builder.addGame(codes, score)
+        if options.saveGames is not None:
+            saved.write(formatGame(codes, score) + "\n")
+            saved.flush()
+        sys.stdout.write(".")
+        sys.stdout.flush()
+    if options.saveGames is not None:
+        saved.close()
+    count = builder.write(options.output, options.minGames)
+    print "\n%d games, %d moves written to %s" % (builder.games, count, options.output)
+
+if __name__=="__main__":
+    main()
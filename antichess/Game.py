@@ -5,12 +5,40 @@ import Board
 import Player
 import Rules
 import Move
+import TimeManager
+import UCI
 
 from optparse import OptionParser
 #import argparse # python 2.7
 import time
 
 playerNames = ["White", "Black"]
+# Plies after which a game played by playQuietGame is drawn
+MAX_PLIES = 400
+
+def playQuietGame(players, maxTime, maxPlies=MAX_PLIES, board=None):
+	"""Play a game between players (White's first) with nothing displayed,
+	from board if given or else the starting position. maxTime is the time per
+	move, or a list with one for each player. Returns the packed moves played
+	and White's score: 1 for a win, 0 for a loss and 0.5 if there is no result
+	after maxPlies."""
+	if board is None:
+		board = Board.Board()
+	if not isinstance(maxTime, list):
+		maxTime = [maxTime, maxTime]
+	codes = []
+	col = board.sideToMove
+	while len(codes) < maxPlies:
+		# No pieces or no moves wins
+		if board.getNumPieces(col)==0 or len(players[col].rules.getAllValidCodes(board, col))==0:
+			return codes, 1.0 - col
+		m = players[col].getMove(board, maxTime[col])
+		if m==Move.RESIGN:
+			return codes, float(col)
+		board.makeMove(m)
+		codes.append(m.code)
+		col = 1-col
+	return codes, 0.5
 
 def playGame():
 	parser = OptionParser()
@@ -22,6 +50,26 @@ def playGame():
 	                  help="set black player", metavar="PLAYER")
 	parser.add_option("-t", "--time", type="int", dest="maxTime", default=5,
 	                  help="set maximum AI thinking time", metavar="MAXTIME")
+	parser.add_option("--clock", type="float", dest="clock", default=None,
+	                  help="play with a clock: SECONDS for each side, shared out over the moves (overrides -t)", metavar="SECONDS")
+	parser.add_option("--increment", type="float", dest="increment", default=0.0,
+	                  help="with --clock, add SECONDS to a player's clock after each move", metavar="SECONDS")
+	parser.add_option("--hash-mb", type="int", dest="hashMB", default=16,
+	                  help="set AI transposition table size in megabytes", metavar="MB")
+	parser.add_option("--workers", "--threads", type="int", dest="workers", default=1,
+	                  help="number of processes for the AI search", metavar="N")
+	parser.add_option("--lazy-smp", action="store_true", dest="lazySMP", default=False,
+	                  help="with --workers, search the whole tree in every process, sharing a hash table (experimental: check test/smp.py shows a speedup first)")
+	parser.add_option("--quiescence-nodes", type="int", dest="quiescenceNodes", default=Player.QUIESCENCE_NODES,
+	                  help="nodes the AI may search past its depth to follow forced captures, per leaf (0 for none)", metavar="N")
+	parser.add_option("--book", dest="bookFile", default=None,
+	                  help="play moves from the opening book FILE (see antichess.Book)", metavar="FILE")
+	parser.add_option("--tablebases", dest="tablebaseDir", default=None,
+	                  help="probe the endgame tablebases in DIR (see antichess.Tablebase)", metavar="DIR")
+	parser.add_option("--stats", dest="statsFile", default=None,
+	                  help="append AI search statistics for every move to FILE as JSON lines", metavar="FILE")
+	parser.add_option("--uci", action="store_true", dest="uci", default=False,
+	                  help="run as a UCI engine on stdin and stdout (see antichess.UCI)")
 	parser.add_option("-v", "--verbose", action="store_true", dest="verbose", default=False,
 	                  help="set verbose AI")
 	parser.add_option("-s", "--simple", action="store_true", dest="textmode", default=False,
@@ -29,10 +77,18 @@ def playGame():
 	parser.add_option("--singleturn", action="store_true", dest="singleturn", default=False,
 	                  help="(debug) play a single turn only")
 	(options, args) = parser.parse_args()
+	if options.uci:
+		UCI.UCIEngine(hashMB=options.hashMB, bookFile=options.bookFile, tablebaseDir=options.tablebaseDir,
+		              quiescenceNodes=options.quiescenceNodes).run()
+		return
 
 	b = Board.Board(textmode = options.textmode)
 	AIdepth = options.AIdepth
         maxTime = options.maxTime
+        # Seconds left for each player, if playing with a clock
+        clocks = None
+        if options.clock is not None:
+                clocks = [options.clock, options.clock]
 
 	playertype = [options.white, options.black]
 	players = []
@@ -41,7 +97,7 @@ def playGame():
 		if p=="human":
 			players.append( Player.HumanPlayer(i) )
 		elif p=="ai":
-			players.append( Player.AIPlayer(i, AIdepth, options.verbose) )
+			players.append( Player.AIPlayer(i, AIdepth, options.verbose, hashMB=options.hashMB, workers=options.workers, lazySMP=options.lazySMP, statsFile=options.statsFile, quiescenceNodes=options.quiescenceNodes, tablebaseDir=options.tablebaseDir, bookFile=options.bookFile) )
 		elif p=="random":
 			players.append( Player.RandomPlayer(i) )
 		elif p=="pass":
@@ -52,7 +108,9 @@ def playGame():
 			exit()
 
 		print "%s is %s." % (playerNames[i], players[i].name),
-		if p=="ai":
+		if p=="ai" and clocks is not None:
+			print "Depth is %s, clock is %gs + %gs per move." % (AIdepth, options.clock, options.increment)
+		elif p=="ai":
 			print "Depth is %s, max thinking time is %ds." % (AIdepth, maxTime)
 		print ""
 
@@ -73,6 +131,8 @@ def playGame():
 
 			madeValidMove = False;
                         startTime = time.time()
+                        if clocks is not None:
+                                maxTime = TimeManager.allocate(clocks[col], options.increment)
 			while not madeValidMove:
                                 print playerNames[col] + "'s turn"
 				m = players[col].getMove(b, maxTime)
@@ -97,6 +157,14 @@ def playGame():
 					madeValidMove = False
 					print "Invalid move: " + e.value
                         print "Got valid move in ", time.time()-startTime, "s"
+                        if clocks is not None:
+                                clocks[col] -= time.time()-startTime
+                                if clocks[col] < 0:
+                                        print playerNames[col] + " ran out of time."
+                                        WIN = 1-col
+                                        break
+                                clocks[col] += options.increment
+                                print "Clocks: %s %.1fs, %s %.1fs" % (playerNames[0], clocks[0], playerNames[1], clocks[1])
 			if m==Rules.Move.RESIGN:
 				print playerNames[col] + " resigns. "
 				WIN = 1-col
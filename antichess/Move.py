@@ -8,39 +8,66 @@ class MoveViolation(Exception):
 
 rowNotation = "87654321"
 colNotation = "abcdefgh"
+# Square index by name, e.g. SQUARES["e2"] == 52
+SQUARES = dict([(colNotation[sq%8] + rowNotation[sq/8], sq) for sq in range(64)])
+# Piece kind by promotion letter (kinds are numbered in "PNBRQK" order, and
+# Pieces may not be fully imported yet)
+PROMOTION_KINDS = dict([(letter, "PNBRQK".index(letter)) for letter in "QRNBK"])
 
-class Move:
-	fr = [0, 0]
-	to = [0, 0]
-	def __init__(self, fr, to):
-		self.fr = fr
-		self.to = to
+# Packed moves are ints: from square (bits 0-5), to square (bits 6-11),
+# promotion piece kind (bits 12-14, 0 if none), then the flags below. Squares
+# are row*8 + col as on the board.
+TO_SHIFT = 6
+PROMOTION_SHIFT = 12
+CAPTURE = 1 << 15
+ENPASSANT = 1 << 16
+# The from, to and promotion fields, which identify a move within a position
+MOVE_MASK = (1 << 15) - 1
+# array typecode for lists of packed moves ('I' items come back as longs)
+TYPECODE = 'i'
+
+# Recorded in Board.movesMade for a pass (no real move starts and ends on one square)
+PASS_CODE = 0
+
+def pack(fr, to, promotion=0, flags=0):
+	return fr | to << TO_SHIFT | promotion << PROMOTION_SHIFT | flags
+
+class Move(object):
+	__slots__ = ('code',)
+	def __init__(self, fr, to, flags=0):
+		self.code = pack(fr[0]*8 + fr[1], to[0]*8 + to[1], 0, flags)
+        @staticmethod
+        def fromCode(code):
+                """Move object for a packed move."""
+                if code >> PROMOTION_SHIFT & 7:
+                        move = PromotionMove.__new__(PromotionMove)
+                else:
+                        move = Move.__new__(Move)
+                move.code = code
+                return move
         @staticmethod
         def fromNotation(m, colour):
-            try:
-	        mm = [m[0:2], m[2:4]]   # e.g. e2e4
-                fr = [0, 0]
-	        to = [0, 0]
-	        conv = dict(a=0, b=1, c=2, d=3, e=4, f=5, g=6, h=7)
-	        fr[1] = conv[ mm[0][0] ]
-	        fr[0] = 7 - (int(mm[0][1]) - 1)
-	        to[1] = conv[ mm[1][0] ]
-	        to[0] = 7 - (int(mm[1][1]) - 1)
-	        # Promotion?
-	        promotionDict = dict(Q=Pieces.Queen(colour), R=Pieces.Rook(colour), N=Pieces.Knight(colour), B=Pieces.Bishop(colour), K=Pieces.King(colour))
-	        if len(m)>4:
-	    	    return PromotionMove( fr, to, promotionDict[m[4]] )
-	        else:
-	    	    return Move(fr, to)
-            except Exception as e:
-                print e
-                raise
+                # e.g. e2e4, or e7e8Q for a promotion (the landing rank gives the colour)
+                try:
+                        code = pack(SQUARES[m[0:2]], SQUARES[m[2:4]])
+                        if len(m)>4:
+                                code |= PROMOTION_KINDS[m[4]] << PROMOTION_SHIFT
+                        return Move.fromCode(code)
+                except Exception as e:
+                        print e
+                        raise
 
         def isEnpassant(self, board):
                 fr, to = self.unpack()
                 # En passant if a pawn moves diagonally, and there's no piece in target square
-                return isinstance(board.pieces[fr], Pieces.Pawn) and abs(self.to[1]-self.fr[1])==1 and board.pieces[to]==None
+                return isinstance(board.pieces[fr], Pieces.Pawn) and not (to-fr)%8==0 and board.pieces[to]==None
 
+	@property
+	def fr(self):
+		return [(self.code & 63) >> 3, self.code & 7]
+	@property
+	def to(self):
+		return [(self.code >> TO_SHIFT & 63) >> 3, self.code >> TO_SHIFT & 7]
 	def __getitem__(self, k):
 		if k==0:
 			return self.fr
@@ -48,43 +75,49 @@ class Move:
 			return self.to
 		raise MoveViolation("Syntax move[k] only valid for k=0,1")
 	def unpack(self):
-		return self.fr[0]*8 + self.fr[1], self.to[0]*8 + self.to[1]
+		return self.code & 63, self.code >> TO_SHIFT & 63
 	def __str__(self):
-		rowf = self.fr[0]
-		colf = self.fr[1]
-		rowt = self.to[0]
-		colt = self.to[1]
-		return colNotation[colf]+rowNotation[rowf]+colNotation[colt]+rowNotation[rowt]
+		fr, to = self.unpack()
+		return colNotation[fr%8]+rowNotation[fr/8]+colNotation[to%8]+rowNotation[to/8]
 
 class PromotionMove(Move):
-	promoteTo = None
-	def __init__(self, fr, to, promoteTo):
-		Move.__init__(self, fr, to)
-		self.promoteTo = promoteTo
+	__slots__ = ()
+	def __init__(self, fr, to, promoteTo, flags=0):
+		Move.__init__(self, fr, to, flags | promoteTo.kind << PROMOTION_SHIFT)
+	@property
+	def promoteTo(self):
+		# The promoted piece's colour follows from the rank it lands on
+		return Pieces.PIECES[int(self.code >> TO_SHIFT & 63 >= 8)][self.code >> PROMOTION_SHIFT & 7]
 	def __str__(self):
 		return Move.__str__(self) + self.promoteTo.symbol
 
 class PassMove(Move):
+	__slots__ = ()
 	def __init__(self):
-		pass
+		self.code = PASS_CODE
 	def __str__(self):
 		return "PASS"
 
 class ResignMove(Move):
+	__slots__ = ()
 	def __init__(self):
-		pass
+		self.code = 0
 	def __str__(self):
 		return "RESIGN"
 
 class RetractMove(Move):
+	__slots__ = ()
 	def __init__(self):
-		pass
+		self.code = 0
 	def __str__(self):
 		return "RETRACT"
 
 class NoneMove(Move):
+	__slots__ = ()
+	fr = [-1, -1]
+	to = [-1, -1]
 	def __init__(self):
-		Move.__init__(self, [-1,-1], [-1,-1])
+		self.code = 0
 	def __str__(self):
 		return "NONE"
 
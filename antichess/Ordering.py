@@ -0,0 +1,66 @@
+import Move
+import Pieces
+
+# Piece values used only to order captures (most valuable victim, least valuable attacker)
+VALUES = [1, 3, 3, 5, 9, 2]
+
+TT_SCORE = 1 << 40
+CAPTURE_SCORE = 1 << 36
+KILLER_SCORE = 1 << 32
+
+class MoveOrderer:
+    """Orders moves for the search: hash move, captures, killers, then history."""
+    def __init__(self, maxPly=128):
+        self.maxPly = maxPly
+        # Two quiet moves per ply which caused a beta cutoff
+        self.killers = [[0, 0] for ply in range(maxPly)]
+        # history[colour][from | to<<6], bumped by depth*depth on every quiet cutoff
+        self.history = [[0]*4096, [0]*4096]
+
+    def newSearch(self):
+        """Forget killers and age the history scores."""
+        self.killers = [[0, 0] for ply in range(self.maxPly)]
+        for colour in [0, 1]:
+            h = self.history[colour]
+            for i in range(4096):
+                h[i] >>= 1
+
+    def orderMoves(self, board, codes, colour, ply, ttMove=0):
+        """Return the packed moves in codes sorted so the most promising move comes first."""
+        if ply < self.maxPly:
+            killers = self.killers[ply]
+        else:
+            killers = ()
+        history = self.history[colour]
+        pieces = board.pieces
+        scores = []
+        for code in codes:
+            move = code & Move.MOVE_MASK
+            if move==ttMove:
+                score = TT_SCORE
+            elif code & Move.CAPTURE:
+                if code & Move.ENPASSANT:
+                    victimValue = VALUES[Pieces.PAWN]
+                else:
+                    victimValue = VALUES[pieces[code >> Move.TO_SHIFT & 63].kind]
+                score = CAPTURE_SCORE + 16*victimValue - VALUES[pieces[code & 63].kind]
+            elif move in killers:
+                score = KILLER_SCORE - killers.index(move)
+            else:
+                score = history[code & 4095]
+            scores.append(-score)
+        # sort is stable, so equally scored moves keep their order
+        order = sorted(range(len(codes)), key=scores.__getitem__)
+        return [codes[i] for i in order]
+
+    def recordCutoff(self, code, colour, ply, depth):
+        """Remember a packed move which caused a beta cutoff."""
+        if code & Move.CAPTURE:
+            return
+        move = code & Move.MOVE_MASK
+        if ply < self.maxPly:
+            killers = self.killers[ply]
+            if not killers[0]==move:
+                killers[1] = killers[0]
+                killers[0] = move
+        self.history[colour][code & 4095] += depth*depth
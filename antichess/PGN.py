@@ -0,0 +1,321 @@
+# PGN games with moves in standard algebraic notation (SAN), as used by the
+# public antichess game databases.
+#
+# SAN moves are matched against the legal moves from Rules.Suicide: a piece
+# letter (none for pawns), whatever part of the origin square is needed to
+# tell the move apart from other moves of the same kind of piece to the same
+# square, "x" for captures, the target square, and "=Q" (or R, N, B, K) for
+# promotions. There is no check or castling in antichess; check marks and
+# annotations such as "!?" are ignored when reading, and moves in coordinate
+# notation (e2e4, e7e8Q) are accepted too.
+#
+# Files are read a game at a time, so they can be much larger than memory.
+# Parsing moves is the slow part, and can be spread over worker processes.
+#
+# python -m antichess.PGN games.pgn -j 4 --archive games.bin
+# python -m antichess.PGN games.pgn --skip-errors --save-games games.txt
+
+import multiprocessing
+import re
+import time
+from optparse import OptionParser
+
+import Archive
+import Board
+import Book
+import Move
+import Pieces
+import Rules
+
+PIECE_LETTERS = "PNBRQK"
+SAN = re.compile(r"^([NBRQK])?([a-h])?([1-8])?(x)?([a-h][1-8])(?:=?([NBRQK]))?$")
+# Coordinate notation, as written by Move (and older antichess PGN files)
+COORDINATES = re.compile(r"^([a-h][1-8])([a-h][1-8])([NBRQK])?$")
+# Movetext tokens: comments, variation brackets, NAGs, move numbers, and moves or results
+TOKEN = re.compile(r"\{[^}]*\}?|;[^\n]*|\(|\)|\$\d+|\d+\.+|[^\s(){};]+")
+TAG = re.compile(r'^\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]\s*$')
+RESULTS = dict(Book.RESULTS, **{"*": None})
+# Games handed to the worker processes at a time
+BATCH_SIZE = 2000
+
+class PGNError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def toSAN(board, code, codes=None):
+    """SAN for a legal move on board, with or without its flags (as read from
+    an Archive); codes are the legal moves, if already known."""
+    if codes is None:
+        codes = Rules.Suicide().getAllValidCodes(board, board.sideToMove)
+    # The legal move has the capture flag
+    for legal in codes:
+        if legal & Move.MOVE_MASK==code & Move.MOVE_MASK:
+            code = legal
+            break
+    fr, to = code & 63, code >> Move.TO_SHIFT & 63
+    kind = board.pieces[fr].kind
+    capture = code & Move.CAPTURE
+    if kind==Pieces.PAWN:
+        san = Move.colNotation[fr%8] if capture else ""
+    else:
+        san = PIECE_LETTERS[kind]
+        rivals = [c & 63 for c in codes if c >> Move.TO_SHIFT & 63==to and not c & 63==fr
+                  and board.pieces[c & 63].kind==kind]
+        if rivals:
+            if not fr%8 in [sq%8 for sq in rivals]:
+                san += Move.colNotation[fr%8]
+            elif not fr/8 in [sq/8 for sq in rivals]:
+                san += Move.rowNotation[fr/8]
+            else:
+                san += Move.colNotation[fr%8] + Move.rowNotation[fr/8]
+    if capture:
+        san += "x"
+    san += Move.colNotation[to%8] + Move.rowNotation[to/8]
+    promotion = code >> Move.PROMOTION_SHIFT & 7
+    if promotion:
+        san += "=" + PIECE_LETTERS[promotion]
+    return san
+
+def fromSAN(board, san, codes=None):
+    """The legal move (packed) on board written as san; codes are the legal
+    moves, if already known."""
+    if codes is None:
+        codes = Rules.Suicide().getAllValidCodes(board, board.sideToMove)
+    text = san.rstrip("+#!?")
+    match = COORDINATES.match(text)
+    if match is not None:
+        origin, target, promotion = match.groups()
+        code = Move.pack(Move.SQUARES[origin], Move.SQUARES[target], PIECE_LETTERS.index(promotion or "P"))
+        found = [c for c in codes if c & Move.MOVE_MASK==code]
+    else:
+        match = SAN.match(text)
+        if match is None:
+            raise PGNError("Bad move: " + san)
+        letter, col, row, capture, target, promotion = match.groups()
+        kind = PIECE_LETTERS.index(letter or "P")
+        to = Move.SQUARES[target]
+        promotion = PIECE_LETTERS.index(promotion or "P")
+        found = []
+        for code in codes:
+            fr = code & 63
+            if (code >> Move.TO_SHIFT & 63==to and board.pieces[fr].kind==kind
+                    and code >> Move.PROMOTION_SHIFT & 7==promotion
+                    and (col is None or Move.colNotation[fr%8]==col)
+                    and (row is None or Move.rowNotation[fr/8]==row)):
+                found.append(code)
+    if not len(found)==1:
+        raise PGNError("%s move: %s in %s" % ("Illegal" if len(found)==0 else "Ambiguous", san, board.getFEN()))
+    return found[0]
+
+def formatGame(tags, codes, score, fen=None):
+    """A game as PGN text; tags are (key, value) pairs, score is White's (1,
+    0.5, 0, or None if unfinished) and fen the starting position if not the
+    usual one."""
+    result = "*" if score is None else Book.resultText(score)
+    tags = list(tags)
+    if fen is not None and not fen==Board.START_FEN:
+        tags += [("SetUp", "1"), ("FEN", fen)]
+    lines = ['[%s "%s"]' % (key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in tags]
+    lines += ['[Result "%s"]' % result, ""]
+    rules = Rules.Suicide()
+    board = Board.Board()
+    if fen is not None:
+        board.setFEN(fen)
+    words = []
+    for i, code in enumerate(codes):
+        if board.sideToMove==0:
+            words.append("%d." % board.fullmoveNumber)
+        elif i==0:
+            words.append("%d..." % board.fullmoveNumber)
+        words.append(toSAN(board, code, rules.getAllValidCodes(board, board.sideToMove)))
+        board.makeMove(code)
+    words.append(result)
+    line = ""
+    for word in words:
+        if len(line) + len(word) >= 80:
+            lines.append(line)
+            line = ""
+        line = (line + " " + word).strip()
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
+
+def readRecords(source):
+    """Generate (tags, movetext) for each game in source (a filename, or an
+    open file or other iterable of lines), reading one game at a time. tags
+    is a list of (key, value) pairs; a bad tag line is kept as (None, line),
+    for parseRecord to reject along with the rest of its game."""
+    opened = isinstance(source, basestring)
+    if opened:
+        source = open(source)
+    try:
+        tags = []
+        movetext = []
+        # Inside a {} comment which carries on to the next line
+        inComment = False
+        # A blank line after the tags: more tags start a new game, even with no moves
+        tagsEnded = False
+        for line in source:
+            line = line.strip()
+            if inComment:
+                movetext.append(line)
+                inComment = not "}" in line or line.rfind("{") > line.rfind("}")
+            elif line.startswith("%"):
+                continue
+            elif line.startswith("["):
+                if movetext or tagsEnded:
+                    yield tags, "\n".join(movetext)
+                    tags, movetext = [], []
+                    tagsEnded = False
+                match = TAG.match(line)
+                if match is None:
+                    tags.append( (None, line) )
+                else:
+                    tags.append( (match.group(1), re.sub(r"\\(.)", r"\1", match.group(2))) )
+            elif line:
+                movetext.append(line)
+                inComment = line.rfind("{") > line.rfind("}")
+            elif movetext:
+                # A blank line ends the moves
+                yield tags, "\n".join(movetext)
+                tags, movetext = [], []
+                tagsEnded = False
+            elif tags:
+                tagsEnded = True
+        if tags or movetext:
+            yield tags, "\n".join(movetext)
+    finally:
+        # Also when the caller stops early
+        if opened:
+            source.close()
+
+def parseRecord(record):
+    """Game dict (tags, codes, score, fen) from a (tags, movetext) record."""
+    tags, movetext = record
+    for key, value in tags:
+        if key is None:
+            raise PGNError("Bad tag: " + value)
+    tagDict = dict(tags)
+    fen = tagDict.get("FEN", Board.START_FEN)
+    rules = Rules.Suicide()
+    board = Board.Board()
+    try:
+        board.setFEN(fen)
+    except Board.FENError:
+        raise PGNError("Bad FEN tag: " + fen)
+    codes = []
+    score = RESULTS.get(tagDict.get("Result"))
+    depth = 0
+    for token in TOKEN.findall(movetext):
+        if token=="(":
+            depth += 1
+        elif token==")":
+            depth -= 1
+        elif depth > 0 or token[0] in "{;$" or token[0].isdigit() and token.endswith("."):
+            continue
+        elif token in RESULTS:
+            score = RESULTS[token]
+        elif not token=="e.p.":
+            code = fromSAN(board, token, rules.getAllValidCodes(board, board.sideToMove))
+            codes.append(code)
+            board.makeMove(code)
+    return dict(tags=tags, codes=codes, score=score, fen=fen)
+
+def parseTask(task):
+    # (record, skipErrors) -> game dict, or None for a bad game when skipping errors
+    record, skipErrors = task
+    try:
+        return parseRecord(record)
+    except PGNError:
+        if not skipErrors:
+            raise
+        return None
+
+def batches(records, size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch)==size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def readGames(source, workers=1, skipErrors=False, batchSize=BATCH_SIZE):
+    """Generate a game dict (see parseRecord) for each game in source, in
+    order. With several workers, moves are parsed in other processes, a batch
+    of games at a time. Bad games raise PGNError, or are left out if
+    skipErrors."""
+    records = readRecords(source)
+    tasks = ((record, skipErrors) for record in records)
+    pool = None
+    try:
+        if workers <= 1:
+            for task in tasks:
+                game = parseTask(task)
+                if game is not None:
+                    yield game
+            return
+        pool = multiprocessing.Pool(workers)
+        # Parse one batch while the last is being used, so only two are held
+        pending = None
+        for batch in batches(tasks, batchSize):
+            parsing = pool.map_async(parseTask, batch, max(1, len(batch) // (4*workers)))
+            if pending is not None:
+                for game in pending.get():
+                    if game is not None:
+                        yield game
+            pending = parsing
+        if pending is not None:
+            for game in pending.get():
+                if game is not None:
+                    yield game
+    finally:
+        records.close()
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+
+def main():
+    parser = OptionParser(usage="python -m antichess.PGN [options] PGNFILE")
+    parser.add_option("-j", "--workers", type="int", dest="workers", default=1,
+                      help="parse games in N processes", metavar="N")
+    parser.add_option("--skip-errors", action="store_true", dest="skipErrors", default=False,
+                      help="leave out games with bad moves instead of stopping")
+    parser.add_option("--archive", dest="archive", default=None,
+                      help="write the games to the binary archive FILE (see antichess.Archive)", metavar="FILE")
+    parser.add_option("--save-games", dest="saveGames", default=None,
+                      help="append the games from the starting position to FILE as lines for antichess.Book", metavar="FILE")
+    (options, args) = parser.parse_args()
+    if not len(args)==1:
+        parser.error("need a PGN file")
+
+    archive = saved = None
+    if options.archive is not None:
+        archive = Archive.ArchiveWriter(options.archive)
+    if options.saveGames is not None:
+        saved = open(options.saveGames, "a")
+    startTime = time.time()
+    games = plies = 0
+    try:
+        for game in readGames(args[0], options.workers, options.skipErrors):
+            games += 1
+            plies += len(game["codes"])
+            # Unfinished games have no result to keep
+            if game["score"] is None:
+                continue
+            if archive is not None:
+                archive.addGame(game["codes"], game["score"], game["fen"])
+            if saved is not None and game["fen"]==Board.START_FEN:
+                saved.write(Book.formatGame(game["codes"], game["score"]) + "\n")
+    finally:
+        if archive is not None:
+            archive.close()
+        if saved is not None:
+            saved.close()
+    elapsed = max(time.time() - startTime, 1e-6)
+    print "%d games, %d plies in %.1fs (%.0f games/s)" % (games, plies, elapsed, games / elapsed)
+
+if __name__=="__main__":
+    main()
@@ -1,4 +1,5 @@
 import Move
+import Attacks
 
 import sys
 class bcolours:
@@ -31,14 +32,23 @@ class bcolours:
     BGCOLOUR = [BG_DEFAULT, BG_DARKGRAY]
     BGCOLOURALT = [BG_DEFAULT, BG_DARKGRAY]
 
-class Piece:
-	colour = None
+# Piece types, used to index the per-type bitboards in Board
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+class Piece(object):
+	# Pieces are immutable: the only per-instance state is the colour, and
+	# everything in the package uses the shared instances in PIECES.
+	__slots__ = ('colour',)
+	kind = None
 	symbol = None
 	altsymbol = None
-	def __init__(self, col, sym, alt=u'\u2656'):
-		self.colour = col
-		self.symbol = sym
-		self.altsymbol = alt
+	def __init__(self, col):
+		object.__setattr__(self, 'colour', col)
+	def __setattr__(self, name, value):
+		raise AttributeError("Pieces are immutable")
+	def __reduce__(self):
+		# Unpickle to the shared instance
+		return (getPiece, (self.kind, self.colour))
 	def displayAsText(self, alt=False):
 		if alt:
 			print bcolours.PIECECOLOURALT[self.colour] + self.symbol + bcolours.ENDC,
@@ -54,8 +64,10 @@ class Piece:
 #NOTE: canMakeMove ignores whether or not there are pieces in the way
 
 class Pawn(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "p", u'\u2659')
+	__slots__ = ()
+	kind = PAWN
+	symbol = "p"
+	altsymbol = u'\u2659'
 
         def getPlausibleMoves(self, fr):
                 # Ignoring promotion but including double move
@@ -74,14 +86,10 @@ class Pawn(Piece):
 		if self.colour==0:
                         # En passant check:
                         if abs(to[1]-fr[1])==1 and to[0]==2 and fr[0]==3:
-                                # Last move was pawn push
-                                if len(board.doublePawnPush)>0 and board.doublePawnPush[-1]:
-		                        [move, _] = board.movesMade[-1]
-                                        _, lastMoveTo = move.unpack()
-                                        piece = board.pieces[lastMoveTo]
-                                        # Last moved piece was black pawn which started in correct place
-                                        # (already know it's double pawn push)
-                                        if isinstance(piece, Pawn) and piece.colour==1 and move.fr[0]==1 and move.fr[1]==to[1]:
+                                # A black pawn has just passed over the target square
+                                if board.enpassant==to[0]*8+to[1]:
+                                        piece = board.pieces[board.enpassant+8]
+                                        if isinstance(piece, Pawn) and piece.colour==1:
                                                 return True
 			# First check for captures:
 			if abs(to[1]-fr[1])==1 and to[0]==fr[0]-1:
@@ -108,14 +116,10 @@ class Pawn(Piece):
 		else:
                         # En passant check:
                         if abs(to[1]-fr[1])==1 and to[0]==5 and fr[0]==4:
-                                # Last move was pawn push
-                                if len(board.doublePawnPush)>0 and board.doublePawnPush[-1]:
-		                        [move, _] = board.movesMade[-1]
-                                        _, lastMoveTo = move.unpack()
-                                        piece = board.pieces[lastMoveTo]
-                                        # Last moved piece was white pawn which started in correct place
-                                        # (already know it's double pawn push)
-                                        if isinstance(piece, Pawn) and piece.colour==0 and move.fr[0]==6 and move.fr[1]==to[1]:
+                                # A white pawn has just passed over the target square
+                                if board.enpassant==to[0]*8+to[1]:
+                                        piece = board.pieces[board.enpassant-8]
+                                        if isinstance(piece, Pawn) and piece.colour==0:
                                                 return True
 			# First check for captures:
 			if abs(to[1]-fr[1])==1 and to[0]==fr[0]+1:
@@ -142,26 +146,24 @@ class Pawn(Piece):
 
 
 class King(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "K", u'\u2654')
+	__slots__ = ()
+	kind = KING
+	symbol = "K"
+	altsymbol = u'\u2654'
         def getPlausibleMoves(self, fr):
-                moves = []
-                for row in [fr[0]-1, fr[0], fr[0]+1]:
-                        for col in [fr[1]-1, fr[1], fr[1]+1]:
-                                if not (row==fr[0] and col==fr[1]): moves.append([row,col])
-                return moves
-
+                return [[to/8, to%8] for to in Attacks.KING_TARGETS[fr[0]*8 + fr[1]]]
 	def canMakeMove(self, board, move):
 		fr, to = move[0], move[1]
 		return ( abs(fr[0]-to[0]) <= 1 and abs(fr[1]-to[1]) <= 1 )
 
 class Queen(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "Q", u'\u2655')
+	__slots__ = ()
+	kind = QUEEN
+	symbol = "Q"
+	altsymbol = u'\u2655'
         def getPlausibleMoves(self, fr):
-                movesRook = Rook(self.colour).getPlausibleMoves(fr)
-                movesBishop = Bishop(self.colour).getPlausibleMoves(fr)
-                return movesRook + movesBishop
+                square = fr[0]*8 + fr[1]
+                return [[to/8, to%8] for to in Attacks.ROOK_TARGETS[square] + Attacks.BISHOP_TARGETS[square]]
 	def canMakeMove(self, board, move):
 		fr, to = move[0], move[1]
 		if (fr[1]==to[1] or fr[0]==to[0]):
@@ -172,82 +174,42 @@ class Queen(Piece):
 			return False
 
 class Rook(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "R", u'\u2656')
+	__slots__ = ()
+	kind = ROOK
+	symbol = "R"
+	altsymbol = u'\u2656'
         def getPlausibleMoves(self, fr):
-                moves = []
-                for col in range(0,8):
-                    moves.append([fr[0], col])
-                for row in range(0,8):
-                    moves.append([row, fr[1]])
-                return moves
+                return [[to/8, to%8] for to in Attacks.ROOK_TARGETS[fr[0]*8 + fr[1]]]
 	def canMakeMove(self,board, move):
 		fr, to = move[0], move[1]
 		return (fr[1]==to[1] or fr[0]==to[0])
 
 class Knight(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "N", u'\u2658')
+	__slots__ = ()
+	kind = KNIGHT
+	symbol = "N"
+	altsymbol = u'\u2658'
         def getPlausibleMoves(self, fr):
-                moves = []
-                r,c = fr[0], fr[1]
-                # Left
-                if c>1:
-                    if r>0:
-                        moves.append([r-1,c-2])
-                    if r<7:
-                        moves.append([r+1,c-2])
-                # Right
-                if c<6:
-                    if r>0:
-                        moves.append([r-1,c+2])
-                    if r<7:
-                        moves.append([r+1,c+2])
-                # Up
-                if r>1:
-                    if c>0:
-                        moves.append([r-2,c-1])
-                    if c<7:
-                        moves.append([r-2,c+1])
-                # Down
-                if r<6:
-                    if c>0:
-                        moves.append([r+2,c-1])
-                    if c<7:
-                        moves.append([r+2,c+1])
-                return moves
+                return [[to/8, to%8] for to in Attacks.KNIGHT_TARGETS[fr[0]*8 + fr[1]]]
 	def canMakeMove(self,board, move):
 		fr, to = move[0], move[1]
 		return ( abs(fr[0]-to[0])==2 and abs(fr[1]-to[1])==1 ) or ( abs(fr[1]-to[1])==2 and abs(fr[0]-to[0])==1 )
 
 class Bishop(Piece):
-	def __init__(self, col):
-		Piece.__init__(self, col, "B", u'\u2657')
+	__slots__ = ()
+	kind = BISHOP
+	symbol = "B"
+	altsymbol = u'\u2657'
         def getPlausibleMoves(self, fr):
-                moves = []
-                r,c = fr[0], fr[1]
-                while r<7 and c<7:
-                    r = r+1
-                    c = c+1
-                    moves.append([r,c])
-                r,c = fr[0], fr[1]
-                while r>=1 and c>=1:
-                    r = r-1
-                    c = c-1
-                    moves.append([r,c])
-                r,c = fr[0], fr[1]
-                while r>=1 and c<7:
-                    r = r-1
-                    c = c+1
-                    moves.append([r,c])
-                r,c = fr[0], fr[1]
-                while r<7 and c>=1:
-                    r = r+1
-                    c = c-1
-                    moves.append([r,c])
-                return moves
+                return [[to/8, to%8] for to in Attacks.BISHOP_TARGETS[fr[0]*8 + fr[1]]]
 	def canMakeMove(self,board, move):
 		fr, to = move[0], move[1]
 		return ( abs(fr[0]-to[0]) == abs(fr[1]-to[1]) )
 
+# Shared instances, PIECES[colour][kind]
+PIECES = [ [Pawn(colour), Knight(colour), Bishop(colour), Rook(colour), Queen(colour), King(colour)] for colour in [0, 1] ]
+# Pieces a pawn can promote to, in the order promotion moves are generated
+PROMOTIONS = [ [PIECES[colour][kind] for kind in [QUEEN, ROOK, KNIGHT, BISHOP, KING]] for colour in [0, 1] ]
 
+def getPiece(kind, colour):
+	return PIECES[colour][kind]
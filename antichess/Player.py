@@ -2,10 +2,25 @@ import Board
 import Rules
 import Move
 import Pieces
+import Transposition
+import Ordering
+import Stats
+import TimeManager
+import Tablebase
+import Book
 		
 import random
 import sys
 import time
+import multiprocessing
+
+# alphabeta looks at the clock once every this many nodes
+TIME_CHECK_NODES = 64
+# Default node budget for the quiescence search from each leaf
+QUIESCENCE_NODES = 32
+# Lazy SMP helpers are started at this depth: shallower iterations are quicker
+# than handing out the work
+SMP_MIN_DEPTH = 3
 
 class Player:
 	colour = None
@@ -85,52 +100,142 @@ class AIPlayer(Player):
 	name = "AI"
 	maxDepth = 0
 	INFINITY = 999999
-	def __init__(self, col, maxDepth=1, verbose=False, rules=Rules.Suicide()):
+	def __init__(self, col, maxDepth=1, verbose=False, rules=Rules.Suicide(), hashMB=16, workers=1, lazySMP=False, quiet=False, statsFile=None, quiescenceNodes=None, tablebaseDir=None, bookFile=None):
 		Player.__init__(self, col, rules)
 		self.maxDepth = maxDepth
                 self.verbose = verbose
+                # Don't print progress dots
+                self.quiet = quiet
+                self.hashMB = hashMB
+                # With more than one worker, root moves are searched in a process pool,
+                # or with lazySMP all workers search the whole tree through a shared table
+                self.workers = workers
+                self.lazySMP = lazySMP and workers>1
+                self.tt = Transposition.TranspositionTable(hashMB, shared=self.lazySMP)
+                # Set to make lazy SMP helpers abandon their search
+                self.stopFlag = None
+                # Lazy SMP helpers' searches, while they run
+                self.helpers = None
+                if self.lazySMP:
+                        self.stopFlag = multiprocessing.RawValue('i', 0)
+                self.pool = None
+                self.searchId = 0
+                self.orderer = Ordering.MoveOrderer()
+                # Number of alphabeta calls made by the last getMove (and by lazy SMP helpers)
+                self.nodes = 0
+                self.helperNodes = 0
+                self.rootPly = 0
+                # Statistics for the last getMove, also appended to statsFile (JSON lines) if set
+                self.stats = Stats.SearchStats()
+                self.statsFile = statsFile
+                self.lastRecord = None
+                # Called with the statistics of each completed iteration, if set
+                self.onIteration = None
+                self.timer = TimeManager.TimeManager()
+                # Most nodes searched past the horizon from each leaf (0 turns quiescence off)
+                if quiescenceNodes is None:
+                        quiescenceNodes = QUIESCENCE_NODES
+                self.quiescenceNodes = quiescenceNodes
+                # Endgame tablebases probed during the search, if any
+                self.tablebaseDir = tablebaseDir
+                self.tablebases = None
+                if tablebaseDir is not None:
+                        self.tablebases = Tablebase.Tablebases(tablebaseDir)
+                # Opening book, played from without searching
+                self.book = None
+                if bookFile is not None:
+                        self.book = Book.OpeningBook(bookFile)
 		random.seed()
         
         def getMove(self, board, maxTime):
-                startTime = time.time()
-                # Be conservative with time
-                # TODO enforce this exactly
-                maxTime = maxTime * 0.95
-		validMoves, isCapture = self.rules.getAllValidMoves(board, self.colour)
+                self.timer.start(maxTime)
+                self.tt.newSearch()
+                self.orderer.newSearch()
+                self.nodes = 0
+                self.helperNodes = 0
+                self.rootPly = len(board.movesMade)
+                self.searchId += 1
+                self.stats.newSearch()
+                fen = board.getFEN()
+		# The search works on packed moves
+		validMoves = list(self.rules.getAllValidCodes(board, self.colour))
+		# Shuffle so that equally good moves are chosen at random
 		random.shuffle(validMoves)
-		#NOTE: isCapture is now out of order
 		if len(validMoves)==0:
 			return Move.PASS
 		if len(validMoves)==1:
-			return validMoves[0]
+			return self.finishSearch(fen, validMoves[0], None)
+		# The book is keyed on the hash, which covers board.sideToMove
+		if self.book is not None and board.sideToMove==self.colour:
+			code = self.book.chooseMove(board, validMoves)
+			if code is not None:
+				if self.verbose: print "Book move", Move.Move.fromCode(code)
+				return self.finishSearch(fen, code, None, book=True)
 
 		overallBestScore, overallBestMove = -self.INFINITY, validMoves[0]
 
                 for depth in range(0,self.maxDepth):
+                    # Don't start an iteration which is not expected to finish in time
+                    if depth>0 and not self.timer.canStartIteration():
+                        if self.verbose: print "Not enough time for depth", depth
+                        break
                     if self.verbose: 
                         print "At depth ", depth
-                    else:
+                    elif not self.quiet:
                         sys.stdout.write(".")
-                    bestScore, bestMove = self.getMoveToDepth(board, maxTime, startTime, validMoves, depth)
+                    # Best move so far is searched first
+                    if depth==0:
+                        ttMove = 0
+                    else:
+                        ttMove = Transposition.packMove(overallBestMove)
+                    validMoves = self.orderer.orderMoves(board, validMoves, self.colour, 0, ttMove)
+                    self.stats.startIteration(self.nodes)
+                    if self.lazySMP and depth==SMP_MIN_DEPTH:
+                        self.startHelpers(board, depth)
+                    if self.workers>1 and not self.lazySMP:
+                        bestScore, bestMove = self.getMoveToDepthParallel(board, validMoves, depth)
+                    else:
+                        bestScore, bestMove = self.getMoveToDepth(board, validMoves, depth)
+                    # An unfinished iteration only has scores for some moves: drop it
+                    if self.timer.aborted:
+                        if self.verbose: print "Ran out of time at depth", depth
+                        break
                     # Less than or equals means deeper moves at same score will supersede
                     if bestScore>=overallBestScore:
                         overallBestMove = bestMove
                         overallBestScore = bestScore
-                        if self.verbose: print "Changing best move to ", overallBestMove
-                    if time.time()-startTime > maxTime:
-                        break
+                        if self.verbose: print "Changing best move to ", Move.Move.fromCode(overallBestMove)
+                    if self.verbose: print "Searched %d nodes" % self.nodes
+                    self.stats.endIteration(depth, self.nodes, bestScore, str(Move.Move.fromCode(bestMove)))
+                    self.timer.iterationDone(self.stats.iterations[-1]["time"])
+                    if self.onIteration is not None:
+                        self.onIteration(self.stats.iterations[-1])
                 # TODO give more weight to deeper evaluations
                 # TODO overwrite shallow scores with deeper scores - otherwise might make a move which looks good at shallow depth but not at deeper depth
+		self.stopHelpers()
+
+		return self.finishSearch(fen, overallBestMove, overallBestScore)
 
-		return overallBestMove
+	def finishSearch(self, fen, code, score, book=False):
+		# Record the statistics for the move chosen, and return it
+		move = Move.Move.fromCode(code)
+		self.lastRecord = self.stats.record(self.nodes, helperNodes=self.helperNodes, fen=fen,
+		                                    move=str(move), score=score, workers=self.workers, book=book)
+		if self.verbose:
+			print Stats.summary(self.lastRecord)
+		if self.statsFile is not None:
+			Stats.appendRecord(self.statsFile, self.lastRecord)
+		return move
 
-	def getMoveToDepth(self, board, maxTime, startTime, validMoves, depth):
+	def getMoveToDepth(self, board, validMoves, depth):
+		# Search each root move to depth. If the time runs out part way through,
+		# timer.aborted is set and the result must not be used.
 		bestScore, bestMove = -self.INFINITY, validMoves[0]
 		counter=0
 
 		for move in validMoves:
                         if self.verbose:
-                                print move.__str__()+" ",
+                                print str(Move.Move.fromCode(move))+" ",
 			        done = counter/float(len(validMoves)) * 100
 			        sys.stdout.write( "%d%% " % done )
 			        sys.stdout.flush()
@@ -140,11 +245,11 @@ class AIPlayer(Player):
 			#board.makeMove(  [8*fr[0]+fr[1], 8*to[0]+to[1]]  )
 			board.makeMove( move )
 			#score = -self.minimax(board, self.maxDepth, 1-self.colour) #works
-			score = -self.alphabeta(board, depth, -self.INFINITY, self.INFINITY, 1-self.colour, startTime, maxTime)
+			# Moves which can't beat the best so far only need to be proved no better
+			score = -self.alphabeta(board, depth, -self.INFINITY, -bestScore, 1-self.colour)
 			board.retractMove()
                         # Check time - if overtime, ignore this move
-                        elapsedTime = time.time() - startTime
-                        if elapsedTime>maxTime:
+                        if self.outOfTime():
                             if self.verbose: print "Ran out of time."
                             break
                         if self.verbose: print "score=%d" % score
@@ -153,14 +258,78 @@ class AIPlayer(Player):
 				bestScore, bestMove = score, move
 			if bestScore==self.INFINITY:
 				break
-                if self.verbose: print "Best score is",bestScore,"for move",bestMove
+                if self.verbose: print "Best score is",bestScore,"for move",Move.Move.fromCode(bestMove)
 
 		#fr = bestMove[0]
 		#to = bestMove[1]
 		#return [ 8*fr[0] + fr[1], 8*to[0]+to[1] ]
 		return bestScore, bestMove
 
-	def heuristic(self, board, colour, validMoves, isCapture):
+	def startWorkers(self):
+		"""Start the worker processes, if any and not already running. They
+		start when first needed otherwise."""
+		if self.pool is not None:
+			return
+		if self.lazySMP:
+			self.pool = multiprocessing.Pool(self.workers-1, initSMPWorker, (self.tt, self.stopFlag, self.quiescenceNodes, self.tablebaseDir))
+		elif self.workers>1:
+			self.pool = multiprocessing.Pool(self.workers, initSearchWorker, (self.hashMB, self.quiescenceNodes, self.tablebaseDir))
+
+	def getMoveToDepthParallel(self, board, validMoves, depth):
+		# As getMoveToDepth, but the root moves are shared out between the pool processes
+		self.startWorkers()
+		fen = board.getFEN()
+		# Deal the ordered moves out in turn so that every worker gets some of the good ones.
+		# Packed moves mean the same in the worker's copy of the position.
+		tasks = []
+		for w in range(self.workers):
+			if len(validMoves[w::self.workers])>0:
+				tasks.append( (fen, self.colour, validMoves[w::self.workers], depth, self.timer.startTime, self.timer.deadline, self.searchId) )
+		bestScore, bestMove, bestIndex = -self.INFINITY, validMoves[0], len(validMoves)
+		for score, move, nodes, aborted in self.pool.map(searchWorker, tasks, chunksize=1):
+			self.nodes += nodes
+			if aborted:
+				self.timer.abort()
+			# Equal scores go to the move which comes first, as in the serial search
+			index = validMoves.index(move)
+			if score > bestScore or (score==bestScore and index < bestIndex):
+				bestScore, bestMove, bestIndex = score, move, index
+                if self.verbose: print "Best score is",bestScore,"for move",Move.Move.fromCode(bestMove)
+		return bestScore, bestMove
+
+	def startHelpers(self, board, depth):
+		# Lazy SMP: helper processes deepen their own searches of the position from
+		# depth, half of them a ply ahead and each in its own root order, filling
+		# the shared hash table until stopHelpers. This process does the search
+		# whose result is used.
+		self.startWorkers()
+		fen = board.getFEN()
+		tasks = []
+		for w in range(1, self.workers):
+			tasks.append( (fen, self.colour, depth + w%2, self.maxDepth, self.timer.startTime, self.timer.deadline, self.searchId, self.tt.age, random.random()) )
+		self.helpers = self.pool.map_async(smpWorker, tasks, chunksize=1)
+
+	def stopHelpers(self):
+		if self.helpers is None:
+			return
+		self.stopFlag.value = 1
+		self.helperNodes += sum(self.helpers.get())
+		self.stopFlag.value = 0
+		self.helpers = None
+
+	def outOfTime(self):
+		# Sets timer.aborted if the deadline has passed or lazy SMP helpers are told to stop
+		if self.stopFlag is not None and self.stopFlag.value==1:
+			self.timer.abort()
+		return self.timer.expired()
+
+	def close(self):
+		"""Shut down the worker processes, if any."""
+		if self.pool is not None:
+			self.pool.terminate()
+			self.pool = None
+
+	def heuristic(self, board, colour, validMoves):
 		n_me = board.getNumPieces(colour)
 		n_him = board.getNumPieces(1-colour)
 
@@ -178,7 +347,10 @@ class AIPlayer(Player):
 
                 # Prefer either no captures or lots of capture choices
                 # TODO just prefer more available moves in general?
-                num_captures = sum(isCapture)
+                num_captures = 0
+                for code in validMoves:
+                        if code & Move.CAPTURE:
+                                num_captures += 1
                 if num_captures==0:
                     freedom_score = 3
                 elif num_captures==1:
@@ -188,10 +360,19 @@ class AIPlayer(Player):
 
 		return material_score + freedom_score
 
+	def tablebaseScore(self, entry):
+		# Quicker wins (and slower losses) score better, all beyond the heuristic
+		result, distance = entry
+		if result==Tablebase.WIN:
+			return self.INFINITY - 1 - distance
+		if result==Tablebase.LOSS:
+			return -(self.INFINITY - 1 - distance)
+		return 0
+
 	def minimax(self, board, depth, colour):
-		validMoves, isCapture = self.rules.getAllValidMoves(board, colour)
+		validMoves = self.rules.getAllValidCodes(board, colour)
 		if len(validMoves)==0 or depth <= 0:
-			return self.heuristic(board, colour)
+			return self.heuristic(board, colour, validMoves)
 		a = -self.INFINITY
 		for move in validMoves:
 			#fr = move[0]
@@ -201,33 +382,155 @@ class AIPlayer(Player):
 			a = max(a, -self.minimax(board, depth-1, 1-colour))
 			board.retractMove()
 
-	def alphabeta(self, board, depth, a, b, colour, startTime, maxTime):
-		validMoves, isCapture = self.rules.getAllValidMoves(board, colour)
-		# if there are fewer than N captures, keep looking...
-		#if 0 < sum(isCapture) < 4:
-		#	#print "---Deepening search [", board.getLastMove(), "]",
-		#	#sys.stdout.flush()
-		#	depth += 1
-		if len(validMoves)==0 or depth <= 0:
-			return self.heuristic(board, colour, validMoves, isCapture)
+	def quiesce(self, board, a, b, colour, validMoves, budget):
+		# Captures are compulsory, so while colour must capture (or has only one
+		# move) there is no choice of standing pat: search every move. A quiet
+		# position, or running out of budget, ends the line with the heuristic.
+		# Each node spends one unit of budget and shares the rest equally between
+		# its moves, which bounds the nodes searched and keeps the score the same
+		# whatever the window or move order.
+		if len(validMoves)==0 or budget < 1 or not (len(validMoves)==1 or validMoves[0] & Move.CAPTURE):
+			return self.heuristic(board, colour, validMoves)
+		self.stats.qnodes += 1
+		if self.stats.qnodes % TIME_CHECK_NODES==0:
+			self.outOfTime()
+		if self.timer.aborted:
+			return 0
+		childBudget = (budget - 1) // len(validMoves)
 		for move in validMoves:
-			#print " "*(self.maxDepth - depth), move
-#			fr = move[0]
-#			to = move[1]
-#			board.makeMove(  [8*fr[0]+fr[1], 8*to[0]+to[1]]  )
 			board.makeMove( move )
-			a = max(a, -self.alphabeta(board, depth-1, -b, -a, 1-colour, startTime, maxTime))
+			replies = self.rules.getAllValidCodes(board, 1-colour)
+			score = -self.quiesce(board, -b, -a, 1-colour, replies, childBudget)
 			board.retractMove()
+			if self.timer.aborted:
+				return 0
+			if score > a:
+				a = score
 			if b <= a:
+				break
+		return a
+
+	def alphabeta(self, board, depth, a, b, colour):
+		# The return value is meaningless once timer.aborted is set
+		self.nodes += 1
+		if self.nodes % TIME_CHECK_NODES==0:
+			self.outOfTime()
+		if self.timer.aborted:
+			return 0
+		if self.tablebases is not None and board.getNumPieces(0) + board.getNumPieces(1) <= self.tablebases.maxPieces:
+			# The search's colour, which may differ from board.sideToMove
+			entry = self.tablebases.probe(board, colour)
+			if entry is not None:
+				self.stats.tbHits += 1
+				return self.tablebaseScore(entry)
+		validMoves = self.rules.getAllValidCodes(board, colour)
+		if len(validMoves)==0:
+			return self.heuristic(board, colour, validMoves)
+		if depth <= 0:
+			# Forced lines are followed past the horizon
+			return self.quiesce(board, a, b, colour, validMoves, self.quiescenceNodes)
+
+		# Only results searched to exactly this depth are reused, so scores are the
+		# same as without the table. Any stored best move is still searched first.
+		key = board.hash
+		ttMove = 0
+		entry = self.tt.probe(key)
+		self.stats.ttProbes += 1
+		if entry is not None:
+			self.stats.ttHits += 1
+			ttDepth, ttScore, ttBound, ttMove = entry
+			if ttDepth==depth:
+				if ttBound==Transposition.EXACT:
+					return max(a, ttScore)
+				if ttBound==Transposition.LOWER and ttScore >= b:
+					return ttScore
+				if ttBound==Transposition.UPPER and ttScore <= a:
+					return a
+
+		ply = len(board.movesMade) - self.rootPly
+		validMoves = self.orderer.orderMoves(board, validMoves, colour, ply, ttMove)
+		alphaOrig = a
+		bestMove = validMoves[0]
+		for i, move in enumerate(validMoves):
+			board.makeMove( move )
+			score = -self.alphabeta(board, depth-1, -b, -a, 1-colour)
+			board.retractMove()
+			if self.timer.aborted:
+				return 0
+			if score > a:
+				a, bestMove = score, move
+			if b <= a:
+				self.stats.cutoffs += 1
+				if i==0:
+					self.stats.firstMoveCutoffs += 1
+				self.orderer.recordCutoff(move, colour, ply, depth)
 				break	
-                        # Check time
-                        elapsedTime = time.time() - startTime
-                        if elapsedTime>maxTime:
-                            return 0 # Will be ignored
 
+		# Only reached if the search was not aborted, so the result is sound
+		if a <= alphaOrig:
+			bound = Transposition.UPPER
+		elif a >= b:
+			bound = Transposition.LOWER
+		else:
+			bound = Transposition.EXACT
+		self.tt.store(key, depth, a, bound, Transposition.packMove(bestMove))
 		return a
 
-	
-		
-		
-		 
+
+# Pool processes used by AIPlayer.getMoveToDepthParallel. Each one keeps its own
+# board and AIPlayer, so its transposition table carries over between searches.
+searchWorkerState = {}
+
+def initSearchWorker(hashMB, quiescenceNodes, tablebaseDir):
+	searchWorkerState["board"] = Board.Board()
+	searchWorkerState["ai"] = AIPlayer(0, hashMB=hashMB, quiescenceNodes=quiescenceNodes, tablebaseDir=tablebaseDir)
+	searchWorkerState["searchId"] = None
+
+def searchWorker(task):
+	fen, colour, moves, depth, startTime, deadline, searchId = task
+	board = searchWorkerState["board"]
+	ai = searchWorkerState["ai"]
+	if not searchId==searchWorkerState["searchId"]:
+		searchWorkerState["searchId"] = searchId
+		ai.tt.newSearch()
+		ai.orderer.newSearch()
+	board.setFEN(fen)
+	ai.colour = colour
+	ai.rootPly = len(board.movesMade)
+	ai.nodes = 0
+	ai.timer.startUntil(startTime, deadline)
+	bestScore, bestMove = ai.getMoveToDepth(board, moves, depth)
+	return bestScore, bestMove, ai.nodes, ai.timer.aborted
+
+
+# Pool processes used by AIPlayer.startHelpers. The table and stop flag are
+# in shared memory, inherited from the main process when the pool forks.
+def initSMPWorker(tt, stopFlag, quiescenceNodes, tablebaseDir):
+	searchWorkerState["board"] = Board.Board()
+	ai = AIPlayer(0, quiet=True, hashMB=0, quiescenceNodes=quiescenceNodes, tablebaseDir=tablebaseDir)
+	ai.tt = tt
+	ai.stopFlag = stopFlag
+	searchWorkerState["ai"] = ai
+	searchWorkerState["searchId"] = None
+
+def smpWorker(task):
+	fen, colour, firstDepth, maxDepth, startTime, deadline, searchId, age, seed = task
+	board = searchWorkerState["board"]
+	ai = searchWorkerState["ai"]
+	if not searchId==searchWorkerState["searchId"]:
+		searchWorkerState["searchId"] = searchId
+		ai.orderer.newSearch()
+	ai.tt.age = age
+	board.setFEN(fen)
+	ai.colour = colour
+	ai.rootPly = len(board.movesMade)
+	ai.nodes = 0
+	moves = list(ai.rules.getAllValidCodes(board, colour))
+	random.Random(seed).shuffle(moves)
+	ai.timer.startUntil(startTime, deadline)
+	# Until stopped, or out of time
+	for depth in range(firstDepth, maxDepth):
+		ai.getMoveToDepth(board, moves, depth)
+		if ai.timer.aborted:
+			break
+	return ai.nodes
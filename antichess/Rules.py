@@ -1,6 +1,11 @@
+import array
+
 import Board
 import Pieces
 import Move
+import Bitboard
+import Attacks
+import Sliders
 
 class RulesViolation(Exception):
 	def __init__(self, value):
@@ -58,60 +63,113 @@ class Suicide():
 		return True
 
 	def getValidMoves(self, board, piece, colour, enforceCaptures=True):
-		moves = []
+		codes = array.array(Move.TYPECODE)
 		fr = piece
-                # First, we get a (strictly optimistic) list of plausible places this piece could move to,
-                # ignoring line of sight and promotions.
-                # This is faster than checking validity of all possible moves.
-                destList = board.pieces[fr[0]*8+fr[1]].getPlausibleMoves(fr)
-                for to in destList:
-			m = Move.Move(fr, to)
-			try:
-				self.validate( m, board, colour, enforceCaptures )
-				moves.append( m )
-			except RulesViolation as e:
-				pass
-                # Now consider promotion moves
-		promotionPieces = [Pieces.Queen(colour), Pieces.Rook(colour), Pieces.Knight(colour), Pieces.Bishop(colour), Pieces.King(colour)]
-                if isinstance(board.pieces[fr[0]*8+fr[1]], Pieces.Pawn):
-                        row = fr[0]
-                        if colour==0 and row==1:
-                                for col in [fr[1]-1, fr[1], fr[1]+1]:
-                                        to = [0, col]
-                                        for pp in promotionPieces:
-				                m = Move.PromotionMove(fr, to, pp)
-				                try:
-				                	self.validate( m, board, colour, enforceCaptures )
-				                	moves.append( m )
-				                except RulesViolation as e:
-				                	pass
-                        elif colour==1 and row==6:
-                                for col in [fr[1]-1, fr[1], fr[1]+1]:
-                                        to = [7, col]
-                                        for pp in promotionPieces:
-				                m = Move.PromotionMove(fr, to, pp)
-				                try:
-				                	self.validate( m, board, colour, enforceCaptures )
-				                	moves.append( m )
-				                except RulesViolation as e:
-				                	pass
-		return moves
-
-	def getAllValidMoves(self, board, colour, enforceCaptures=True):
-		validMoves = []
-		isCapture = []
-		# All my pieces
-		pieces = board.getAllPieces(colour)
-		for p in pieces:
-			for m in self.getValidMoves(board, p, colour, enforceCaptures):
-				validMoves.append(m)
-				fr,to = m.unpack()
-				capture = (not board.pieces[to] == None) or m.isEnpassant(board)
-				isCapture.append(capture)
-
-		return validMoves, isCapture
-
-
-
+		self.addPieceMoves(board, fr[0]*8+fr[1], colour, codes)
+		# Only captures are allowed if this side has any capture anywhere on the board
+		if enforceCaptures and board.hasCaptures(colour):
+			codes = [code for code in codes if code & Move.CAPTURE]
+		return [Move.Move.fromCode(code) for code in codes]
+
+	def addPieceMoves(self, board, square, colour, codes):
+		# Pseudo-legal moves of the piece on square, appended to codes as packed
+		# moves with their capture flags. The forced capture rule is not applied here.
+		pieces = board.pieces
+		piece = pieces[square]
+		r, c = square/8, square%8
+		if isinstance(piece, Pieces.Pawn):
+			if colour==0:
+				d, startRow, promotionRow, enpassantRow = -1, 6, 1, 3
+			else:
+				d, startRow, promotionRow, enpassantRow = +1, 1, 6, 4
+			torow = r + d
+			if torow<0 or torow>7:
+				return
+			promotes = (r==promotionRow)
+			targets = []
+			# Pushes
+			if pieces[torow*8+c] == None:
+				targets.append( (c, 0) )
+				if r==startRow and pieces[(r+2*d)*8+c] == None:
+					codes.append( Move.pack(square, square+16*d) )
+			# Captures, including en passant
+			for tocol in (c-1, c+1):
+				if tocol<0 or tocol>7:
+					continue
+				target = pieces[torow*8+tocol]
+				if target == None:
+					if r==enpassantRow and self.canCaptureEnpassant(board, colour, tocol):
+						targets.append( (tocol, Move.CAPTURE | Move.ENPASSANT) )
+				elif not target.colour==colour:
+					targets.append( (tocol, Move.CAPTURE) )
+			for tocol, flags in targets:
+				if promotes:
+					for pp in Pieces.PROMOTIONS[colour]:
+						codes.append( Move.pack(square, torow*8+tocol, pp.kind, flags) )
+				else:
+					codes.append( Move.pack(square, torow*8+tocol, 0, flags) )
+			return
+		if isinstance(piece, Pieces.Knight):
+			targets = Attacks.KNIGHT_TARGETS[square]
+		elif isinstance(piece, Pieces.King):
+			targets = Attacks.KING_TARGETS[square]
+		else:
+			# Sliders: attack sets by table lookup, then split into captures and quiet moves
+			ours = board.occupancy[colour]
+			theirs = board.occupancy[1-colour]
+			occupied = ours | theirs
+			if isinstance(piece, Pieces.Rook):
+				attacks = Sliders.rookAttacks(square, occupied)
+			elif isinstance(piece, Pieces.Bishop):
+				attacks = Sliders.bishopAttacks(square, occupied)
+			else:
+				attacks = Sliders.queenAttacks(square, occupied)
+			for to in Bitboard.toList(attacks & theirs):
+				codes.append( Move.pack(square, to, 0, Move.CAPTURE) )
+			for to in Bitboard.toList(attacks & ~occupied):
+				codes.append( Move.pack(square, to) )
+			return
+		for to in targets:
+			target = pieces[to]
+			if target == None:
+				codes.append( Move.pack(square, to) )
+			elif not target.colour==colour:
+				codes.append( Move.pack(square, to, 0, Move.CAPTURE) )
+
+	def canCaptureEnpassant(self, board, colour, tocol):
+		# An opponent pawn must have just passed over the square on tocol in front of colour's pawns
+		ep = board.enpassant
+		if ep is None or not ep%8==tocol:
+			return False
+		if colour==0:
+			passedRow, offset = 2, +8
+		else:
+			passedRow, offset = 5, -8
+		piece = board.pieces[ep+offset]
+		return ep/8==passedRow and isinstance(piece, Pieces.Pawn) and not piece.colour==colour
+
+	def generateCodes(self, board, colour):
+		# Single pass over colour's pieces: all pseudo-legal moves, packed
+		codes = array.array(Move.TYPECODE)
+		for sq in board.pieceSquares[colour]:
+			self.addPieceMoves(board, sq, colour, codes)
+		return codes
+
+	def getAllValidCodes(self, board, colour, enforceCaptures=True):
+		"""Legal moves for colour as an array of packed moves."""
+		codes = self.generateCodes(board, colour)
+		# Captures are obligatory
+		if enforceCaptures:
+			captures = [code for code in codes if code & Move.CAPTURE]
+			if captures:
+				return array.array(Move.TYPECODE, captures)
+		return codes
 
+	def generateMoves(self, board, colour):
+		# All pseudo-legal moves and their capture flags
+		codes = self.generateCodes(board, colour)
+		return [Move.Move.fromCode(code) for code in codes], [bool(code & Move.CAPTURE) for code in codes]
 
+	def getAllValidMoves(self, board, colour, enforceCaptures=True):
+		codes = self.getAllValidCodes(board, colour, enforceCaptures)
+		return [Move.Move.fromCode(code) for code in codes], [bool(code & Move.CAPTURE) for code in codes]
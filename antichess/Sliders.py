@@ -0,0 +1,119 @@
+# Sliding piece attacks by table lookup. For each square, the occupancy of
+# the squares that can block a rook (or bishop) there indexes a dict holding
+# the attack mask, so an attack set costs one AND and one dict lookup. This
+# plays the role of magic multiplication: the dict is the perfect hash.
+#
+# The tables take a second or so to build, so they are built at first use
+# and cached to disk; later runs load the cache instead.
+
+import marshal
+import os
+import tempfile
+
+import Attacks
+
+# Bump when the table layout changes, so old caches are ignored
+VERSION = 1
+CACHE_DIR = os.environ.get("ANTICHESS_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "antichess"))
+CACHE_FILE = os.path.join(CACHE_DIR, "sliders-%d.marshal" % VERSION)
+
+# ROOK_MASKS[sq]: squares whose occupancy matters for a rook on sq (the rays
+# without their last square, which stops the ray whether occupied or not)
+ROOK_MASKS = [0] * 64
+BISHOP_MASKS = [0] * 64
+# ROOK_TABLE[sq][occupied & ROOK_MASKS[sq]] is the attack mask, filled by load()
+ROOK_TABLE = None
+BISHOP_TABLE = None
+
+def relevantMask(square, directions):
+    mask = 0
+    for d in directions:
+        for sq in Attacks.RAYS[square][d][:-1]:
+            mask |= 1 << sq
+    return mask
+
+for sq in range(64):
+    ROOK_MASKS[sq] = relevantMask(sq, Attacks.ROOK_DIRECTIONS)
+    BISHOP_MASKS[sq] = relevantMask(sq, Attacks.BISHOP_DIRECTIONS)
+
+def rayAttacks(square, occupied, directions):
+    """Attack mask found by walking the rays, stopping at the first blocker."""
+    attacks = 0
+    for d in directions:
+        for sq in Attacks.RAYS[square][d]:
+            attacks |= 1 << sq
+            if occupied >> sq & 1:
+                break
+    return attacks
+
+def buildTable(masks, directions):
+    table = []
+    for sq in range(64):
+        mask = masks[sq]
+        entries = {}
+        # Every subset of mask, by the carry-rippler trick
+        subset = 0
+        while True:
+            entries[subset] = rayAttacks(sq, subset, directions)
+            subset = (subset - mask) & mask
+            if subset==0:
+                break
+        table.append(entries)
+    return table
+
+def readCache(filename):
+    try:
+        f = open(filename, "rb")
+        try:
+            version, rooks, bishops = marshal.load(f)
+        finally:
+            f.close()
+    except (IOError, EOFError, ValueError, TypeError):
+        return None
+    if not version==VERSION or not len(rooks)==64 or not len(bishops)==64:
+        return None
+    return rooks, bishops
+
+def writeCache(filename, rooks, bishops):
+    # Written to a temporary file and renamed, so readers never see a partial cache.
+    # Failing to write (say, a read-only home directory) only costs the rebuild next time.
+    try:
+        directory = os.path.dirname(filename)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        f = os.fdopen(fd, "wb")
+        try:
+            marshal.dump((VERSION, rooks, bishops), f)
+        finally:
+            f.close()
+        os.rename(tmp, filename)
+    except (IOError, OSError):
+        pass
+
+def load(filename=None, useCache=True):
+    """Fill ROOK_TABLE and BISHOP_TABLE from the cache, building (and caching) them if needed."""
+    global ROOK_TABLE, BISHOP_TABLE
+    if filename is None:
+        filename = CACHE_FILE
+    tables = None
+    if useCache:
+        tables = readCache(filename)
+    if tables is None:
+        tables = buildTable(ROOK_MASKS, Attacks.ROOK_DIRECTIONS), buildTable(BISHOP_MASKS, Attacks.BISHOP_DIRECTIONS)
+        if useCache:
+            writeCache(filename, tables[0], tables[1])
+    ROOK_TABLE, BISHOP_TABLE = tables
+
+def rookAttacks(square, occupied):
+    if ROOK_TABLE is None:
+        load()
+    return ROOK_TABLE[square][occupied & ROOK_MASKS[square]]
+
+def bishopAttacks(square, occupied):
+    if BISHOP_TABLE is None:
+        load()
+    return BISHOP_TABLE[square][occupied & BISHOP_MASKS[square]]
+
+def queenAttacks(square, occupied):
+    return rookAttacks(square, occupied) | bishopAttacks(square, occupied)
@@ -0,0 +1,68 @@
+import json
+import time
+
+class SearchStats:
+    """Counters for one AIPlayer.getMove call, summarised by record()."""
+    def __init__(self):
+        self.newSearch()
+
+    def newSearch(self):
+        self.startTime = time.time()
+        self.qnodes = 0
+        # Beta cutoffs, and those caused by the first move searched
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.tbHits = 0
+        # One dict per completed iteration
+        self.iterations = []
+        self.iterationStart = self.startTime
+        self.iterationNodes = 0
+
+    def startIteration(self, nodes):
+        """Mark the start of an iteration; nodes is the node count so far."""
+        self.iterationStart = time.time()
+        self.iterationNodes = nodes
+
+    def endIteration(self, depth, nodes, score, move):
+        self.iterations.append( dict(depth=depth, nodes=nodes - self.iterationNodes,
+                                     time=time.time() - self.iterationStart, score=score, move=move) )
+
+    def branchingFactor(self):
+        """Effective branching factor: node growth from the last iteration to the one before (0 if unknown)."""
+        if len(self.iterations) < 2 or self.iterations[-2]["nodes"]==0:
+            return 0.0
+        return self.iterations[-1]["nodes"] / float(self.iterations[-2]["nodes"])
+
+    def record(self, nodes, **fields):
+        """Summary of the search as a dict; fields (e.g. the move chosen) are added to it."""
+        elapsed = time.time() - self.startTime
+        result = dict(nodes=nodes, qnodes=self.qnodes, time=elapsed,
+                      nps=int(nodes / max(elapsed, 1e-6)),
+                      cutoffs=self.cutoffs, firstMoveCutoffs=self.firstMoveCutoffs,
+                      firstMoveCutoffRate=self.firstMoveCutoffs / float(max(self.cutoffs, 1)),
+                      ttProbes=self.ttProbes, ttHits=self.ttHits,
+                      ttHitRate=self.ttHits / float(max(self.ttProbes, 1)), tbHits=self.tbHits,
+                      branching=self.branchingFactor(), iterations=self.iterations)
+        result.update(fields)
+        return result
+
+def summary(record):
+    """One line description of a record, for printing."""
+    return "%d nodes (%d quiescence) in %.2fs, %d nps, %.1f%% first move cutoffs, %.1f%% hash hits, branching %.2f" % \
+        (record["nodes"], record["qnodes"], record["time"], record["nps"], 100*record["firstMoveCutoffRate"],
+         100*record["ttHitRate"], record["branching"])
+
+def appendRecord(filename, record):
+    """Append record to filename as a line of JSON."""
+    f = open(filename, "a")
+    try:
+        f.write(json.dumps(record, sort_keys=True) + "\n")
+    finally:
+        f.close()
+
+def readRecords(filename):
+    """Records from a JSON lines file written by appendRecord."""
+    with open(filename) as f:
+        return [json.loads(line) for line in f if line.strip()]
@@ -0,0 +1,422 @@
+# Endgame tablebases: the result of every position with a few pieces, with
+# the distance in plies to the end of the game under best play.
+#
+# One file per material signature, e.g. "RvK" for a white rook against a
+# black king. A position is indexed by side to move and the squares of its
+# pieces, taken white first, most valuable kind first, and by square among
+# pieces of the same kind:
+#
+#   index = ((side*64 + sq1)*64 + sq2)*64 + ...
+#
+# Each file is a header followed by one entry per index: 0 for a draw (or an
+# impossible position), 1+d for a win for the side to move in d plies, or
+# LOSS_BASE+d for a loss in d plies. Entries are one byte, or two if some
+# distance does not fit. Positions where an en passant capture is possible are
+# not covered.
+#
+# python -m antichess.Tablebase -n 3 -d tablebases
+# python -m antichess.Tablebase -d tablebases RvK PvP
+
+import array
+import itertools
+import mmap
+import os
+import struct
+import sys
+import time
+from optparse import OptionParser
+
+import Bitboard
+import Board
+import Move
+import Pieces
+import Rules
+
+WIN, DRAW, LOSS = 1, 0, -1
+
+MAGIC = "ACTB"
+VERSION = 1
+# Magic, version, bytes per entry, number of pieces, padding
+HEADER = struct.Struct("<4sBBBx")
+# Piece letters by kind
+LETTERS = "PNBRQK"
+
+class TablebaseError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def signatureName(pieces):
+    """Name of the signature of pieces, a list of (colour, kind), e.g. "KRvK"."""
+    white = "".join([LETTERS[kind] for colour, kind in sorted(pieces, key=lambda p: -p[1]) if colour==0])
+    black = "".join([LETTERS[kind] for colour, kind in sorted(pieces, key=lambda p: -p[1]) if colour==1])
+    return white + "v" + black
+
+def parseSignature(name):
+    """(colour, kind) of each piece of a signature, in index order."""
+    try:
+        white, black = name.upper().split("V")
+        pieces = [(0, LETTERS.index(ch)) for ch in white] + [(1, LETTERS.index(ch)) for ch in black]
+    except ValueError:
+        raise TablebaseError("Bad signature: " + name)
+    if len(white)==0 or len(black)==0:
+        raise TablebaseError("Both sides need pieces: " + name)
+    return sorted(pieces, key=lambda p: (p[0], -p[1]))
+
+def allSignatures(maxPieces):
+    """Names of every signature with 2 to maxPieces pieces, in an order where
+    each one only depends on those before it (captures remove a piece and
+    promotions remove a pawn)."""
+    names = []
+    for total in range(2, maxPieces+1):
+        for numWhite in range(1, total):
+            for white in itertools.combinations_with_replacement(range(6), numWhite):
+                for black in itertools.combinations_with_replacement(range(6), total-numWhite):
+                    pieces = [(0, kind) for kind in white] + [(1, kind) for kind in black]
+                    pawns = len([kind for colour, kind in pieces if kind==Pieces.PAWN])
+                    names.append( (total, pawns, signatureName(pieces)) )
+    return [name for total, pawns, name in sorted(names)]
+
+def boardKey(board, colour=None):
+    """(signature name, index) of the position on board with colour (by
+    default the side to move) to move."""
+    if colour is None:
+        colour = board.sideToMove
+    # Index order is by colour, then kind (highest first), then square, which
+    # is the order of the bits in the board's per-kind bitboards
+    index = colour
+    letters = []
+    for side in [0, 1]:
+        text = ""
+        for kind in range(5, -1, -1):
+            text += LETTERS[kind] * board.material[side][kind]
+            for sq in Bitboard.toList(board.bitboards[side][kind]):
+                index = index*64 + sq
+        letters.append(text)
+    return "v".join(letters), index
+
+def encode(result, distance, lossBase):
+    if result==WIN:
+        return 1 + distance
+    if result==LOSS:
+        return lossBase + distance
+    return 0
+
+def decode(value, lossBase):
+    if value==0:
+        return DRAW, 0
+    if value < lossBase:
+        return WIN, value - 1
+    return LOSS, value - lossBase
+
+class Tablebases:
+    """Read-only access to the tablebase files in a directory, memory-mapped on first use."""
+    def __init__(self, directory):
+        self.directory = directory
+        # name: (mmap, bytes per entry) or None if there is no file
+        self.tables = {}
+        self.maxPieces = 0
+        if os.path.isdir(directory):
+            for filename in os.listdir(directory):
+                if filename.endswith(".tb"):
+                    self.maxPieces = max(self.maxPieces, len(filename) - len("v.tb"))
+
+    def filename(self, name):
+        return os.path.join(self.directory, name + ".tb")
+
+    def open(self, name):
+        if name in self.tables:
+            return self.tables[name]
+        table = None
+        if os.path.exists(self.filename(name)):
+            f = open(self.filename(name), "rb")
+            try:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            finally:
+                f.close()
+            magic, version, entryBytes, numPieces = HEADER.unpack_from(data, 0)
+            if not magic==MAGIC or not version==VERSION or not len(data)==HEADER.size + entryBytes * 2 * 64**numPieces:
+                raise TablebaseError("Bad tablebase file: " + self.filename(name))
+            table = (data, entryBytes)
+        self.tables[name] = table
+        return table
+
+    def lookup(self, name, index):
+        """(result, distance) for the side to move, or None if there is no table."""
+        table = self.open(name)
+        if table is None:
+            return None
+        data, entryBytes = table
+        if entryBytes==1:
+            return decode(ord(data[HEADER.size + index]), 1 << 7)
+        return decode(struct.unpack_from("<H", data, HEADER.size + 2*index)[0], 1 << 15)
+
+    def probe(self, board, colour=None):
+        """(result, distance) for colour (by default the side to move) to move
+        on board, or None if not covered."""
+        if colour is None:
+            colour = board.sideToMove
+        if len(board.pieceSquares[colour])==0:
+            # The game is over, and won
+            return WIN, 0
+        if len(board.pieceSquares[0]) + len(board.pieceSquares[1]) > self.maxPieces:
+            return None
+        # An en passant capture might be possible
+        if board.enpassant is not None:
+            return None
+        name, index = boardKey(board, colour)
+        return self.lookup(name, index)
+
+    def close(self):
+        for table in self.tables.values():
+            if table is not None:
+                table[0].close()
+        self.tables = {}
+
+class Generator:
+    """Builds tablebase files by retrograde analysis."""
+    def __init__(self, directory, verbose=False):
+        self.directory = directory
+        self.verbose = verbose
+        self.rules = Rules.Suicide()
+        self.board = Board.Board()
+        self.board.clear()
+        self.tablebases = Tablebases(directory)
+
+    def external(self, board):
+        # Result for the side to move after a capture or promotion, from a smaller table
+        if len(board.pieceSquares[board.sideToMove])==0:
+            return WIN, 0
+        name, index = boardKey(board)
+        entry = self.tablebases.lookup(name, index)
+        if entry is None:
+            raise TablebaseError("Generate %s first" % name)
+        return entry
+
+    def forced(self, board):
+        # Result for the side to move when every move leads out of this table
+        # (after a double push which allows en passant, all moves are captures)
+        best = None
+        worst = 0
+        draw = False
+        colour = board.sideToMove
+        for code in self.rules.getAllValidCodes(board, colour):
+            board.makeMove(code)
+            result, distance = self.external(board)
+            board.retractMove()
+            if result==LOSS and (best is None or distance+1 < best):
+                best = distance+1
+            elif result==WIN:
+                worst = max(worst, distance+1)
+            else:
+                draw = True
+        if best is not None:
+            return WIN, best
+        if draw:
+            return DRAW, 0
+        return LOSS, worst
+
+    def generate(self, name):
+        """Write the table for signature name, whose dependencies must exist already."""
+        startTime = time.time()
+        signature = parseSignature(name)
+        n = len(signature)
+        size = 2 * 64**n
+        pieces = [Pieces.PIECES[colour][kind] for colour, kind in signature]
+        # Runs of identical pieces, whose squares must be in increasing order
+        groups = []
+        start = 0
+        for i in range(1, n+1):
+            if i==n or not signature[i]==signature[start]:
+                if i - start > 1:
+                    groups.append( (start, i) )
+                start = i
+        pawnSlots = [i for i in range(n) if signature[i][1]==Pieces.PAWN]
+
+        board = self.board
+        rules = self.rules
+        # Per position: unresolved moves within this table (plus one if any move
+        # draws), the longest loss among its resolved moves, and 1 + the
+        # shortest win found so far (0 if none)
+        remaining = array.array('H', [0]) * size
+        lossMax = array.array('H', [0]) * size
+        tentativeWin = array.array('H', [0]) * size
+        # Moves within this table, as parallel lists of from and to positions
+        parents = array.array('i')
+        children = array.array('i')
+        winBuckets = {}
+        lossBuckets = {}
+
+        placed = []
+        for squares in itertools.product(range(64), repeat=n):
+            if len(set(squares)) < n:
+                continue
+            if [i for i in pawnSlots if squares[i] < 8 or squares[i] >= 56]:
+                continue
+            if [g for g in groups if not list(squares[g[0]:g[1]])==sorted(squares[g[0]:g[1]])]:
+                continue
+            for sq in placed:
+                board.removePiece(sq)
+            for sq, piece in zip(squares, pieces):
+                board.placePiece(sq, piece)
+            placed = squares
+            base = 0
+            for sq in squares:
+                base = base*64 + sq
+            for side in [0, 1]:
+                index = side * 64**n + base
+                board.sideToMove = side
+                moves = rules.getAllValidCodes(board, side)
+                if len(moves)==0:
+                    # Stalemate wins
+                    tentativeWin[index] = 1
+                    winBuckets.setdefault(0, []).append(index)
+                    continue
+                best = None
+                worst = 0
+                count = 0
+                for code in moves:
+                    fr, to = code & 63, code >> Move.TO_SHIFT & 63
+                    pawnPush = board.pieces[fr].kind==Pieces.PAWN and abs(to-fr)==16
+                    if code & Move.CAPTURE or code >> Move.PROMOTION_SHIFT & 7 or \
+                            (pawnPush and self.allowsEnpassant(board, to, side)):
+                        board.makeMove(code)
+                        if code & Move.CAPTURE or code >> Move.PROMOTION_SHIFT & 7:
+                            result, distance = self.external(board)
+                        else:
+                            result, distance = self.forced(board)
+                        board.retractMove()
+                        if result==LOSS:
+                            if best is None or distance+1 < best:
+                                best = distance+1
+                        elif result==WIN:
+                            worst = max(worst, distance+1)
+                        else:
+                            # Never all wins for the opponent
+                            count += 1
+                        continue
+                    child = list(squares)
+                    child[squares.index(fr)] = to
+                    for a, b in groups:
+                        child[a:b] = sorted(child[a:b])
+                    childIndex = 1-side
+                    for sq in child:
+                        childIndex = childIndex*64 + sq
+                    parents.append(index)
+                    children.append(childIndex)
+                    count += 1
+                remaining[index] = count
+                lossMax[index] = worst
+                if best is not None:
+                    tentativeWin[index] = best + 1
+                    winBuckets.setdefault(best, []).append(index)
+                elif count==0:
+                    lossBuckets.setdefault(worst, []).append(index)
+        for sq in placed:
+            board.removePiece(sq)
+
+        # Moves into each position, for working backwards
+        offsets = array.array('i', [0]) * (size + 1)
+        for c in children:
+            offsets[c+1] += 1
+        for i in range(size):
+            offsets[i+1] += offsets[i]
+        fill = offsets[:]
+        preds = array.array('i', [0]) * len(children)
+        for p, c in itertools.izip(parents, children):
+            preds[fill[c]] = p
+            fill[c] += 1
+        del parents, children, fill
+
+        # Settle positions in order of distance, so the first win found for a
+        # position is the quickest, and a loss is settled after all its moves
+        results = array.array('b', [0]) * size
+        distances = array.array('H', [0]) * size
+        d = 0
+        while d <= max(winBuckets.keys() + lossBuckets.keys() + [0]):
+            for index in lossBuckets.pop(d, []):
+                if results[index]:
+                    continue
+                results[index], distances[index] = LOSS, d
+                for i in range(offsets[index], offsets[index+1]):
+                    p = preds[i]
+                    if results[p]==0 and (tentativeWin[p]==0 or tentativeWin[p] > d+2):
+                        tentativeWin[p] = d+2
+                        winBuckets.setdefault(d+1, []).append(p)
+            for index in winBuckets.pop(d, []):
+                if results[index] or not tentativeWin[index]==d+1:
+                    continue
+                results[index], distances[index] = WIN, d
+                for i in range(offsets[index], offsets[index+1]):
+                    p = preds[i]
+                    if results[p]:
+                        continue
+                    remaining[p] -= 1
+                    if d+1 > lossMax[p]:
+                        lossMax[p] = d+1
+                    if remaining[p]==0 and tentativeWin[p]==0:
+                        lossBuckets.setdefault(lossMax[p], []).append(p)
+            d += 1
+
+        self.write(name, n, results, distances)
+        if self.verbose:
+            wins = results.count(WIN)
+            losses = results.count(LOSS)
+            print "%-8s %8d wins %8d losses, longest %3d plies, %.1fs" % (name, wins, losses, max(distances), time.time()-startTime)
+            sys.stdout.flush()
+
+    def allowsEnpassant(self, board, to, side):
+        # Whether an opponent pawn stands beside a pawn which double pushes to to
+        for col in (to%8 - 1, to%8 + 1):
+            if 0 <= col <= 7:
+                piece = board.pieces[to - to%8 + col]
+                if piece is not None and piece.kind==Pieces.PAWN and not piece.colour==side:
+                    return True
+        return False
+
+    def write(self, name, n, results, distances):
+        longest = max(distances)
+        if longest < (1 << 7) - 1:
+            entryBytes, typecode = 1, 'B'
+        elif longest < (1 << 15) - 1:
+            entryBytes, typecode = 2, 'H'
+        else:
+            raise TablebaseError("Distances too long for %s" % name)
+        lossBase = 1 << (8*entryBytes - 1)
+        data = array.array(typecode, [encode(r, d, lossBase) for r, d in itertools.izip(results, distances)])
+        if sys.byteorder=="big":
+            data.byteswap()
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        filename = self.tablebases.filename(name)
+        f = open(filename + ".tmp", "wb")
+        try:
+            f.write(HEADER.pack(MAGIC, VERSION, entryBytes, n))
+            data.tofile(f)
+        finally:
+            f.close()
+        os.rename(filename + ".tmp", filename)
+        self.tablebases.maxPieces = max(self.tablebases.maxPieces, n)
+
+def main():
+    parser = OptionParser(usage="python -m antichess.Tablebase [options] [SIGNATURE ...]")
+    parser.add_option("-n", "--pieces", type="int", dest="pieces", default=3,
+                      help="generate every signature with up to N pieces", metavar="N")
+    parser.add_option("-d", "--dir", dest="directory", default="tablebases",
+                      help="directory for the tablebase files", metavar="DIR")
+    parser.add_option("-f", "--force", action="store_true", dest="force", default=False,
+                      help="regenerate tables which already exist")
+    (options, args) = parser.parse_args()
+
+    generator = Generator(options.directory, verbose=True)
+    if len(args)>0:
+        names = [signatureName(parseSignature(name)) for name in args]
+    else:
+        names = allSignatures(options.pieces)
+    for name in names:
+        if options.force or not os.path.exists(generator.tablebases.filename(name)):
+            generator.generate(name)
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,84 @@
+import time
+
+# Fraction of the time for a move held back for everything around the search
+SAFETY = 0.05
+# Moves assumed still to play when sharing out a clock
+MOVES_TO_GO = 30
+# Never plan to spend more than this fraction of what is left on the clock
+MAX_FRACTION = 0.5
+# Assumed growth in time from one iteration to the next until two have been timed
+DEFAULT_BRANCHING = 4.0
+# Bounds on the measured growth
+MIN_BRANCHING = 1.5
+MAX_BRANCHING = 8.0
+# Iterations quicker than this (seconds) are too noisy to measure growth from
+MIN_ITERATION_TIME = 0.02
+# Most iterations back to average the growth over
+BRANCHING_PLIES = 4
+
+def allocate(remaining, increment=0.0, movesToGo=MOVES_TO_GO):
+    """Seconds to spend on a move with remaining seconds on the clock and increment added per move."""
+    budget = remaining / float(movesToGo) + increment
+    return max(0.0, min(budget, remaining * MAX_FRACTION))
+
+class TimeManager:
+    """Deadline for one search. Once the deadline passes (or abort() is called)
+    aborted stays set, and the search must unwind without using any result
+    from the unfinished iteration."""
+    def __init__(self):
+        self.start(1e9)
+
+    def start(self, maxTime, startTime=None):
+        """Start timing a search which may take maxTime seconds."""
+        if startTime is None:
+            startTime = time.time()
+        self.startUntil(startTime, startTime + maxTime * (1 - SAFETY))
+
+    def startUntil(self, startTime, deadline):
+        """Start timing a search begun at startTime which must stop by deadline (both from time.time())."""
+        self.startTime = startTime
+        self.deadline = deadline
+        self.aborted = False
+        # Seconds taken by each completed iteration
+        self.iterationTimes = []
+
+    def elapsed(self):
+        return time.time() - self.startTime
+
+    def abort(self):
+        self.aborted = True
+
+    def expired(self):
+        """Check the clock, setting aborted once the deadline has passed."""
+        if time.time() > self.deadline:
+            self.aborted = True
+        return self.aborted
+
+    def iterationDone(self, seconds):
+        self.iterationTimes.append(seconds)
+
+    def predictNextIteration(self):
+        """Estimated seconds for the next iteration, from the mean growth over
+        the last few iterations which took long enough to time."""
+        times = self.iterationTimes
+        if len(times)==0:
+            return 0.0
+        timed = 0
+        while timed < min(len(times), BRANCHING_PLIES + 1) and times[-1-timed] >= MIN_ITERATION_TIME:
+            timed += 1
+        plies = max(timed - 1, 0)
+        # An even number of plies if possible, as odd and even depths grow differently
+        if plies > 1:
+            plies -= plies % 2
+        if plies==0:
+            branching = DEFAULT_BRANCHING
+        else:
+            branching = (times[-1] / times[-1-plies]) ** (1.0 / plies)
+            branching = min(max(branching, MIN_BRANCHING), MAX_BRANCHING)
+        return times[-1] * branching
+
+    def canStartIteration(self):
+        """Whether the next iteration is expected to finish before the deadline."""
+        if self.aborted:
+            return False
+        return time.time() + self.predictNextIteration() <= self.deadline
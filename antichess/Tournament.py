@@ -0,0 +1,261 @@
+# Headless matches between two players, with games played in parallel.
+#
+# Players are given as specs: "random", or "ai" with options, e.g.
+# "ai:depth=3,time=0.5,hash=4,q=32,book=book.bin,tablebases=tb". Games are
+# played in pairs from the same random opening, once with each player as
+# White. Each result can be written as a PGN record (see antichess.PGN) and
+# the match is scored as an Elo difference for the first player, optionally
+# stopping early once an SPRT decides between two Elo hypotheses.
+#
+# python -m antichess.Tournament -n 200 -j 4 ai:depth=3,time=0.2 random --pgn games.pgn
+# python -m antichess.Tournament -n 2000 ai:depth=3,q=32 ai:depth=3,q=0 --sprt 0,20
+
+import math
+import multiprocessing
+import random
+import sys
+import time
+from optparse import OptionParser
+
+import Archive
+import Board
+import Book
+import Game
+import PGN
+import Player
+import Rules
+
+DEFAULT_DEPTH = 3
+# Seconds per move
+DEFAULT_TIME = 0.5
+# Transposition table size for each AI, small because many games run at once
+DEFAULT_HASH_MB = 4
+# Keys allowed in an "ai" spec
+AI_OPTIONS = ["depth", "time", "hash", "q", "book", "tablebases"]
+
+class TournamentError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def parseSpec(spec):
+    """(kind, options) from a player spec such as "ai:depth=3,time=0.5"."""
+    kind, sep, rest = spec.partition(":")
+    options = {}
+    for item in rest.split(","):
+        if not item:
+            continue
+        key, sep, value = item.partition("=")
+        if not kind=="ai" or not key in AI_OPTIONS or not value:
+            raise TournamentError("Bad option '%s' in player %s" % (item, spec))
+        options[key] = value
+    if not kind in ["ai", "random"]:
+        raise TournamentError("Unknown player type: " + spec)
+    return kind, options
+
+def makePlayer(spec, colour):
+    """A new Player for spec, and its time per move."""
+    kind, options = parseSpec(spec)
+    maxTime = float(options.get("time", DEFAULT_TIME))
+    if kind=="random":
+        return Player.RandomPlayer(colour), maxTime
+    quiescenceNodes = options.get("q")
+    if quiescenceNodes is not None:
+        quiescenceNodes = int(quiescenceNodes)
+    return Player.AIPlayer(colour, int(options.get("depth", DEFAULT_DEPTH)), quiet=True,
+                           hashMB=int(options.get("hash", DEFAULT_HASH_MB)), quiescenceNodes=quiescenceNodes,
+                           bookFile=options.get("book"), tablebaseDir=options.get("tablebases")), maxTime
+
+def expectedScore(elo):
+    """Expected score per game for a player elo points stronger."""
+    return 1.0 / (1.0 + 10 ** (-elo / 400.0))
+
+def eloDifference(score):
+    """Elo difference for an expected score per game."""
+    if score <= 0.0:
+        return -float("inf")
+    if score >= 1.0:
+        return float("inf")
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+def meanAndVariance(scores):
+    n = len(scores)
+    mean = sum(scores) / float(n)
+    return mean, sum([(s - mean)**2 for s in scores]) / n
+
+def eloInterval(scores, z=1.96):
+    """(elo, lower, upper): Elo difference from scores (one per game, 1, 0.5
+    or 0) with a confidence interval, 95% by default."""
+    mean, variance = meanAndVariance(scores)
+    error = z * math.sqrt(variance / len(scores))
+    return eloDifference(mean), eloDifference(mean - error), eloDifference(mean + error)
+
+def sprtLLR(scores, elo0, elo1):
+    """Log likelihood ratio of elo1 against elo0 from scores, using the normal
+    approximation to the distribution of the mean score."""
+    if len(scores)==0:
+        return 0.0
+    mean, variance = meanAndVariance(scores)
+    if variance==0:
+        return 0.0
+    s0, s1 = expectedScore(elo0), expectedScore(elo1)
+    return len(scores) * (s1 - s0) * (2*mean - s0 - s1) / (2*variance)
+
+def sprtBounds(alpha=0.05, beta=0.05):
+    """(lower, upper) LLR bounds: accept elo0 below lower, elo1 above upper."""
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+def makeOpenings(numGames, randomPlies, seed):
+    """One opening (list of codes) for each pair of games, up to randomPlies random moves long."""
+    rng = random.Random(seed)
+    rules = Rules.Suicide()
+    openings = []
+    for i in range((numGames + 1) // 2):
+        board = Board.Board()
+        opening = []
+        for ply in range(rng.randint(0, randomPlies)):
+            moves = rules.getAllValidCodes(board, board.sideToMove)
+            if len(moves)==0:
+                break
+            opening.append(rng.choice(moves))
+            board.makeMove(opening[-1])
+        openings.append(opening)
+    return openings
+
+# Players made so far by this process, reused from game to game
+workerPlayers = {}
+
+def playGame(task):
+    """Play one game; task is (number, [white spec, black spec], opening, maxPlies)."""
+    number, specs, opening, maxPlies = task
+    startTime = time.time()
+    players, times = [], []
+    for colour in [0, 1]:
+        if not (specs[colour], colour) in workerPlayers:
+            workerPlayers[(specs[colour], colour)] = makePlayer(specs[colour], colour)
+        player, maxTime = workerPlayers[(specs[colour], colour)]
+        players.append(player)
+        times.append(maxTime)
+    board = Board.Board()
+    for code in opening:
+        board.makeMove(code)
+    codes, score = Game.playQuietGame(players, times, maxPlies, board)
+    return dict(number=number, white=specs[0], black=specs[1], moves=list(opening) + codes,
+                score=score, time=time.time() - startTime)
+
+def runTournament(specs, numGames, workers=1, maxPlies=Game.MAX_PLIES, randomPlies=4, seed=None):
+    """Generate a result dict for each of numGames games between the two
+    players in specs, in the order they finish. Game 2i has specs[0] as White
+    and game 2i+1 has specs[1] as White, both from the same opening."""
+    for spec in specs:
+        parseSpec(spec)
+    openings = makeOpenings(numGames, randomPlies, seed)
+    tasks = []
+    for number in range(numGames):
+        if number%2==0:
+            order = [specs[0], specs[1]]
+        else:
+            order = [specs[1], specs[0]]
+        tasks.append( (number, order, openings[number // 2], maxPlies) )
+    if workers <= 1:
+        for task in tasks:
+            yield playGame(task)
+        return
+    pool = multiprocessing.Pool(workers)
+    try:
+        for result in pool.imap_unordered(playGame, tasks):
+            yield result
+    finally:
+        pool.terminate()
+        pool.join()
+
+def firstPlayerScore(result):
+    if result["number"]%2==0:
+        return result["score"]
+    return 1.0 - result["score"]
+
+def main():
+    parser = OptionParser(usage="python -m antichess.Tournament [options] PLAYER1 PLAYER2")
+    parser.add_option("-n", "--games", type="int", dest="games", default=100,
+                      help="number of games to play", metavar="N")
+    parser.add_option("-j", "--workers", type="int", dest="workers", default=multiprocessing.cpu_count(),
+                      help="number of games to play at once", metavar="N")
+    parser.add_option("--pgn", dest="pgn", default=None,
+                      help="write the games to FILE", metavar="FILE")
+    parser.add_option("--save-games", dest="saveGames", default=None,
+                      help="append the games to FILE as lines for antichess.Book", metavar="FILE")
+    parser.add_option("--archive", dest="archive", default=None,
+                      help="write the games to the binary archive FILE (see antichess.Archive)", metavar="FILE")
+    parser.add_option("--max-plies", type="int", dest="maxPlies", default=Game.MAX_PLIES,
+                      help="draw games which last N plies", metavar="N")
+    parser.add_option("--random-plies", type="int", dest="randomPlies", default=4,
+                      help="start each pair of games with up to N random moves", metavar="N")
+    parser.add_option("--sprt", dest="sprt", default=None,
+                      help="stop once an SPRT accepts ELO0 or ELO1 for the first player", metavar="ELO0,ELO1")
+    parser.add_option("--report", type="int", dest="report", default=10,
+                      help="print the standings every N games", metavar="N")
+    parser.add_option("--seed", type="int", dest="seed", default=None,
+                      help="random seed for the openings", metavar="SEED")
+    (options, args) = parser.parse_args()
+    if not len(args)==2:
+        parser.error("need two players")
+    if options.sprt is not None:
+        elo0, elo1 = [float(x) for x in options.sprt.split(",")]
+        lower, upper = sprtBounds()
+
+    pgn = saved = archive = None
+    if options.pgn is not None:
+        pgn = open(options.pgn, "w")
+    if options.saveGames is not None:
+        saved = open(options.saveGames, "a")
+    if options.archive is not None:
+        archive = Archive.ArchiveWriter(options.archive)
+    startTime = time.time()
+    scores = []
+    counts = [0, 0, 0]
+    decision = None
+    try:
+        for result in runTournament(args, options.games, options.workers, options.maxPlies, options.randomPlies, options.seed):
+            score = firstPlayerScore(result)
+            scores.append(score)
+            counts[int(2*score)] += 1
+            if pgn is not None:
+                tags = [("Event", "%s vs %s" % tuple(args)), ("Round", result["number"] + 1),
+                        ("White", result["white"]), ("Black", result["black"]), ("Variant", "Antichess"),
+                        ("PlyCount", len(result["moves"])), ("Time", "%.1f" % result["time"])]
+                pgn.write(PGN.formatGame(tags, result["moves"], result["score"]))
+                pgn.flush()
+            if saved is not None:
+                saved.write(Book.formatGame(result["moves"], result["score"]) + "\n")
+                saved.flush()
+            if archive is not None:
+                archive.addGame(result["moves"], result["score"])
+            if options.sprt is not None:
+                llr = sprtLLR(scores, elo0, elo1)
+                if llr <= lower:
+                    decision = "H0 (Elo %g) accepted" % elo0
+                elif llr >= upper:
+                    decision = "H1 (Elo %g) accepted" % elo1
+            if len(scores) % options.report==0 or len(scores)==options.games or decision is not None:
+                elo, low, high = eloInterval(scores)
+                line = "%d games: +%d =%d -%d  score %.3f  Elo %+.1f [%+.1f, %+.1f]  %.0f games/hour" % \
+                    (len(scores), counts[2], counts[1], counts[0], sum(scores) / len(scores), elo, low, high,
+                     3600 * len(scores) / max(time.time() - startTime, 1e-6))
+                if options.sprt is not None:
+                    line += "  LLR %.2f [%.2f, %.2f]" % (llr, lower, upper)
+                print line
+                sys.stdout.flush()
+            if decision is not None:
+                print "SPRT:", decision
+                break
+    finally:
+        if pgn is not None:
+            pgn.close()
+        if saved is not None:
+            saved.close()
+        if archive is not None:
+            archive.close()
+
+if __name__=="__main__":
+    main()
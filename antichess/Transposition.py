@@ -0,0 +1,100 @@
+import array
+import ctypes
+import multiprocessing
+
+import Move
+
+# Bound types
+EXACT, LOWER, UPPER = 1, 2, 3
+
+# Bytes per entry: check (4), score (4), move (2), depth (1), bound (1), age (1)
+ENTRY_BYTES = 13
+# Each bucket holds a depth-preferred slot followed by an always-replace slot
+BUCKET_SIZE = 2
+
+def packMove(move):
+    """The 16 bits stored for a move (a Move or packed int): from, to and promotion piece type."""
+    if isinstance(move, Move.Move):
+        move = move.code
+    return move & Move.MOVE_MASK
+
+def entryData(score, move, depth, bound):
+    # Mixed into the stored check so that an entry half-written by another
+    # process (shared tables are not locked) fails to match on probe
+    return (score & 0xffffffff) ^ (move | (depth & 0xff) << 16 | bound << 24)
+
+class TranspositionTable:
+    """Fixed-size hash table of search results, keyed by Zobrist hash.
+
+    With shared=True the entries live in shared memory, so processes forked
+    after the table is created all read and write the same table."""
+    def __init__(self, sizeMB=16, shared=False):
+        numBuckets = max(1, (sizeMB * 1024 * 1024) // (ENTRY_BYTES * BUCKET_SIZE))
+        # Round down to a power of two so the bucket index is a mask of the key
+        numBuckets = 1 << (numBuckets.bit_length() - 1)
+        self.mask = numBuckets - 1
+        size = numBuckets * BUCKET_SIZE
+        self.shared = shared
+        if shared:
+            # Zero-filled
+            allocate = multiprocessing.RawArray
+        else:
+            allocate = lambda typecode, n: array.array(typecode, [0]) * n
+        # The low bits of the key select the bucket, the high 32 bits are stored to check it
+        self.checks = allocate('I', size)
+        self.scores = allocate('i', size)
+        self.moves = allocate('H', size)
+        self.depths = allocate('b', size)
+        self.bounds = allocate('B', size)
+        self.ages = allocate('B', size)
+        self.age = 0
+        self.size = size
+
+    def newSearch(self):
+        """Start a new search: entries from earlier searches become replaceable."""
+        self.age = (self.age + 1) % 256
+
+    def clear(self):
+        if self.shared:
+            ctypes.memset(ctypes.addressof(self.bounds), 0, ctypes.sizeof(self.bounds))
+        else:
+            self.bounds = array.array('B', [0]) * self.size
+        self.age = 0
+
+    def probe(self, key):
+        """Return (depth, score, bound, move) stored for key, or None."""
+        check = key >> 32
+        i = (key & self.mask) * BUCKET_SIZE
+        for slot in (i, i+1):
+            bound = self.bounds[slot]
+            if bound:
+                score, move, depth = self.scores[slot], self.moves[slot], self.depths[slot]
+                if self.checks[slot] ^ entryData(score, move, depth, bound)==check:
+                    return depth, score, bound, move
+        return None
+
+    def store(self, key, depth, score, bound, move):
+        check = key >> 32
+        i = (key & self.mask) * BUCKET_SIZE
+        # Depth-preferred slot: keep it unless the new result is at least as deep,
+        # for the same position, or the old entry is left over from an earlier search
+        if self.bounds[i]==0 or depth >= self.depths[i] or not self.ages[i]==self.age or \
+                self.checks[i] ^ entryData(self.scores[i], self.moves[i], self.depths[i], self.bounds[i])==check:
+            slot = i
+        else:
+            slot = i+1
+        self.checks[slot] = check ^ entryData(score, move, depth, bound)
+        self.scores[slot] = score
+        self.moves[slot] = move
+        self.depths[slot] = depth
+        self.bounds[slot] = bound
+        self.ages[slot] = self.age
+
+    def usage(self):
+        """Fraction of slots filled during the current search, estimated from the first 1000."""
+        sample = min(self.size, 1000)
+        used = 0
+        for slot in range(sample):
+            if self.bounds[slot] and self.ages[slot]==self.age:
+                used += 1
+        return used / float(sample)
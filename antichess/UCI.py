@@ -0,0 +1,257 @@
+# UCI protocol (variant antichess) on stdin and stdout, so the AI can be run
+# by chess GUIs and game servers as a long-lived engine process.
+#
+# Supported: uci, isready, setoption (Hash, Book, Tablebases), ucinewgame,
+# position [startpos | fen FEN] [moves ...], go [depth N] [movetime MS]
+# [wtime MS] [btime MS] [winc MS] [binc MS] [movestogo N] [infinite], stop
+# and quit. The search runs on a background thread, so stop (and isready) are
+# answered while it runs; an info line is written after every iteration.
+#
+# python -m antichess.UCI
+# ./antichess.py --uci --book book.bin
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+import Board
+import Move
+import PGN
+import Player
+import TimeManager
+
+NAME = "antichess"
+AUTHOR = "the antichess authors"
+# Deepest search when go gives no depth
+MAX_DEPTH = 99
+# Seconds allowed for a search with no time limit (go depth N, or go infinite)
+NO_TIME_LIMIT = 1e9
+# Seconds for a go with no limit that applies to the side to move, e.g. only
+# the other side's clock (as ./antichess.py -t)
+DEFAULT_TIME = 5.0
+# Scores beyond this are wins or losses, and are reported as +/-WIN_CP
+WIN_SCORE = Player.AIPlayer.INFINITY - 1000
+WIN_CP = 100000
+
+class UCIError(Exception):
+    def __init__(self, value):
+        self.value = value
+    def __str__(self):
+        return repr(self.value)
+
+def parseGo(words, sideToMove):
+    """(maxTime, maxDepth, infinite) for the arguments of a go command."""
+    values = {}
+    infinite = False
+    i = 0
+    while i < len(words):
+        if words[i]=="infinite":
+            infinite = True
+        elif words[i] in ["depth", "movetime", "wtime", "btime", "winc", "binc", "movestogo"] and i+1 < len(words):
+            try:
+                values[words[i]] = int(words[i+1])
+            except ValueError:
+                raise UCIError("Bad value for %s: %s" % (words[i], words[i+1]))
+            i += 1
+        i += 1
+    clock = ["wtime", "btime"][sideToMove]
+    if "movetime" in values:
+        maxTime = values["movetime"] / 1000.0
+    elif infinite or "depth" in values and not clock in values:
+        maxTime = NO_TIME_LIMIT
+    elif clock in values:
+        increment = values.get(["winc", "binc"][sideToMove], 0) / 1000.0
+        maxTime = TimeManager.allocate(values[clock] / 1000.0, increment,
+                                       values.get("movestogo", TimeManager.MOVES_TO_GO))
+    else:
+        maxTime = DEFAULT_TIME
+    return maxTime, values.get("depth", MAX_DEPTH), infinite
+
+def scoreText(score):
+    """UCI score for an AIPlayer score (in pieces), from the side to move's point of view."""
+    if score >= WIN_SCORE:
+        return "cp %d" % WIN_CP
+    if score <= -WIN_SCORE:
+        return "cp %d" % -WIN_CP
+    return "cp %d" % (100 * score)
+
+def moveText(move):
+    """A move in UCI notation (promotions in lower case), "0000" for a pass."""
+    if move==Move.PASS:
+        return "0000"
+    return str(move).lower()
+
+class UCIEngine:
+    """Reads commands from input and writes responses to output."""
+    def __init__(self, input=sys.stdin, output=sys.stdout, hashMB=16, bookFile=None, tablebaseDir=None,
+                 quiescenceNodes=None):
+        self.input = input
+        self.output = output
+        self.options = dict(hashMB=hashMB, bookFile=bookFile, tablebaseDir=tablebaseDir,
+                            quiescenceNodes=quiescenceNodes)
+        self.board = Board.Board()
+        self.player = None
+        self.thread = None
+        # Whether the search is a go infinite, which only stop ends
+        self.infinite = False
+        self.stopEvent = threading.Event()
+        # Held while writing a line, as the search thread writes too
+        self.lock = threading.Lock()
+
+    def send(self, line):
+        self.lock.acquire()
+        try:
+            self.output.write(line + "\n")
+            self.output.flush()
+        finally:
+            self.lock.release()
+
+    def getPlayer(self):
+        # Made when first needed, and again after the options change
+        if self.player is None:
+            self.player = Player.AIPlayer(0, MAX_DEPTH, quiet=True, **self.options)
+            self.player.onIteration = self.reportIteration
+        return self.player
+
+    def reportIteration(self, iteration):
+        player = self.player
+        elapsed = time.time() - player.stats.startTime
+        self.send("info depth %d score %s nodes %d nps %d time %d pv %s" %
+                  (iteration["depth"] + 1, scoreText(iteration["score"]), player.nodes,
+                   player.nodes / max(elapsed, 1e-6), 1000 * elapsed, iteration["move"].lower()))
+
+    def setOption(self, words):
+        # setoption name NAME [value VALUE]
+        text = " ".join(words)
+        name, sep, value = text.partition(" value ")
+        name = name.replace("name", "", 1).strip().lower()
+        value = value.strip()
+        if name=="hash":
+            self.options["hashMB"] = int(value)
+        elif name=="book":
+            self.options["bookFile"] = value if value and not value=="<empty>" else None
+        elif name=="tablebases":
+            self.options["tablebaseDir"] = value if value and not value=="<empty>" else None
+        elif not name=="uci_variant":
+            self.send("info string Unknown option: " + name)
+            return
+        self.closePlayer()
+
+    def setPosition(self, words):
+        # position [startpos | fen FEN] [moves ...]
+        board = Board.Board()
+        if "moves" in words:
+            index = words.index("moves")
+            words, moves = words[:index], words[index+1:]
+        else:
+            moves = []
+        if words[:1]==["fen"]:
+            board.setFEN(" ".join(words[1:]))
+        elif not words[:1]==["startpos"]:
+            raise UCIError("Bad position: " + " ".join(words))
+        for text in moves:
+            # Coordinate notation with the promotion piece in upper case, as Move writes it
+            board.makeMove(PGN.fromSAN(board, text[:4] + text[4:].upper()))
+        self.board = board
+
+    def go(self, words):
+        self.stop()
+        maxTime, maxDepth, infinite = parseGo(words, self.board.sideToMove)
+        player = self.getPlayer()
+        player.colour = self.board.sideToMove
+        player.maxDepth = maxDepth
+        self.stopEvent.clear()
+        self.infinite = infinite
+        self.thread = threading.Thread(target=self.search, args=(player, self.board.copy(), maxTime, infinite))
+        self.thread.daemon = True
+        self.thread.start()
+
+    def search(self, player, board, maxTime, infinite):
+        move = player.getMove(board, maxTime)
+        # After go infinite, the best move waits for stop
+        if infinite:
+            self.stopEvent.wait()
+        self.send("bestmove " + moveText(move))
+
+    def stop(self):
+        """Stop any search, waiting for it to write its best move."""
+        self.stopEvent.set()
+        while self.thread is not None and self.thread.is_alive():
+            # Keep aborting, in case the search had not yet started its timer
+            self.player.timer.abort()
+            self.thread.join(0.01)
+        self.thread = None
+
+    def closePlayer(self):
+        self.stop()
+        if self.player is not None:
+            self.player.close()
+            self.player = None
+
+    def handle(self, line):
+        """Act on one command; False for quit."""
+        words = line.split()
+        if len(words)==0:
+            return True
+        command, words = words[0], words[1:]
+        if command=="uci":
+            self.send("id name " + NAME)
+            self.send("id author " + AUTHOR)
+            self.send("option name UCI_Variant type combo default antichess var antichess")
+            self.send("option name Hash type spin default %d min 1 max 4096" % self.options["hashMB"])
+            self.send("option name Book type string default <empty>")
+            self.send("option name Tablebases type string default <empty>")
+            self.send("uciok")
+        elif command=="isready":
+            self.send("readyok")
+        elif command=="setoption":
+            self.setOption(words)
+        elif command=="ucinewgame":
+            # A new hash table for the new game
+            self.closePlayer()
+            self.board = Board.Board()
+        elif command=="position":
+            self.stop()
+            self.setPosition(words)
+        elif command=="go":
+            self.go(words)
+        elif command=="stop":
+            self.stop()
+        elif command=="quit":
+            self.closePlayer()
+            return False
+        elif not command in ["debug", "ponderhit", "register"]:
+            self.send("info string Unknown command: " + command)
+        return True
+
+    def run(self):
+        """Handle commands until quit or the end of input (where a search
+        with a depth or time limit is left to finish)."""
+        try:
+            # readline rather than iterating, which reads ahead on pipes
+            for line in iter(self.input.readline, ""):
+                try:
+                    if not self.handle(line):
+                        return
+                except (UCIError, PGN.PGNError, Board.FENError, ValueError) as e:
+                    self.send("info string Error: %s" % e)
+            # End of input: let a search with a limit finish
+            if self.thread is not None and not self.infinite:
+                self.thread.join()
+        finally:
+            self.closePlayer()
+
+def main():
+    parser = OptionParser(usage="python -m antichess.UCI [options]")
+    parser.add_option("--hash-mb", type="int", dest="hashMB", default=16,
+                      help="set AI transposition table size in megabytes", metavar="MB")
+    parser.add_option("--book", dest="bookFile", default=None,
+                      help="play moves from the opening book FILE (see antichess.Book)", metavar="FILE")
+    parser.add_option("--tablebases", dest="tablebaseDir", default=None,
+                      help="probe the endgame tablebases in DIR (see antichess.Tablebase)", metavar="DIR")
+    (options, args) = parser.parse_args()
+    UCIEngine(hashMB=options.hashMB, bookFile=options.bookFile, tablebaseDir=options.tablebaseDir).run()
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,26 @@
+import random
+
+# Random 64-bit keys for Zobrist hashing. The generator is seeded so that
+# keys (and therefore stored hashes) are the same in every process.
+rng = random.Random(20150817)
+
+def randomKey():
+    return rng.getrandbits(64)
+
+# PIECES[colour][kind][square]
+PIECES = [[[randomKey() for sq in range(64)] for kind in range(6)] for colour in range(2)]
+# Xored in when black is to move
+SIDE = randomKey()
+# Xored in for the file of a pawn that has just made a double push
+ENPASSANT = [randomKey() for col in range(8)]
+
+def computeHash(board):
+    """Hash of board computed from scratch."""
+    h = 0
+    for sq in range(64):
+        p = board.pieces[sq]
+        if p is not None:
+            h ^= PIECES[p.colour][p.kind][sq]
+    if board.sideToMove==1:
+        h ^= SIDE
+    return h ^ board.enpassantKey()
@@ -0,0 +1,80 @@
+from .. import Batch
+from .. import Board
+from .. import Move
+from .. import Player
+from .. import Rules
+from . import perft
+
+import random
+import sys
+import time
+from optparse import OptionParser
+
+# python -m antichess.test.batch
+# python -m antichess.test.batch -n 50000
+#
+# Counts moves and captures and evaluates positions one at a time (move
+# generation and AIPlayer.heuristic) and as one NumPy batch, over positions
+# reached by random play from the perft suite. Both must agree.
+
+def makePositions(size, seed):
+    rules = Rules.Suicide()
+    rng = random.Random(seed)
+    fens = [fen for fen, expected in perft.readSuite(perft.SUITE)]
+    board = Board.Board()
+    boards = []
+    while len(boards) < size:
+        board.setFEN(rng.choice(fens))
+        for ply in range(rng.randint(0, 60)):
+            moves = rules.getAllValidCodes(board, board.sideToMove)
+            if len(moves)==0:
+                break
+            board.makeMove(rng.choice(moves))
+        boards.append(board.copy())
+    return boards
+
+def oneAtATime(boards):
+    rules = Rules.Suicide()
+    ai = Player.AIPlayer(0, quiet=True, hashMB=1)
+    result = []
+    for board in boards:
+        codes = rules.getAllValidCodes(board, board.sideToMove)
+        captures = len([code for code in codes if code & Move.CAPTURE])
+        result.append( (len(codes), captures, ai.heuristic(board, board.sideToMove, codes)) )
+    return result
+
+def batched(boards):
+    squares, sides, enpassant = Batch.pack(boards)
+    packed = time.time()
+    moves, captures, own, theirs = Batch.countMoves(squares, sides, enpassant)
+    scores = Batch.score(moves, captures, own, theirs)
+    return zip(moves.tolist(), captures.tolist(), scores.tolist()), packed
+
+def main():
+    parser = OptionParser(usage="python -m antichess.test.batch [options]")
+    parser.add_option("-n", "--positions", type="int", dest="positions", default=10000,
+                      help="number of positions", metavar="N")
+    parser.add_option("--seed", type="int", dest="seed", default=1,
+                      help="random seed for the positions", metavar="SEED")
+    (options, args) = parser.parse_args()
+    if not Batch.available():
+        print "NumPy is not installed"
+        sys.exit(1)
+
+    boards = makePositions(options.positions, options.seed)
+    startTime = time.time()
+    expected = oneAtATime(boards)
+    scalarTime = time.time() - startTime
+    startTime = time.time()
+    result, packed = batched(boards)
+    batchTime = time.time() - packed
+    if not result==expected:
+        print "FAIL: batch results differ"
+        sys.exit(1)
+    print "%d positions" % len(boards)
+    print "One at a time: %8.4fs %10d positions/s" % (scalarTime, len(boards) / max(scalarTime, 1e-9))
+    print "Packing:       %8.4fs" % (packed - startTime)
+    print "Batch:         %8.4fs %10d positions/s  speedup %.2f" % (batchTime, len(boards) / max(batchTime, 1e-9), scalarTime / max(batchTime, 1e-9))
+
+if __name__=="__main__":
+    main()
@@ -1,21 +1,168 @@
 from .. import Rules
 from .. import Board
 
+import os
+import sys
+import time
+import multiprocessing
+from optparse import OptionParser
+
 # python -m antichess.test.perft
+# python -m antichess.test.perft --fen "8/8/8/pP6/8/8/8/8 w - a6 0 1" -d 1-3 --divide
+# python -m antichess.test.perft --suite antichess/test/perftsuite.epd -d 1-3
+# python -m antichess.test.perft -d 5 --workers 4
 
 rules = Rules.Suicide()
 
-def perft(board, depth, colour):
+# Reference node counts under antichess rules, one position per line:
+#   <FEN> ;D1 <nodes> ;D2 <nodes> ...
+SUITE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perftsuite.epd")
+
+def perft(board, depth, colour, enforceCaptures=True):
     nodes = 0
     if depth==0:
         return 1
-    moves, _ = rules.getAllValidMoves(board, colour, enforceCaptures=False)
+    moves = rules.getAllValidCodes(board, colour, enforceCaptures=enforceCaptures)
+    # No need to make the last moves just to count them
+    if depth==1:
+        return len(moves)
     for move in moves:
         board.makeMove(move)
-        nodes = nodes + perft(board, depth-1, 1-colour)
+        nodes = nodes + perft(board, depth-1, 1-colour, enforceCaptures)
         board.retractMove()
     return nodes
 
-if __name__=="__main__":
+def divide(board, depth, colour, enforceCaptures=True):
+    """Node count below each root move, as a list of (move, nodes)."""
+    result = []
+    moves, _ = rules.getAllValidMoves(board, colour, enforceCaptures=enforceCaptures)
+    for move in moves:
+        board.makeMove(move)
+        result.append( (move, perft(board, depth-1, 1-colour, enforceCaptures)) )
+        board.retractMove()
+    return result
+
+def divideWorker(task):
+    # Runs in a pool process, with its own board
+    fen, index, depth, enforceCaptures = task
+    board = Board.Board()
+    board.setFEN(fen)
+    colour = board.sideToMove
+    moves = rules.getAllValidCodes(board, colour, enforceCaptures=enforceCaptures)
+    board.makeMove(moves[index])
+    return perft(board, depth-1, 1-colour, enforceCaptures)
+
+def parallelDivide(pool, fen, depth, enforceCaptures=True):
+    """As divide, but with root moves split across the processes in pool."""
     board = Board.Board()
-    print perft(board, 3, 0)
+    board.setFEN(fen)
+    moves, _ = rules.getAllValidMoves(board, board.sideToMove, enforceCaptures=enforceCaptures)
+    tasks = [ (fen, i, depth, enforceCaptures) for i in range(len(moves)) ]
+    return zip(moves, pool.map(divideWorker, tasks, chunksize=1))
+
+def readSuite(filename):
+    """List of (fen, {depth: nodes}) read from a suite file."""
+    suite = []
+    for line in open(filename):
+        line = line.strip()
+        if line=="" or line.startswith("#"):
+            continue
+        fields = line.split(";")
+        expected = {}
+        for field in fields[1:]:
+            d, nodes = field.split()
+            expected[int(d[1:])] = int(nodes)
+        suite.append( (fields[0].strip(), expected) )
+    return suite
+
+def parseDepths(text):
+    # "3" or "1-4"
+    if "-" in text:
+        lo, hi = text.split("-")
+        return range(int(lo), int(hi)+1)
+    return [int(text)]
+
+def runPosition(board, fen, depths, expected, showDivide=False, enforceCaptures=True, pool=None):
+    """Run perft on fen at each depth, printing timings. Returns (mismatches, total nodes)."""
+    board.setFEN(fen)
+    colour = board.sideToMove
+    print fen
+    failures = 0
+    total = 0
+    for depth in depths:
+        startTime = time.time()
+        if pool is not None and depth>1:
+            counts = parallelDivide(pool, fen, depth, enforceCaptures)
+        elif showDivide:
+            counts = divide(board, depth, colour, enforceCaptures)
+        else:
+            counts = None
+        if counts is not None:
+            if showDivide:
+                for move, nodes in sorted(counts, key=lambda c: str(c[0])):
+                    print "  %s: %d" % (move, nodes)
+            nodes = sum([n for m, n in counts])
+        else:
+            nodes = perft(board, depth, colour, enforceCaptures)
+        elapsed = time.time() - startTime
+        total += nodes
+        nps = nodes / max(elapsed, 1e-6)
+        if depth in expected and enforceCaptures:
+            if nodes==expected[depth]:
+                status = "OK"
+            else:
+                status = "FAIL (expected %d)" % expected[depth]
+                failures += 1
+        else:
+            status = ""
+        print "  depth %d: %10d nodes %8.2fs %10d nps %s" % (depth, nodes, elapsed, nps, status)
+    return failures, total
+
+def main():
+    parser = OptionParser(usage="python -m antichess.test.perft [options]")
+    parser.add_option("--fen", dest="fen", default=None,
+                      help="position to search (default: start position)", metavar="FEN")
+    parser.add_option("--suite", dest="suite", default=None,
+                      help="run every position in a suite file", metavar="FILE")
+    parser.add_option("-d", "--depth", dest="depths", default="1-3",
+                      help="depth or range of depths, e.g. 4 or 1-5", metavar="DEPTHS")
+    parser.add_option("--divide", action="store_true", dest="divide", default=False,
+                      help="print the node count below each root move")
+    parser.add_option("--pseudo", action="store_true", dest="pseudo", default=False,
+                      help="don't enforce captures (counts are not checked)")
+    parser.add_option("-w", "--workers", type="int", dest="workers", default=1,
+                      help="split root moves across this many processes", metavar="N")
+    (options, args) = parser.parse_args()
+
+    depths = parseDepths(options.depths)
+    reference = dict(readSuite(SUITE))
+    if options.suite:
+        positions = readSuite(options.suite)
+    else:
+        fen = options.fen or Board.START_FEN
+        positions = [ (fen, reference.get(fen, {})) ]
+
+    board = Board.Board()
+    if options.workers>1:
+        pool = multiprocessing.Pool(options.workers)
+    else:
+        pool = None
+    failures = 0
+    totalNodes, startTime = 0, time.time()
+    for fen, expected in positions:
+        # Skip depths with no reference count when running a suite
+        if options.suite:
+            run = [d for d in depths if d in expected]
+        else:
+            run = depths
+        f, nodes = runPosition(board, fen, run, expected, options.divide, not options.pseudo, pool)
+        failures += f
+        totalNodes += nodes
+    elapsed = time.time() - startTime
+    print "Total: %d nodes in %.2fs (%d nps)" % (totalNodes, elapsed, totalNodes / max(elapsed, 1e-6))
+    if failures>0:
+        print "%d FAILED" % failures
+        sys.exit(1)
+
+if __name__=="__main__":
+    main()
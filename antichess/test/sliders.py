@@ -0,0 +1,92 @@
+from .. import Board
+from .. import Pieces
+from .. import Rules
+from .. import Sliders
+from . import perft
+
+import random
+import sys
+import time
+from optparse import OptionParser
+
+# python -m antichess.test.sliders
+# python -m antichess.test.sliders -n 2000 -r 20
+#
+# Compares sliding attack generation by table lookup (Sliders) with walking
+# the rays square by square, over the perft suite positions and positions
+# reached by random play from them. Both must give the same attacks.
+
+SLIDER_DIRECTIONS = {Pieces.ROOK: [0, 1, 2, 3], Pieces.BISHOP: [4, 5, 6, 7], Pieces.QUEEN: range(8)}
+LOOKUP = {Pieces.ROOK: Sliders.rookAttacks, Pieces.BISHOP: Sliders.bishopAttacks, Pieces.QUEEN: Sliders.queenAttacks}
+
+def makeCorpus(size, seed):
+    """List of (occupied, [(square, kind), ...]) for the sliders in size positions."""
+    rules = Rules.Suicide()
+    rng = random.Random(seed)
+    fens = [fen for fen, expected in perft.readSuite(perft.SUITE)]
+    board = Board.Board()
+    corpus = []
+    while len(corpus) < size:
+        board.setFEN(rng.choice(fens))
+        colour = board.sideToMove
+        for ply in range(rng.randint(0, 40)):
+            moves = rules.getAllValidCodes(board, colour)
+            if len(moves)==0:
+                break
+            board.makeMove(rng.choice(moves))
+            colour = 1-colour
+        sliders = [(sq, p.kind) for sq, p in enumerate(board.pieces) if p is not None and p.kind in SLIDER_DIRECTIONS]
+        corpus.append( (board.occupancy[0] | board.occupancy[1], sliders) )
+    return corpus
+
+def rayWalk(corpus):
+    result = []
+    for occupied, sliders in corpus:
+        for sq, kind in sliders:
+            result.append(Sliders.rayAttacks(sq, occupied, SLIDER_DIRECTIONS[kind]))
+    return result
+
+def lookup(corpus):
+    result = []
+    for occupied, sliders in corpus:
+        for sq, kind in sliders:
+            result.append(LOOKUP[kind](sq, occupied))
+    return result
+
+def timeIt(function, corpus, repeats):
+    best = None
+    for i in range(repeats):
+        startTime = time.time()
+        result = function(corpus)
+        elapsed = time.time() - startTime
+        if best is None or elapsed < best:
+            best = elapsed
+    return result, best
+
+def main():
+    parser = OptionParser(usage="python -m antichess.test.sliders [options]")
+    parser.add_option("-n", "--positions", type="int", dest="positions", default=1000,
+                      help="number of positions in the corpus", metavar="N")
+    parser.add_option("-r", "--repeats", type="int", dest="repeats", default=10,
+                      help="time each method this many times and keep the best", metavar="N")
+    parser.add_option("--seed", type="int", dest="seed", default=1,
+                      help="random seed for the corpus", metavar="SEED")
+    (options, args) = parser.parse_args()
+
+    startTime = time.time()
+    Sliders.load()
+    print "Tables ready in %.3fs (cache %s)" % (time.time() - startTime, Sliders.CACHE_FILE)
+    corpus = makeCorpus(options.positions, options.seed)
+    count = sum([len(sliders) for occupied, sliders in corpus])
+    print "%d positions, %d sliding pieces" % (len(corpus), count)
+
+    walked, walkTime = timeIt(rayWalk, corpus, options.repeats)
+    looked, lookTime = timeIt(lookup, corpus, options.repeats)
+    if not walked==looked:
+        print "FAIL: lookup attacks differ from ray walking"
+        sys.exit(1)
+    print "Ray walking: %8.4fs %10d attacks/s" % (walkTime, count / max(walkTime, 1e-9))
+    print "Lookup:      %8.4fs %10d attacks/s  speedup %.2f" % (lookTime, count / max(lookTime, 1e-9), walkTime / max(lookTime, 1e-9))
+
+if __name__=="__main__":
+    main()
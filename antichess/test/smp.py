@@ -0,0 +1,54 @@
+from .. import Board
+from .. import Player
+from . import perft
+
+import time
+from optparse import OptionParser
+
+# python -m antichess.test.smp -d 4 -w 4
+#
+# Searches each position to a fixed depth with a single process and with lazy
+# SMP, and reports the time taken by each and the effective speedup.
+
+def timeSearch(fen, depth, workers, hashMB):
+    board = Board.Board()
+    board.setFEN(fen)
+    ai = Player.AIPlayer(board.sideToMove, maxDepth=depth, hashMB=hashMB, workers=workers, lazySMP=workers>1, quiet=True)
+    # The processes last for a whole game, so starting them is not timed
+    ai.startWorkers()
+    startTime = time.time()
+    move = ai.getMove(board, 1e9)
+    elapsed = time.time() - startTime
+    ai.close()
+    return move, elapsed, ai.nodes + ai.helperNodes
+
+def main():
+    parser = OptionParser(usage="python -m antichess.test.smp [options]")
+    parser.add_option("--fen", dest="fen", default=None,
+                      help="position to search (default: positions from the perft suite)", metavar="FEN")
+    parser.add_option("-d", "--depth", type="int", dest="depth", default=4,
+                      help="search depth", metavar="DEPTH")
+    parser.add_option("-w", "--workers", type="int", dest="workers", default=4,
+                      help="number of lazy SMP processes", metavar="N")
+    parser.add_option("--hash-mb", type="int", dest="hashMB", default=16,
+                      help="transposition table size in megabytes", metavar="MB")
+    (options, args) = parser.parse_args()
+
+    if options.fen:
+        fens = [options.fen]
+    else:
+        fens = [fen for fen, expected in perft.readSuite(perft.SUITE) if expected.get(1, 0)>1]
+
+    total = [0.0, 0.0]
+    for fen in fens:
+        move1, time1, nodes1 = timeSearch(fen, options.depth, 1, options.hashMB)
+        moveN, timeN, nodesN = timeSearch(fen, options.depth, options.workers, options.hashMB)
+        total[0] += time1
+        total[1] += timeN
+        print fen
+        print "  1 process:   %s %8.2fs %8d nodes" % (move1, time1, nodes1)
+        print "  %d processes: %s %8.2fs %8d nodes  speedup %.2f" % (options.workers, moveN, timeN, nodesN, time1 / max(timeN, 1e-6))
+    print "Overall speedup with %d processes: %.2f" % (options.workers, total[0] / max(total[1], 1e-6))
+
+if __name__=="__main__":
+    main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import shutil
+import tempfile
+from antichess import Archive
+from antichess.Board import START_FEN
+from antichess.Move import MOVE_MASK, SQUARES, pack
+from antichess.Game import playQuietGame
+from antichess.Player import RandomPlayer
+
+class ArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.dir, "games.bin")
+        self.games = [playQuietGame([RandomPlayer(0), RandomPlayer(1)], 1, maxPlies=80) for i in range(5)]
+        # The archive keeps moves without their flags
+        self.stored = [([code & MOVE_MASK for code in codes], score) for codes, score in self.games]
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write(self, games, close=True):
+        writer = Archive.ArchiveWriter(self.filename)
+        for game in games:
+            writer.addGame(*game)
+        if close:
+            writer.close()
+        else:
+            writer.f.flush()
+        return writer
+
+    def testRoundTrip(self):
+        fen = "8/8/8/8/1Pp5/8/8/8 b - b3 0 1"
+        self.write(self.games + [([], 0.5), ([pack(SQUARES["c4"], SQUARES["b3"])], 1.0, fen)])
+        reader = Archive.ArchiveReader(self.filename)
+        self.assertEqual(len(reader), 7)
+        for i, (codes, score) in enumerate(self.stored):
+            self.assertEqual(reader[i], (codes, score, START_FEN))
+        self.assertEqual(reader[5], ([], 0.5, START_FEN))
+        self.assertEqual(reader[-1][2], fen)
+        self.assertEqual(list(reader), [reader[i] for i in range(7)])
+        self.assertRaises(IndexError, reader.__getitem__, 7)
+        # The moves replay, and take two bytes each
+        board = Archive.replay(*reader[-1][::2])
+        self.assertEqual(board.getNumPieces(0), 0)
+        plies = sum([len(codes) for codes, score in self.games]) + 1
+        self.assertEqual(os.path.getsize(self.filename),
+                         Archive.HEADER.size + 7*(Archive.GAME.size + Archive.OFFSET.size) + len(fen) + 2*plies)
+        reader.close()
+
+    def testUnclosed(self):
+        writer = self.write(self.games, close=False)
+        reader = Archive.ArchiveReader(self.filename)
+        self.assertEqual(len(reader), 5)
+        self.assertEqual(reader[4][:2], self.stored[4])
+        reader.close()
+        writer.close()
+
+    def testBadFile(self):
+        f = open(self.filename, "wb")
+        f.write("not an archive at all, really")
+        f.close()
+        self.assertRaises(Archive.ArchiveError, Archive.ArchiveReader, self.filename)
+
+if __name__=="__main__":
+    unittest.main()
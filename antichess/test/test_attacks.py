@@ -0,0 +1,58 @@
+import unittest
+from antichess import Attacks
+from antichess import Bitboard
+from antichess import Pieces
+from antichess.Board import Board
+
+class AttackTablesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board()
+
+    def square(self, name):
+        return self.board.stringToSquare(name)
+
+    def testStepTargets(self):
+        a8, b6, c7 = self.square("a8"), self.square("b6"), self.square("c7")
+        self.assertEqual(sorted(Attacks.KNIGHT_TARGETS[a8]), sorted([b6, c7]))
+        self.assertEqual(Attacks.KNIGHT_ATTACKS[a8], Bitboard.BIT[b6] | Bitboard.BIT[c7])
+        self.assertEqual(len(Attacks.KING_TARGETS[self.square("h1")]), 3)
+        self.assertEqual(Bitboard.popcount(Attacks.KING_ATTACKS[self.square("e4")]), 8)
+
+    def testRays(self):
+        d4 = self.square("d4")
+        up = Attacks.RAYS[d4][0]
+        self.assertEqual(up, [self.square(n) for n in ["d5", "d6", "d7", "d8"]])
+        self.assertEqual(Attacks.RAY_MASKS[d4][0], Attacks.BETWEEN[d4][self.square("d8")] | Bitboard.BIT[self.square("d8")])
+        self.assertEqual(len(Attacks.ROOK_TARGETS[d4]), 14)
+        self.assertEqual(len(Attacks.BISHOP_TARGETS[d4]), 13)
+
+    def testBetween(self):
+        b2, f6, e4 = self.square("b2"), self.square("f6"), self.square("e4")
+        self.assertEqual(Attacks.BETWEEN[b2][f6], Attacks.BETWEEN[f6][b2])
+        self.assertEqual(sorted(Bitboard.toList(Attacks.BETWEEN[b2][f6])), sorted([self.square(n) for n in ["c3", "d4", "e5"]]))
+        self.assertEqual(Attacks.BETWEEN[b2][e4], 0)
+        self.assertEqual(Attacks.BETWEEN[b2][self.square("c3")], 0)
+
+    def testClearPath(self):
+        self.board.clear()
+        self.board.setPiece("d4", Pieces.Pawn(1))
+        self.assertFalse(self.board.hasClearPath([6, 1], [2, 5]))
+        self.assertTrue(self.board.hasClearPath([6, 1], [5, 2]))
+        self.assertFalse(self.board.hasClearPath([4, 0], [4, 7]))
+        self.assertTrue(self.board.hasClearPath([3, 0], [3, 7]))
+        self.assertFalse(self.board.hasClearPath([0, 3], [7, 3]))
+        # Squares not on a line are not checked
+        self.assertTrue(self.board.hasClearPath([6, 1], [4, 2]))
+
+    def testPlausibleMoves(self):
+        rook = Pieces.PIECES[0][Pieces.ROOK].getPlausibleMoves([4, 3])
+        self.assertEqual(len(rook), 14)
+        self.assertFalse([4, 3] in rook)
+        queen = Pieces.PIECES[1][Pieces.QUEEN].getPlausibleMoves([0, 0])
+        self.assertEqual(len(queen), 21)
+        king = Pieces.PIECES[0][Pieces.KING].getPlausibleMoves([7, 7])
+        self.assertEqual(sorted(king), [[6, 6], [6, 7], [7, 6]])
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import random
+from antichess import Batch
+from antichess.Board import Board
+from antichess.Move import CAPTURE
+from antichess.Player import AIPlayer
+from antichess.Rules import Suicide
+from antichess.test import perft
+
+@unittest.skipUnless(Batch.available(), "needs NumPy")
+class BatchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = Suicide()
+        self.ai = AIPlayer(0, quiet=True, hashMB=1)
+
+    def positions(self, count, seed):
+        rng = random.Random(seed)
+        fens = [fen for fen, expected in perft.readSuite(perft.SUITE)]
+        board = Board()
+        boards = []
+        while len(boards) < count:
+            board.setFEN(rng.choice(fens))
+            for ply in range(rng.randint(0, 60)):
+                moves = self.rules.getAllValidCodes(board, board.sideToMove)
+                if len(moves)==0:
+                    break
+                board.makeMove(rng.choice(moves))
+            boards.append(board.copy())
+        return boards
+
+    def testMatchesRules(self):
+        boards = self.positions(300, 7)
+        squares, sides, enpassant = Batch.pack(boards)
+        moves, captures, own, theirs = Batch.countMoves(squares, sides, enpassant)
+        scores = Batch.evaluate(squares, sides, enpassant)
+        for i, board in enumerate(boards):
+            colour = board.sideToMove
+            codes = self.rules.getAllValidCodes(board, colour)
+            self.assertEqual(moves[i], len(codes))
+            self.assertEqual(captures[i], len([code for code in codes if code & CAPTURE]))
+            self.assertEqual((own[i], theirs[i]), (board.getNumPieces(colour), board.getNumPieces(1-colour)))
+            self.assertEqual(scores[i], self.ai.heuristic(board, colour, codes))
+
+    def testEnpassantAndPromotion(self):
+        board = Board()
+        # Only capture is en passant; Black also has a promotion to make next
+        board.setFEN("8/8/8/3Pp3/8/8/p7/8 w - e6 0 1")
+        squares, sides, enpassant = Batch.pack([board])
+        self.assertEqual(list(enpassant), [4])
+        moves, captures, own, theirs = Batch.countMoves(squares, sides, enpassant)
+        self.assertEqual((moves[0], captures[0]), (1, 1))
+        board.setFEN("8/8/8/3P4/8/8/p7/8 b - - 0 1")
+        squares, sides, enpassant = Batch.pack([board])
+        moves, captures, own, theirs = Batch.countMoves(squares, sides, enpassant)
+        self.assertEqual((moves[0], captures[0]), (5, 0))
+
+    def testPackFENs(self):
+        boards = self.positions(50, 3)
+        fens = [board.getFEN() for board in boards]
+        for packed, expected in zip(Batch.packFENs(fens), Batch.pack(boards)):
+            self.assertEqual(packed.tolist(), expected.tolist())
+        squares, sides, enpassant = Batch.packFENs(perft.SUITE)
+        self.assertEqual(squares.shape, (len(perft.readSuite(perft.SUITE)), 64))
+
+if __name__=="__main__":
+    unittest.main()
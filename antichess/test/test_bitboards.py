@@ -0,0 +1,93 @@
+import unittest
+import random
+from antichess.Board import Board
+from antichess import Pieces
+from antichess import Bitboard
+from antichess.Rules import Suicide
+from antichess.Move import Move
+
+backRank = [Pieces.Rook, Pieces.Knight, Pieces.Bishop, Pieces.Queen, \
+            Pieces.King, Pieces.Bishop, Pieces.Knight, Pieces.Rook]
+
+def setStartPosition(board):
+    board.clear()
+    for col, file in enumerate("abcdefgh"):
+        board.setPiece(file + "8", backRank[col](1))
+        board.setPiece(file + "7", Pieces.Pawn(1))
+        board.setPiece(file + "2", Pieces.Pawn(0))
+        board.setPiece(file + "1", backRank[col](0))
+
+class BitboardTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board()
+        self.rules = Suicide()
+
+    def assertBitboardsMatchPieces(self, board):
+        bitboards = [[0]*6, [0]*6]
+        for sq in range(64):
+            p = board.pieces[sq]
+            if p is not None:
+                bitboards[p.colour][p.kind] |= Bitboard.BIT[sq]
+        self.assertEqual(board.bitboards, bitboards)
+        for colour in [0, 1]:
+            self.assertEqual(board.occupancy[colour], sum(bitboards[colour]))
+
+    def testStartPosition(self):
+        setStartPosition(self.board)
+        self.assertBitboardsMatchPieces(self.board)
+        self.assertEqual(self.board.getNumPieces(0), 16)
+        self.assertEqual(self.board.getNumPieces(1), 16)
+        self.assertEqual(Bitboard.popcount(self.board.bitboards[0][Pieces.PAWN]), 8)
+        self.assertEqual(self.board.getAllPieces(1)[0], [0, 0])
+        self.assertEqual(self.board.getAllPieces(0)[-1], [7, 7])
+
+    def testSetPieceAndClear(self):
+        self.board.clear()
+        self.assertEqual(self.board.occupancy, [0, 0])
+        self.board.setPiece("e4", Pieces.Queen(0))
+        self.board.setPiece("e4", Pieces.Knight(1))
+        self.assertBitboardsMatchPieces(self.board)
+        self.assertEqual(self.board.getNumPieces(0), 0)
+        self.assertEqual(self.board.getAllPieces(1), [[4, 4]])
+
+    def testEnPassantAndPromotion(self):
+        self.board.clear()
+        self.board.setPiece("a5", Pieces.Pawn(0))
+        self.board.setPiece("b7", Pieces.Pawn(1))
+        self.board.setPiece("g2", Pieces.Pawn(1))
+        self.board.setPiece("h1", Pieces.Rook(0))
+        self.board.makeMove(Move.fromNotation("b7b5", 1))
+        self.board.makeMove(Move.fromNotation("a5b6", 0))
+        self.assertBitboardsMatchPieces(self.board)
+        self.assertEqual(self.board.getNumPieces(1), 1)
+        self.board.makeMove(Move.fromNotation("g2h1K", 1))
+        self.assertBitboardsMatchPieces(self.board)
+        self.assertEqual(self.board.bitboards[1][Pieces.KING], Bitboard.BIT[63])
+        self.board.retractMove()
+        self.board.retractMove()
+        self.assertBitboardsMatchPieces(self.board)
+        self.assertEqual(self.board.getNumPieces(0), 2)
+        self.assertEqual(self.board.getNumPieces(1), 2)
+
+    def testRandomGames(self):
+        rng = random.Random(1)
+        for game in range(3):
+            setStartPosition(self.board)
+            colour = 0
+            made = 0
+            for ply in range(60):
+                moves, _ = self.rules.getAllValidMoves(self.board, colour)
+                if len(moves)==0:
+                    break
+                self.board.makeMove(rng.choice(moves))
+                made += 1
+                self.assertBitboardsMatchPieces(self.board)
+                colour = 1-colour
+            for i in range(made):
+                self.board.retractMove()
+                self.assertBitboardsMatchPieces(self.board)
+            self.assertEqual(self.board.getNumPieces(0), 16)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import unittest
+import pickle
+from antichess.Board import Board, START_FEN
+from antichess import Pieces
+from antichess.Rules import Suicide
+from antichess.Move import Move
+
+class BoardStateTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = Suicide()
+
+    def testBoardsAreIndependent(self):
+        first = Board()
+        first.clear()
+        first.setPiece("e4", Pieces.Queen(0))
+        second = Board()
+        self.assertEqual(len(second.pieces), 64)
+        self.assertEqual(second.getFEN(), START_FEN)
+        second.makeMove(Move.fromNotation("e2e3", 0))
+        self.assertEqual(len(first.movesMade), 0)
+        self.assertEqual(first.getNumPieces(0), 1)
+        self.assertTrue(isinstance(first.pieces[36], Pieces.Queen))
+
+    def testCopy(self):
+        board = Board()
+        board.makeMove(Move.fromNotation("d2d4", 0))
+        clone = board.copy()
+        self.assertEqual(clone.getFEN(), board.getFEN())
+        self.assertEqual(clone.hash, board.hash)
+        # The en passant history is copied too
+        clone.makeMove(Move.fromNotation("e7e5", 1))
+        clone.makeMove(Move.fromNotation("d4e5", 0))
+        self.assertEqual(board.getNumPieces(1), 16)
+        self.assertEqual(len(board.movesMade), 1)
+        self.assertEqual(clone.getNumPieces(1), 15)
+        clone.retractMove()
+        clone.retractMove()
+        self.assertEqual(clone.getFEN(), board.getFEN())
+        self.assertEqual(clone.hash, board.hash)
+        board.retractMove()
+        self.assertEqual(board.getFEN(), START_FEN)
+        self.assertEqual(len(clone.movesMade), 1)
+
+    def testPackedMoves(self):
+        # Moves are kept packed, and only made into Move objects on request
+        board = Board()
+        board.setFEN("7k/P7/8/8/8/8/8/8 w - - 0 1")
+        code = [c for c in self.rules.getAllValidCodes(board, 0) if str(Move.fromCode(c))=="a7a8K"][0]
+        board.makeMove(code)
+        self.assertEqual(board.movesMade[-1][0], code)
+        self.assertTrue(isinstance(board.pieces[0], Pieces.King))
+        self.assertEqual(str(board.getLastMove()), "a7a8K")
+        self.assertEqual(board.getLastMovedPiece().colour, 0)
+        board.retractMove()
+        self.assertTrue(isinstance(board.pieces[8], Pieces.Pawn))
+        self.assertEqual(board.getFEN(), "7k/P7/8/8/8/8/8/8 w - - 0 1")
+
+    def testCopySearch(self):
+        board = Board()
+        moves, _ = self.rules.getAllValidMoves(board, 0)
+        for move in moves:
+            clone = board.copy()
+            clone.makeMove(move)
+            self.assertEqual(len(self.rules.getAllValidMoves(clone, 1)[0]), 20)
+        self.assertEqual(board.getFEN(), START_FEN)
+
+    def testSharedPieces(self):
+        board = Board()
+        self.assertTrue(board.pieces[48] is board.pieces[55])
+        self.assertTrue(board.pieces[48] is Pieces.getPiece(Pieces.PAWN, 0))
+        self.assertRaises(AttributeError, setattr, board.pieces[48], "colour", 1)
+        self.assertTrue(pickle.loads(pickle.dumps(board.pieces[0], 2)) is board.pieces[0])
+        # Promotion and its undo reuse the shared pieces
+        board.setFEN("8/P7/8/8/8/8/8/7k w - - 0 1")
+        moves, _ = self.rules.getAllValidMoves(board, 0)
+        for move in moves:
+            board.makeMove(move)
+            self.assertTrue(board.pieces[0] is move.promoteTo)
+            self.assertTrue(board.pieces[0] is Pieces.getPiece(move.promoteTo.kind, 0))
+            board.retractMove()
+            self.assertTrue(board.pieces[8] is Pieces.PIECES[0][Pieces.PAWN])
+        self.assertTrue(Move.fromNotation("a7a8Q", 0).promoteTo is Pieces.PIECES[0][Pieces.QUEEN])
+        # No per-instance dict
+        self.assertFalse(hasattr(Pieces.Pawn(0), '__dict__'))
+        for piece in Pieces.PIECES[1]:
+            self.assertFalse(hasattr(piece, '__dict__'))
+
+    def assertPieceListsMatch(self, board):
+        for colour in [0, 1]:
+            squares = [sq for sq in range(64) if board.pieces[sq] is not None and board.pieces[sq].colour==colour]
+            self.assertEqual(sorted(board.pieceSquares[colour]), squares)
+            for i, sq in enumerate(board.pieceSquares[colour]):
+                self.assertEqual(board.pieceIndex[sq], i)
+            for kind in range(6):
+                self.assertEqual(board.material[colour][kind], len([sq for sq in squares if board.pieces[sq].kind==kind]))
+            self.assertEqual(board.getNumPieces(colour), len(squares))
+
+    def testPieceLists(self):
+        board = Board()
+        self.assertPieceListsMatch(board)
+        self.assertEqual(board.material[1], [8, 2, 2, 2, 1, 1])
+        # En passant and promotion, and their undo
+        board.setFEN("1n6/P7/8/3pP3/8/8/8/8 w - d6 0 1")
+        self.assertPieceListsMatch(board)
+        for name in ["e5d6", "a7b8K", "a7a8Q"]:
+            board.makeMove(Move.fromNotation(name, 0))
+            self.assertPieceListsMatch(board)
+            board.retractMove()
+            self.assertPieceListsMatch(board)
+        board.makeMove(Move.fromNotation("a7b8K", 0))
+        self.assertEqual(board.material[0][Pieces.KING], 1)
+        self.assertEqual(board.material[0][Pieces.PAWN], 1)
+        self.assertEqual(board.getNumPieces(1), 1)
+        # Copies keep their own lists
+        clone = board.copy()
+        clone.makeMove(Move.fromNotation("d5d4", 1))
+        clone.makeMove(Move.fromNotation("b8c8", 0))
+        self.assertPieceListsMatch(clone)
+        self.assertPieceListsMatch(board)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,92 @@
+import unittest
+import os
+import shutil
+import tempfile
+from antichess import Book
+from antichess import Move
+from antichess.Board import Board
+from antichess.Game import playQuietGame
+from antichess.Player import AIPlayer, RandomPlayer
+
+GAMES = """# Two wins for White with 1. e3, a loss with 1. g3
+e2e3 b7b5 f1b5 c7c6 1-0
+e2e3 b7b5 f1b5 c7c6 1-0
+e2e3 e7e6 1/2-1/2
+g2g3 e7e6 0-1
+"""
+
+class BookTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.games = os.path.join(self.dir, "games.txt")
+        f = open(self.games, "w")
+        f.write(GAMES)
+        f.close()
+        self.filename = os.path.join(self.dir, "book.bin")
+        builder = Book.BookBuilder(maxPly=3)
+        for codes, score in Book.readGames(self.games):
+            builder.addGame(codes, score)
+        self.count = builder.write(self.filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testProbe(self):
+        book = Book.OpeningBook(self.filename)
+        board = Board()
+        # e3, g3; e3 b5, e3 e6, g3 e6; e3 b5 Bxb5
+        self.assertEqual(self.count, 6)
+        entries = sorted([(str(Move.Move.fromCode(move)), games, halfPoints) for move, games, halfPoints in book.probe(board.hash)])
+        self.assertEqual(entries, [("e2e3", 3, 5), ("g2g3", 1, 0)])
+        board.makeMove(Move.Move.fromNotation("e2e3", 0))
+        entries = sorted([(str(Move.Move.fromCode(move)), games, halfPoints) for move, games, halfPoints in book.probe(board.hash)])
+        self.assertEqual(entries, [("b7b5", 2, 0), ("e7e6", 1, 1)])
+        # Out of the book
+        board.makeMove(Move.Move.fromNotation("e7e6", 1))
+        self.assertEqual(book.probe(board.hash), [])
+        book.close()
+
+    def testGetMove(self):
+        board = Board()
+        ai = AIPlayer(0, 3, quiet=True, bookFile=self.filename)
+        self.assertEqual(str(ai.getMove(board, 60)), "e2e3")
+        self.assertTrue(ai.lastRecord["book"])
+        self.assertEqual(ai.lastRecord["nodes"], 0)
+        board.makeMove(Move.Move.fromNotation("a2a3", 0))
+        ai.colour = 1
+        ai.getMove(board, 0.5)
+        self.assertFalse(ai.lastRecord["book"])
+        # The book isn't consulted when the board has the other side to move
+        board = Board()
+        board.sideToMove = 1
+        ai.colour = 0
+        probed = []
+        ai.book.chooseMove = lambda board, validMoves: probed.append(board)
+        ai.getMove(board, 0.5)
+        self.assertEqual(probed, [])
+        self.assertFalse(ai.lastRecord["book"])
+
+    def testGameText(self):
+        games = list(Book.readGames(self.games))
+        self.assertEqual(len(games), 4)
+        codes, score = games[0]
+        self.assertEqual(score, 1.0)
+        self.assertEqual(Book.formatGame(codes, score), "e2e3 b7b5 f1b5 c7c6 1-0")
+        self.assertRaises(Book.BookError, Book.parseGame, "e2e3 b7b5")
+
+    def testQuietGame(self):
+        codes, score = playQuietGame([RandomPlayer(0), RandomPlayer(1)], 1)
+        board = Board()
+        for code in codes:
+            board.makeMove(code)
+        colour = board.sideToMove
+        if score==0.5:
+            self.assertEqual(len(codes), 400)
+        else:
+            # The side to move has won
+            self.assertEqual(score, 1.0 - colour)
+            self.assertEqual(len(RandomPlayer(colour).rules.getAllValidCodes(board, colour)) * board.getNumPieces(colour), 0)
+
+if __name__=="__main__":
+    unittest.main()
@@ -2,6 +2,7 @@ import unittest
 from antichess.Board import Board
 from antichess import Pieces
 from antichess.Rules import Suicide
+from antichess.Move import Move, CAPTURE, ENPASSANT, TYPECODE
 
 # TODO large scale move generation
 
@@ -142,5 +143,29 @@ class MovesGenerationTest(unittest.TestCase):
         self.board.setPiece("f4", Pieces.Queen(1))
         self.assertValidMoves(self.board, validMoves, 1)
 
+    def testPackedMoves(self):
+        move = Move.fromNotation("e2e4", 0)
+        self.assertEqual(move.unpack(), (52, 36))
+        self.assertEqual(move.fr, [6, 4])
+        self.assertEqual(move[1], [4, 4])
+        self.assertEqual(str(Move.fromCode(move.code)), "e2e4")
+        promotion = Move.fromNotation("b2a1N", 1)
+        self.assertEqual(str(Move.fromCode(promotion.code)), "b2a1N")
+        self.assertTrue(Move.fromCode(promotion.code).promoteTo is Pieces.PIECES[1][Pieces.KNIGHT])
+        self.assertEqual(Move.fromNotation("a7a8K", 0).promoteTo, Pieces.PIECES[0][Pieces.KING])
+        self.assertEqual(self.board.stringToSquare("h1"), 63)
+        # Generated moves carry capture and en passant flags
+        self.board.setFEN("8/8/8/8/1Pp5/8/8/8 b - b3 0 1")
+        codes = self.rules.getAllValidCodes(self.board, 1)
+        self.assertEqual(codes.typecode, TYPECODE)
+        self.assertEqual(len(codes), 1)
+        self.assertEqual(str(Move.fromCode(codes[0])), "c4b3")
+        self.assertTrue(codes[0] & CAPTURE and codes[0] & ENPASSANT)
+        # Board.makeMove takes packed moves
+        self.board.makeMove(codes[0])
+        self.assertEqual(self.board.getFEN().split()[0], "8/8/8/8/8/1p6/8/8")
+        self.board.retractMove()
+        self.assertEqual(self.board.getFEN(), "8/8/8/8/1Pp5/8/8/8 b - b3 0 1")
+
 if __name__=="__main__":
     unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import random
+from antichess.Board import Board, START_FEN
+from antichess.Move import Move, MOVE_MASK
+from antichess.Ordering import MoveOrderer
+from antichess.Rules import Suicide
+
+class OrderingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board()
+        self.orderer = MoveOrderer()
+        self.rules = Suicide()
+
+    def codes(self, fen):
+        self.board.setFEN(fen)
+        codes = list(self.rules.getAllValidCodes(self.board, self.board.sideToMove, enforceCaptures=False))
+        random.shuffle(codes)
+        return codes
+
+    def order(self, codes, ply=0, ttMove=0):
+        return [str(Move.fromCode(code)) for code in self.orderer.orderMoves(self.board, codes, 0, ply, ttMove)]
+
+    def code(self, codes, text):
+        return [code for code in codes if str(Move.fromCode(code))==text][0]
+
+    def testCaptures(self):
+        # Most valuable victim first, then least valuable attacker
+        codes = self.codes("7k/8/8/3q2r1/2P5/5N2/8/3Q3K w - - 0 1")
+        self.assertEqual(self.order(codes)[:3], ["c4d5", "d1d5", "f3g5"])
+        # The hash move comes before any capture
+        ttMove = self.code(codes, "h1h2") & MOVE_MASK
+        self.assertEqual(self.order(codes, ttMove=ttMove)[:4], ["h1h2", "c4d5", "d1d5", "f3g5"])
+
+    def testKillersAndHistory(self):
+        codes = self.codes(START_FEN)
+        a, b = self.code(codes, "a2a3"), self.code(codes, "h2h4")
+        # Quiet moves keep their order until there are killers or history
+        self.assertEqual(self.order(codes), [str(Move.fromCode(code)) for code in codes])
+        self.orderer.recordCutoff(a, 0, 2, 1)
+        self.orderer.recordCutoff(b, 0, 5, 10)
+        # A killer comes before a move with more history
+        self.assertEqual(self.order(codes, ply=2)[:2], ["a2a3", "h2h4"])
+        self.assertEqual(self.order(codes, ply=5)[:2], ["h2h4", "a2a3"])
+        # At other plies only the history counts
+        self.assertEqual(self.order(codes, ply=3)[:2], ["h2h4", "a2a3"])
+        self.orderer.recordCutoff(a, 0, 7, 11)
+        self.assertEqual(self.order(codes, ply=3)[:2], ["a2a3", "h2h4"])
+        # History is kept per colour
+        self.assertEqual(self.orderer.history[1][a & 4095], 0)
+        # A new search forgets the killers and halves the history
+        self.orderer.newSearch()
+        self.assertEqual(self.orderer.killers[2], [0, 0])
+        self.assertEqual(self.orderer.history[0][b & 4095], 50)
+
+    def testCapturesNotRecorded(self):
+        codes = self.codes("7k/8/8/3q2r1/2P5/5N2/8/3Q3K w - - 0 1")
+        capture = self.code(codes, "f3g5")
+        self.orderer.recordCutoff(capture, 0, 2, 5)
+        self.assertEqual(self.orderer.killers[2], [0, 0])
+        self.assertEqual(self.orderer.history[0][capture & 4095], 0)
+
+if __name__=="__main__":
+    unittest.main()
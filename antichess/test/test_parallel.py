@@ -0,0 +1,33 @@
+import unittest
+from antichess.Board import Board, START_FEN
+from antichess.Player import AIPlayer
+from antichess.test import perft
+
+class ParallelSearchTest(unittest.TestCase):
+
+    def search(self, fen, depth, workers):
+        # (score, move) at depth, with the root moves in a fixed order
+        board = Board()
+        board.setFEN(fen)
+        ai = AIPlayer(board.sideToMove, maxDepth=depth+1, quiet=True, hashMB=1, workers=workers)
+        try:
+            moves = list(ai.rules.getAllValidCodes(board, ai.colour))
+            ai.timer.start(1e9)
+            ai.rootPly = len(board.movesMade)
+            if workers>1:
+                result = ai.getMoveToDepthParallel(board, moves, depth)
+            else:
+                result = ai.getMoveToDepth(board, moves, depth)
+            self.assertFalse(ai.timer.aborted)
+            self.assertEqual(board.getFEN(), fen)
+            return result
+        finally:
+            ai.close()
+
+    def testSameAsSerial(self):
+        fens = [START_FEN] + [fen for fen, expected in perft.readSuite(perft.SUITE)[1:4]]
+        for fen in fens:
+            self.assertEqual(self.search(fen, 2, 3), self.search(fen, 2, 1), fen)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+import multiprocessing
+from antichess.Board import Board, FENError, START_FEN, readFENs
+from antichess.Move import Move, PASS
+from antichess.test import perft
+
+class PerftTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board()
+
+    def testSuite(self):
+        # Deeper counts are checked with python -m antichess.test.perft --suite
+        for fen, expected in perft.readSuite(perft.SUITE):
+            self.board.setFEN(fen)
+            for depth in [1, 2, 3]:
+                self.assertEqual(perft.perft(self.board, depth, self.board.sideToMove), expected[depth], fen)
+            self.assertEqual(self.board.getFEN().split()[:4], fen.split()[:4])
+
+    def testDivide(self):
+        self.board.setFEN(START_FEN)
+        counts = perft.divide(self.board, 2, 0)
+        self.assertEqual(len(counts), 20)
+        self.assertEqual(sum([n for m, n in counts]), 400)
+
+    def testParallelDivide(self):
+        pool = multiprocessing.Pool(2)
+        try:
+            for fen, expected in perft.readSuite(perft.SUITE)[:3]:
+                self.board.setFEN(fen)
+                serial = [(str(move), n) for move, n in perft.divide(self.board, 3, self.board.sideToMove)]
+                parallel = [(str(move), n) for move, n in perft.parallelDivide(pool, fen, 3)]
+                self.assertEqual(parallel, serial)
+                self.assertEqual(sum([n for move, n in parallel]), expected[3])
+        finally:
+            pool.terminate()
+            pool.join()
+
+    def testFENRoundTrip(self):
+        self.board.setFEN(START_FEN)
+        self.assertEqual(self.board.getFEN(), START_FEN)
+        fen = "rnbqkbnr/ppp1pppp/8/8/2Pp4/8/PP1PPPPP/RNBQKBNR b - c3 0 1"
+        self.board.setFEN(fen)
+        self.assertEqual(self.board.getFEN(), fen)
+        self.assertEqual(self.board.sideToMove, 1)
+        # The en passant capture is available
+        self.assertTrue(self.board.hasCaptures(1))
+
+    def testFENCounters(self):
+        fen = "4k3/8/8/8/2Pp4/8/8/1N2K3 b - c3 0 23"
+        self.board.setFEN(fen)
+        self.assertEqual((self.board.enpassant, self.board.halfmoveClock, self.board.fullmoveNumber), (42, 0, 23))
+        # No moves were made, so there is nothing to retract
+        self.board.retractMove()
+        self.assertEqual(self.board.getFEN(), fen)
+        self.board.makeMove(Move.fromNotation("d4c3", 1))
+        self.assertEqual(self.board.getFEN(), "4k3/8/8/8/8/2p5/8/1N2K3 w - - 0 24")
+        self.board.makeMove(Move.fromNotation("e1d2", 0))
+        self.board.makeMove(PASS)
+        self.assertEqual(self.board.getFEN(), "4k3/8/8/8/8/2p5/3K4/1N6 w - - 2 25")
+        for i in range(3):
+            self.board.retractMove()
+        self.assertEqual(self.board.getFEN(), fen)
+        fen = "4k3/8/8/8/8/8/8/4K3 w - - 17 60"
+        self.board.setFEN(fen)
+        self.assertEqual(self.board.getFEN(), fen)
+        self.assertRaises(FENError, self.board.setFEN, "4k3/8/8/8/8/8/8/4K3 w - - x 60")
+        # The square behind a pawn of the side which just moved
+        self.assertRaises(FENError, self.board.setFEN, "4k3/8/8/8/2Pp4/8/8/4K3 w - c3 0 1")
+
+    def testBadFEN(self):
+        self.assertRaises(FENError, self.board.setFEN, "8/8/8 w - - 0 1")
+        self.assertRaises(FENError, self.board.setFEN, "9/8/8/8/8/8/8/8 w - - 0 1")
+        self.assertRaises(FENError, self.board.setFEN, "8/8/8/8/8/8/8/8 x - - 0 1")
+        self.assertRaises(FENError, self.board.setFEN, "8/8/8/8/8/8/8/8 w - e4 0 1")
+        self.assertRaises(FENError, self.board.setFEN, "ppppppppp/8/8/8/8/8/8/8 w - - 0 1")
+        # A bad FEN leaves the board as it was
+        self.board.setFEN(START_FEN)
+        self.assertRaises(FENError, self.board.setFEN, "8/8/8/8/8/8/8/8 x - - 0 1")
+        self.assertEqual(self.board.getFEN(), START_FEN)
+
+    def testReadFENs(self):
+        lines = ["# Comment", "", START_FEN, perft.readSuite(perft.SUITE)[1][0] + " ;D1 20", "8/8/8/8/1Pp5/8/8/8 b - b3 0 1"]
+        fens = [board.getFEN() for board in readFENs(lines)]
+        self.assertEqual(len(fens), 3)
+        self.assertEqual(fens[0], START_FEN)
+        self.assertEqual(fens[2], lines[4])
+        # From a file, reusing a board
+        boards = list(readFENs(perft.SUITE, self.board))
+        self.assertEqual(len(boards), len(perft.readSuite(perft.SUITE)))
+        self.assertTrue(boards[0] is self.board)
+        self.assertEqual(self.board.getFEN().split()[:4], perft.readSuite(perft.SUITE)[-1][0].split()[:4])
+
+if __name__=="__main__":
+    unittest.main()
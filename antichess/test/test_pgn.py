@@ -0,0 +1,119 @@
+import unittest
+from StringIO import StringIO
+from antichess import Book
+from antichess import Move
+from antichess import PGN
+from antichess.Board import Board, START_FEN
+from antichess.Game import playQuietGame
+from antichess.Player import RandomPlayer
+
+class PGNTest(unittest.TestCase):
+
+    def checkSAN(self, fen, expected):
+        # Every legal move in fen written as SAN, and read back
+        board = Board()
+        board.setFEN(fen)
+        sans = {}
+        for code in PGN.Rules.Suicide().getAllValidCodes(board, board.sideToMove):
+            san = PGN.toSAN(board, code)
+            self.assertEqual(PGN.fromSAN(board, san), code)
+            sans[san] = code
+        for san in expected:
+            self.assertTrue(san in sans, "%s not in %s" % (san, sorted(sans)))
+
+    def testSAN(self):
+        self.checkSAN(START_FEN, ["e4", "e3", "Nf3", "Na3"])
+        self.checkSAN("7k/8/8/8/8/5N2/8/1N6 w - - 0 1", ["Nbd2", "Nfd2", "Nc3"])
+        self.checkSAN("7k/8/8/R7/8/8/8/R7 w - - 0 1", ["R1a3", "R5a3", "Rh1"])
+        self.checkSAN("8/7k/8/8/8/Q7/8/Q1Q5 w - - 0 1", ["Qa1b2", "Q1a2", "Qcb2"])
+        self.checkSAN("7k/P7/8/8/8/8/8/8 w - - 0 1", ["a8=K", "a8=Q", "a8=N"])
+        self.checkSAN("1n5k/P7/8/8/8/8/8/8 w - - 0 1", ["axb8=K", "axb8=R"])
+        self.checkSAN("8/8/8/8/1Pp5/8/8/8 b - b3 0 1", ["cxb3"])
+        board = Board()
+        self.assertEqual(PGN.toSAN(board, PGN.fromSAN(board, "Nf3+!?")), "Nf3")
+        self.assertEqual(PGN.toSAN(board, PGN.fromSAN(board, "g1f3")), "Nf3")
+        for san in ["e5", "Ke2", "Nd2", "O-O", "e9"]:
+            self.assertRaises(PGN.PGNError, PGN.fromSAN, board, san)
+        board.setFEN("7k/8/8/R7/8/8/8/R7 w - - 0 1")
+        self.assertRaises(PGN.PGNError, PGN.fromSAN, board, "Ra3")
+
+    def testRoundTrip(self):
+        games = [playQuietGame([RandomPlayer(0), RandomPlayer(1)], 1, maxPlies=100) for i in range(5)]
+        text = "".join([PGN.formatGame([("Round", i + 1), ("White", 'say "hi"')], codes, score)
+                        for i, (codes, score) in enumerate(games)])
+        fen = "8/8/8/8/1Pp5/8/8/8 b - b3 0 7"
+        text += PGN.formatGame([], [], None, fen)
+        self.assertTrue('\n[FEN "%s"]\n[Result "*"]\n\n*\n' % fen in text)
+        read = list(PGN.readGames(StringIO(text)))
+        self.assertEqual(len(read), 6)
+        for (codes, score), game in zip(games, read):
+            self.assertEqual((game["codes"], game["score"], game["fen"]), (codes, score, START_FEN))
+        self.assertEqual(read[0]["tags"], [("Round", "1"), ("White", 'say "hi"'), ("Result", Book.resultText(games[0][1]))])
+        self.assertEqual((read[-1]["codes"], read[-1]["score"], read[-1]["fen"]), ([], None, fen))
+        # Parsing in other processes gives the same games
+        self.assertEqual(list(PGN.readGames(StringIO(text), workers=2, batchSize=2)), read)
+
+    def testMovetext(self):
+        text = """[Event "Test"]
+[Site "?"]
+% a line to skip
+[Result "0-1"]
+
+1. e3 {a comment
+over two [lines]} b5 2. Bxb5 $1 (2. Qh5 c6) c6 ; rest of the line
+3. Bxc6 Nxc6 4. e4 e5?! 0-1
+[Event "No result"]
+1.e4 e5
+[Event "Bad"]
+[Result "1-0"]
+
+1. e4 e4 1-0
+[Event "No moves"]
+[SetUp "1"]
+[FEN "7k/8/8/8/8/8/8/K7 w - - 0 1"]
+[Result "*"]
+
+[Event "After no moves"]
+[Result "1-0"]
+
+1. e3 b5 1-0
+"""
+        games = list(PGN.readGames(StringIO(text), skipErrors=True))
+        self.assertEqual(len(games), 4)
+        # A game with no moves keeps its own tags
+        self.assertEqual((games[2]["codes"], games[2]["score"], dict(games[2]["tags"])["Event"]), ([], None, "No moves"))
+        self.assertEqual(games[3]["tags"], [("Event", "After no moves"), ("Result", "1-0")])
+        self.assertEqual((len(games[3]["codes"]), games[3]["score"], games[3]["fen"]), (2, 1.0, START_FEN))
+        self.assertEqual(PGN.formatGame([], games[0]["codes"], games[0]["score"]),
+                         '[Result "0-1"]\n\n1. e3 b5 2. Bxb5 c6 3. Bxc6 Nxc6 4. e4 e5 0-1\n\n')
+        self.assertEqual((len(games[1]["codes"]), games[1]["score"]), (2, None))
+        self.assertRaises(PGN.PGNError, list, PGN.readGames(StringIO(text)))
+
+    def testBadTag(self):
+        text = """[Event "Broken]
+[Result "1-0"]
+
+1. e3 b5 1-0
+
+[Event "Fine"]
+[Result "0-1"]
+
+1. e3 b5 0-1
+"""
+        games = list(PGN.readGames(StringIO(text), skipErrors=True))
+        self.assertEqual([(game["tags"][0], game["score"]) for game in games], [(("Event", "Fine"), 0.0)])
+        self.assertEqual(len(list(PGN.readGames(StringIO(text), workers=2, skipErrors=True))), 1)
+        self.assertRaises(PGN.PGNError, list, PGN.readGames(StringIO(text)))
+
+    def testFlaglessMoves(self):
+        # Moves as kept by Archive, without the capture and en passant flags
+        movetext = "1. e3 b5 2. Bxb5 c6 3. Bxc6 Nxc6 4. e4 e5 5. Qh5 Nb4 6. Qxf7 Nxa2 7. Rxa2 Kxf7"
+        game = PGN.parseRecord(([], movetext))
+        codes = [code & Move.MOVE_MASK for code in game["codes"]]
+        self.assertEqual(PGN.formatGame([], codes, None), '[Result "*"]\n\n%s *\n\n' % movetext)
+        fen = "8/8/8/8/1Pp5/8/8/8 b - b3 0 7"
+        code = Move.pack(Move.SQUARES["c4"], Move.SQUARES["b3"])
+        self.assertEqual(PGN.formatGame([], [code], None, fen).split("\n")[-3], "7... cxb3 *")
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from antichess.Board import Board
+from antichess.Player import AIPlayer
+from antichess.Rules import Suicide
+
+class QuiescenceTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board()
+        self.rules = Suicide()
+
+    def search(self, fen, quiescenceNodes, depth=0):
+        self.board.setFEN(fen)
+        colour = self.board.sideToMove
+        ai = AIPlayer(colour, quiet=True, hashMB=1, quiescenceNodes=quiescenceNodes)
+        ai.stats.newSearch()
+        score = ai.alphabeta(self.board, depth, -ai.INFINITY, ai.INFINITY, colour)
+        return score, ai
+
+    def testForcedCapture(self):
+        # White must take the rook, leaving Black with no pieces: a loss for White
+        fen = "r7/8/8/8/8/8/8/R7 w - - 0 1"
+        score, ai = self.search(fen, 0)
+        self.assertEqual(score, -3)
+        score, ai = self.search(fen, 32)
+        self.assertEqual(score, -ai.INFINITY)
+        self.assertEqual(ai.stats.qnodes, 1)
+
+    def testBudget(self):
+        # Captures everywhere, for both sides
+        fen = "rnbqkbnr/8/pppppppp/PPPPPPPP/8/8/8/RNBQKBNR b - - 0 1"
+        for budget in [1, 10, 100]:
+            score, ai = self.search(fen, budget)
+            self.assertTrue(1 <= ai.stats.qnodes <= budget)
+        self.assertTrue(ai.stats.qnodes > 10)
+        # The score doesn't depend on the window
+        full, ai = self.search(fen, 100, depth=1)
+        best = -ai.INFINITY
+        for move in self.rules.getAllValidCodes(self.board, 1):
+            self.board.makeMove(move)
+            best = max(best, -ai.alphabeta(self.board, 0, -ai.INFINITY, -best, 0))
+            self.board.retractMove()
+        self.assertEqual(best, full)
+        self.assertEqual(self.board.getFEN(), fen)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import os
+import random
+import shutil
+import tempfile
+from antichess import Sliders
+from antichess import Bitboard
+
+class SlidersTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.dir, "sliders.marshal")
+        # Any cache written while testing goes in the temporary directory
+        self.saved = Sliders.CACHE_FILE, Sliders.ROOK_TABLE, Sliders.BISHOP_TABLE
+        Sliders.CACHE_FILE = self.cache
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+        # Back to the tables as they were, without writing a cache
+        Sliders.CACHE_FILE, Sliders.ROOK_TABLE, Sliders.BISHOP_TABLE = self.saved
+
+    def testMatchesRayWalking(self):
+        rng = random.Random(3)
+        for i in range(300):
+            occupied = rng.getrandbits(64) & rng.getrandbits(64)
+            sq = rng.randrange(64)
+            self.assertEqual(Sliders.rookAttacks(sq, occupied), Sliders.rayAttacks(sq, occupied, [0, 1, 2, 3]))
+            self.assertEqual(Sliders.bishopAttacks(sq, occupied), Sliders.rayAttacks(sq, occupied, [4, 5, 6, 7]))
+            self.assertEqual(Sliders.queenAttacks(sq, occupied), Sliders.rayAttacks(sq, occupied, range(8)))
+
+    def testEmptyBoard(self):
+        # Rook on a8 sees its rank and file, bishop on d4 its two diagonals
+        self.assertEqual(Bitboard.popcount(Sliders.rookAttacks(0, 0)), 14)
+        self.assertEqual(Bitboard.popcount(Sliders.bishopAttacks(35, 0)), 13)
+        self.assertEqual(Sliders.rookAttacks(0, Bitboard.BIT[1]) & 0xff, Bitboard.BIT[1])
+
+    def testCache(self):
+        Sliders.load(self.cache)
+        self.assertTrue(os.path.exists(self.cache))
+        tables = Sliders.ROOK_TABLE, Sliders.BISHOP_TABLE
+        Sliders.ROOK_TABLE = Sliders.BISHOP_TABLE = None
+        Sliders.load(self.cache)
+        self.assertEqual((Sliders.ROOK_TABLE, Sliders.BISHOP_TABLE), tables)
+        # A damaged cache is rebuilt
+        f = open(self.cache, "wb")
+        f.write("junk")
+        f.close()
+        Sliders.load(self.cache)
+        self.assertEqual((Sliders.ROOK_TABLE, Sliders.BISHOP_TABLE), tables)
+        self.assertEqual(Sliders.readCache(self.cache), tables)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+import os
+import tempfile
+from antichess import Stats
+from antichess.Board import Board
+from antichess.Player import AIPlayer
+
+class SearchStatsTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.filename = tempfile.mkstemp()
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.filename)
+
+    def testRecord(self):
+        board = Board()
+        ai = AIPlayer(0, maxDepth=3, quiet=True, hashMB=1, statsFile=self.filename)
+        move = ai.getMove(board, 1e9)
+        record = ai.lastRecord
+        self.assertEqual(record["move"], str(move))
+        self.assertEqual(record["nodes"], ai.nodes)
+        self.assertEqual([it["depth"] for it in record["iterations"]], [0, 1, 2])
+        self.assertEqual(sum([it["nodes"] for it in record["iterations"]]), ai.nodes)
+        self.assertTrue(0 < record["firstMoveCutoffs"] <= record["cutoffs"])
+        self.assertTrue(record["ttHits"] <= record["ttProbes"])
+        self.assertEqual(record["branching"], record["iterations"][2]["nodes"] / float(record["iterations"][1]["nodes"]))
+        # One JSON line per move
+        board.makeMove(move)
+        ai.colour = 1
+        ai.getMove(board, 1e9)
+        records = Stats.readRecords(self.filename)
+        self.assertEqual(len(records), 2)
+        self.assertEqual(records[0]["move"], str(move))
+        self.assertEqual(records[1]["fen"], board.getFEN())
+        self.assertTrue(len(Stats.summary(records[1]))>0)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,128 @@
+import unittest
+import random
+import shutil
+import tempfile
+from antichess import Pieces
+from antichess import Tablebase
+from antichess.Board import Board
+from antichess.Player import AIPlayer
+from antichess.Rules import Suicide
+
+class TablebaseTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.dir = tempfile.mkdtemp()
+        generator = Tablebase.Generator(cls.dir)
+        # PvK needs the tables for every promotion
+        for name in ["KvK", "NvB", "QvK", "RvK", "BvK", "NvK", "PvK"]:
+            generator.generate(name)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.dir)
+
+    def setUp(self):
+        self.board = Board()
+        self.rules = Suicide()
+        self.tablebases = Tablebase.Tablebases(self.dir)
+
+    def tearDown(self):
+        self.tablebases.close()
+
+    def canWin(self, colour, plies):
+        # Whether colour, to move, can reach a won position (no pieces or no
+        # moves) within plies
+        board = self.board
+        moves = self.rules.getAllValidCodes(board, colour)
+        if len(moves)==0:
+            return True
+        if plies < 2:
+            return False
+        for move in moves:
+            board.makeMove(move)
+            replies = self.rules.getAllValidCodes(board, 1-colour)
+            won = len(replies) > 0
+            for reply in replies:
+                board.makeMove(reply)
+                won = self.canWin(colour, plies-2)
+                board.retractMove()
+                if not won:
+                    break
+            board.retractMove()
+            if won:
+                return True
+        return False
+
+    def setUpPosition(self, name, squares, colour):
+        self.board.setFEN("8/8/8/8/8/8/8/8 %s - - 0 1" % "wb"[colour])
+        for (pieceColour, kind), sq in zip(Tablebase.parseSignature(name), squares):
+            self.board.placePiece(sq, Pieces.PIECES[pieceColour][kind])
+
+    def testSignatures(self):
+        self.assertEqual(Tablebase.signatureName(Tablebase.parseSignature("kqvpp")), "KQvPP")
+        self.assertRaises(Tablebase.TablebaseError, Tablebase.parseSignature, "KK")
+        names = Tablebase.allSignatures(3)
+        self.assertEqual(len(names), 36 + 2*6*21)
+        self.assertTrue(names.index("PvK") > names.index("QvK"))
+        self.assertTrue(names.index("RRvK") > names.index("RvK"))
+
+    def testProbeMatchesSearch(self):
+        rng = random.Random(5)
+        checked = 0
+        while checked < 40:
+            name = rng.choice(["NvK", "RvK", "PvK", "NvB"])
+            colour = rng.randrange(2)
+            self.setUpPosition(name, rng.sample(range(8, 56), 2), colour)
+            result, distance = self.tablebases.probe(self.board)
+            if result==Tablebase.WIN and distance <= 6:
+                self.assertTrue(self.canWin(colour, distance))
+                self.assertFalse(self.canWin(colour, distance-2))
+            elif result==Tablebase.LOSS and distance <= 7:
+                for move in self.rules.getAllValidCodes(self.board, colour):
+                    self.board.makeMove(move)
+                    self.assertTrue(self.canWin(1-colour, distance-1))
+                    self.board.retractMove()
+            elif result==Tablebase.DRAW:
+                self.assertFalse(self.canWin(colour, 6))
+            else:
+                continue
+            checked += 1
+
+    def testCaptures(self):
+        # Black must take the knight, leaving White with no pieces: a win for White
+        self.setUpPosition("NvK", [36, 27], 1)
+        moves = self.rules.getAllValidCodes(self.board, 1)
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(self.tablebases.probe(self.board), (Tablebase.LOSS, 1))
+        self.board.makeMove(moves[0])
+        self.assertEqual(self.tablebases.probe(self.board), (Tablebase.WIN, 0))
+        # Probing for the other side than the board's side to move
+        self.board.retractMove()
+        self.board.sideToMove = 0
+        self.assertEqual(self.tablebases.probe(self.board, 1), (Tablebase.LOSS, 1))
+        self.assertEqual(self.tablebases.probe(self.board), self.tablebases.probe(self.board, 0))
+        self.assertNotEqual(self.tablebases.probe(self.board, 0), (Tablebase.LOSS, 1))
+
+    def testCoverage(self):
+        self.assertEqual(self.tablebases.maxPieces, 2)
+        self.board.setFEN("8/8/8/8/8/8/8/RN5k w - - 0 1")
+        self.assertEqual(self.tablebases.probe(self.board), None)
+        # No table for this signature
+        self.board.setFEN("8/8/8/8/8/8/8/Q6q w - - 0 1")
+        self.assertEqual(self.tablebases.probe(self.board), None)
+        # En passant might be possible
+        self.board.setFEN("8/8/8/8/3Pp3/8/8/8 b - d3 0 1")
+        self.assertEqual(self.tablebases.probe(self.board), None)
+
+    def testSearch(self):
+        self.setUpPosition("RvK", [0, 63], 0)
+        expected = self.tablebases.probe(self.board)
+        ai = AIPlayer(0, quiet=True, hashMB=1, tablebaseDir=self.dir)
+        ai.stats.newSearch()
+        score = ai.alphabeta(self.board, 3, -ai.INFINITY, ai.INFINITY, 0)
+        self.assertEqual(score, ai.tablebaseScore(expected))
+        self.assertTrue(ai.stats.tbHits > 0)
+
+if __name__=="__main__":
+    unittest.main()
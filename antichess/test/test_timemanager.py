@@ -0,0 +1,67 @@
+import unittest
+import time
+from antichess import TimeManager
+from antichess.Board import Board
+from antichess.Player import AIPlayer
+from antichess.Rules import Suicide
+
+class TimeManagerTest(unittest.TestCase):
+
+    def testAllocate(self):
+        self.assertAlmostEqual(TimeManager.allocate(60.0, 1.0, movesToGo=30), 3.0)
+        # Never more than half of what is left
+        self.assertAlmostEqual(TimeManager.allocate(2.0, 5.0), 1.0)
+        self.assertEqual(TimeManager.allocate(0.0, 0.0), 0.0)
+
+    def testPrediction(self):
+        timer = TimeManager.TimeManager()
+        timer.start(10.0)
+        self.assertTrue(timer.canStartIteration())
+        timer.iterationDone(0.5)
+        self.assertAlmostEqual(timer.predictNextIteration(), 0.5 * TimeManager.DEFAULT_BRANCHING)
+        timer.iterationDone(1.5)
+        self.assertAlmostEqual(timer.predictNextIteration(), 4.5)
+        self.assertTrue(timer.canStartIteration())
+        timer.iterationDone(4.5)
+        # 13.5s more won't fit in 10s
+        self.assertFalse(timer.canStartIteration())
+        timer.start(0.0)
+        time.sleep(0.01)
+        self.assertTrue(timer.expired())
+        self.assertTrue(timer.aborted)
+
+    def testNoisyTimes(self):
+        timer = TimeManager.TimeManager()
+        timer.start(20.0)
+        # Odd iterations grow by 8 and even ones by 1.5: the growth over two plies is used
+        for seconds in [0.05, 0.4, 0.6, 4.8]:
+            timer.iterationDone(seconds)
+        self.assertAlmostEqual(timer.predictNextIteration(), 4.8 * (4.8 / 0.4) ** 0.5)
+        self.assertTrue(timer.canStartIteration())
+        # Iterations too quick to time are left out
+        timer.start(1.0)
+        for seconds in [0.001, 0.009, 0.002, 0.03]:
+            timer.iterationDone(seconds)
+        self.assertAlmostEqual(timer.predictNextIteration(), 0.03 * TimeManager.DEFAULT_BRANCHING)
+        timer.iterationDone(0.031)
+        self.assertAlmostEqual(timer.predictNextIteration(), 0.031 * TimeManager.MIN_BRANCHING)
+        timer.iterationDone(2.0)
+        self.assertAlmostEqual(timer.predictNextIteration(), 2.0 * TimeManager.MAX_BRANCHING)
+
+    def testAbortedIterationDropped(self):
+        board = Board()
+        ai = AIPlayer(0, maxDepth=20, quiet=True, hashMB=1)
+        # Start every iteration, so the deadline falls in the middle of one
+        ai.timer.canStartIteration = lambda: True
+        startTime = time.time()
+        move = ai.getMove(board, 0.3)
+        self.assertTrue(time.time() - startTime < 1.0)
+        self.assertTrue(ai.timer.aborted)
+        self.assertTrue(str(move) in map(str, Suicide().getAllValidMoves(board, 0)[0]))
+        # Only completed iterations are recorded, and the unfinished one is not among them
+        depths = [it["depth"] for it in ai.lastRecord["iterations"]]
+        self.assertEqual(depths, range(len(depths)))
+        self.assertTrue(len(depths) < 20)
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+from antichess import Tournament
+from antichess import Book
+from antichess import PGN
+from antichess.Board import Board
+from antichess.Player import AIPlayer, RandomPlayer
+
+class TournamentTest(unittest.TestCase):
+
+    def testSpecs(self):
+        self.assertEqual(Tournament.parseSpec("random"), ("random", {}))
+        self.assertEqual(Tournament.parseSpec("ai:depth=2,time=0.1"), ("ai", {"depth": "2", "time": "0.1"}))
+        self.assertRaises(Tournament.TournamentError, Tournament.parseSpec, "ai:speed=2")
+        self.assertRaises(Tournament.TournamentError, Tournament.parseSpec, "random:depth=2")
+        self.assertRaises(Tournament.TournamentError, Tournament.parseSpec, "human")
+        player, maxTime = Tournament.makePlayer("ai:depth=2,time=0.1,q=0", 1)
+        self.assertTrue(isinstance(player, AIPlayer))
+        self.assertEqual((player.colour, player.maxDepth, player.quiescenceNodes, maxTime), (1, 2, 0, 0.1))
+        player, maxTime = Tournament.makePlayer("random", 0)
+        self.assertTrue(isinstance(player, RandomPlayer))
+
+    def testElo(self):
+        self.assertAlmostEqual(Tournament.expectedScore(0), 0.5)
+        self.assertAlmostEqual(Tournament.eloDifference(Tournament.expectedScore(150)), 150)
+        self.assertAlmostEqual(Tournament.eloDifference(0.75), 190.85, places=2)
+        elo, low, high = Tournament.eloInterval([1, 0.5, 1, 0, 1, 1])
+        self.assertTrue(low < elo < high)
+        # Wins favour the stronger hypothesis, losses the weaker
+        self.assertTrue(Tournament.sprtLLR([1, 1, 0.5, 1, 0], 0, 50) > 0)
+        self.assertTrue(Tournament.sprtLLR([0, 0, 0.5, 0, 1], 0, 50) < 0)
+        lower, upper = Tournament.sprtBounds()
+        self.assertAlmostEqual(lower, -upper)
+
+    def testRun(self):
+        results = list(Tournament.runTournament(["ai:depth=1,time=0.1,q=0", "random"], 4, maxPlies=60, seed=1))
+        self.assertEqual([r["number"] for r in results], [0, 1, 2, 3])
+        self.assertEqual([r["white"] for r in results], ["ai:depth=1,time=0.1,q=0", "random"] * 2)
+        # Each pair of games starts from the same opening
+        openings = Tournament.makeOpenings(4, 4, 1)
+        for r in results:
+            self.assertEqual(r["moves"][:len(openings[r["number"]//2])], openings[r["number"]//2])
+            self.assertTrue(r["score"] in [0, 0.5, 1])
+            self.assertTrue(len(r["moves"]) <= 60 + len(openings[r["number"]//2]))
+            # The moves replay
+            codes, score = Book.parseGame(Book.formatGame(r["moves"], r["score"]))
+            board = Board()
+            for code in codes:
+                board.makeMove(code)
+        pgn = PGN.formatGame([("Round", 1)], results[0]["moves"], results[0]["score"])
+        self.assertTrue(pgn.startswith('[Round "1"]\n[Result "%s"]\n\n1. ' % Book.resultText(results[0]["score"])))
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import multiprocessing
+from antichess import Transposition
+from antichess.Transposition import TranspositionTable, EXACT, LOWER, UPPER
+from antichess.Move import Move
+
+def storeFromChild(tt, key):
+    tt.store(key, 4, 77, EXACT, 99)
+
+class TranspositionTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tt = TranspositionTable(1)
+
+    def testStoreAndProbe(self):
+        key = 0x123456789abcdef0
+        self.assertEqual(self.tt.probe(key), None)
+        self.tt.store(key, 3, -42, EXACT, 1234)
+        self.assertEqual(self.tt.probe(key), (3, -42, EXACT, 1234))
+        # Same bucket, different position
+        self.assertEqual(self.tt.probe(key ^ (1 << 40)), None)
+
+    def testReplacement(self):
+        key = 0x1000000000000005
+        other = key ^ (7 << 50)
+        self.tt.store(key, 5, 10, LOWER, 1)
+        # Shallower result for another position goes to the always-replace slot
+        self.tt.store(other, 2, 20, UPPER, 2)
+        self.assertEqual(self.tt.probe(key), (5, 10, LOWER, 1))
+        self.assertEqual(self.tt.probe(other), (2, 20, UPPER, 2))
+        # A deeper result takes over the depth-preferred slot
+        third = key ^ (9 << 50)
+        self.tt.store(third, 6, 30, EXACT, 3)
+        self.assertEqual(self.tt.probe(third), (6, 30, EXACT, 3))
+        self.assertEqual(self.tt.probe(key), None)
+        # Entries from an earlier search can always be replaced
+        self.tt.newSearch()
+        self.tt.store(key, 1, 40, EXACT, 4)
+        self.assertEqual(self.tt.probe(key), (1, 40, EXACT, 4))
+
+    def testPackMove(self):
+        self.assertEqual(Transposition.packMove(Move.fromNotation("e2e4", 0)), 52 | (36 << 6))
+        promotion = Transposition.packMove(Move.fromNotation("a7a8K", 0))
+        self.assertEqual(promotion >> 12, 5)
+
+    def testSharedTable(self):
+        tt = TranspositionTable(1, shared=True)
+        key = 0x0fedcba987654321
+        child = multiprocessing.Process(target=storeFromChild, args=(tt, key))
+        child.start()
+        child.join()
+        self.assertEqual(tt.probe(key), (4, 77, EXACT, 99))
+        tt.clear()
+        self.assertEqual(tt.probe(key), None)
+
+    def testTornEntryRejected(self):
+        key = 0x0fedcba987654321
+        self.tt.store(key, 4, 77, EXACT, 99)
+        i = (key & self.tt.mask) * 2
+        # As if another process had written only the score
+        self.tt.scores[i] = 12
+        self.assertEqual(self.tt.probe(key), None)
+
+if __name__=="__main__":
+    unittest.main()
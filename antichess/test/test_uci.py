@@ -0,0 +1,60 @@
+import unittest
+from StringIO import StringIO
+from antichess import PGN
+from antichess import UCI
+from antichess import TimeManager
+from antichess.Board import Board
+from antichess.Move import Move
+from antichess.Player import AIPlayer
+from antichess.Rules import Suicide
+
+class UCITest(unittest.TestCase):
+
+    def engine(self, commands):
+        output = StringIO()
+        UCI.UCIEngine(StringIO("\n".join(commands) + "\n"), output, hashMB=1).run()
+        return output.getvalue().splitlines()
+
+    def testParseGo(self):
+        self.assertEqual(UCI.parseGo(["depth", "4"], 0), (UCI.NO_TIME_LIMIT, 4, False))
+        self.assertEqual(UCI.parseGo(["movetime", "1500", "depth", "2"], 1), (1.5, 2, False))
+        self.assertEqual(UCI.parseGo(["wtime", "60000", "btime", "30000", "binc", "1000"], 1),
+                         (TimeManager.allocate(30.0, 1.0), UCI.MAX_DEPTH, False))
+        self.assertEqual(UCI.parseGo(["wtime", "60000", "movestogo", "10"], 0), (TimeManager.allocate(60.0, 0.0, 10), UCI.MAX_DEPTH, False))
+        self.assertEqual(UCI.parseGo(["infinite"], 0), (UCI.NO_TIME_LIMIT, UCI.MAX_DEPTH, True))
+        # Nothing which limits the side to move's search
+        self.assertEqual(UCI.parseGo([], 0), (UCI.DEFAULT_TIME, UCI.MAX_DEPTH, False))
+        self.assertEqual(UCI.parseGo(["btime", "60000"], 0), (UCI.DEFAULT_TIME, UCI.MAX_DEPTH, False))
+        self.assertEqual(UCI.parseGo(["winc", "1000", "movestogo", "5"], 0), (UCI.DEFAULT_TIME, UCI.MAX_DEPTH, False))
+        self.assertEqual(UCI.parseGo(["depth", "3", "wtime", "60000"], 0), (TimeManager.allocate(60.0, 0.0), 3, False))
+        self.assertRaises(UCI.UCIError, UCI.parseGo, ["depth", "x"], 0)
+        self.assertEqual(UCI.scoreText(2), "cp 200")
+        self.assertEqual(UCI.scoreText(-AIPlayer.INFINITY), "cp -%d" % UCI.WIN_CP)
+
+    def testSearch(self):
+        lines = self.engine(["uci", "isready", "position startpos moves e2e3 d7d5", "go depth 3"])
+        self.assertTrue("uciok" in lines and "readyok" in lines)
+        info = [line.split() for line in lines if line.startswith("info depth")]
+        self.assertEqual([int(words[2]) for words in info], [1, 2, 3])
+        self.assertEqual(lines[-1].split()[:1], ["bestmove"])
+        board = Board()
+        for move in ["e2e3", "d7d5"]:
+            board.makeMove(PGN.fromSAN(board, move))
+        legal = [str(Move.fromCode(code)) for code in Suicide().getAllValidCodes(board, 0)]
+        self.assertTrue(lines[-1].split()[1] in legal)
+        # Promotions in lower case, and errors reported without stopping
+        lines = self.engine(["position startpos moves e2e5", "position fen 7k/P7/8/8/8/8/8/8 w - - 0 1",
+                             "go depth 1 movetime 5000"])
+        self.assertTrue(lines[0].startswith("info string Error"))
+        self.assertTrue(lines[-1] in ["bestmove a7a8%s" % p for p in "qrnbk"])
+
+    def testStop(self):
+        # An infinite search only ends with stop, which interrupts it
+        lines = self.engine(["position startpos", "go infinite", "isready", "stop", "isready"])
+        self.assertEqual(lines.count("readyok"), 2)
+        self.assertEqual(lines[-1], "readyok")
+        self.assertEqual(len([line for line in lines if line.startswith("bestmove")]), 1)
+        self.assertTrue(lines[-2].startswith("bestmove"))
+
+if __name__=="__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+import unittest
+import random
+from antichess.Board import Board, HashError
+from antichess import Pieces
+from antichess import Zobrist
+from antichess.Rules import Suicide
+from antichess.Move import Move, PASS
+from antichess.test.test_bitboards import setStartPosition
+
+class ZobristTest(unittest.TestCase):
+
+    def setUp(self):
+        self.board = Board(verifyHash=True)
+        self.rules = Suicide()
+        setStartPosition(self.board)
+
+    def testTransposition(self):
+        start = self.board.hash
+        for m in ["g1f3", "g8f6", "b1c3", "b8c6"]:
+            self.board.makeMove(Move.fromNotation(m, 0))
+        h = self.board.hash
+        for i in range(4):
+            self.board.retractMove()
+        self.assertEqual(self.board.hash, start)
+        for m in ["b1c3", "b8c6", "g1f3", "g8f6"]:
+            self.board.makeMove(Move.fromNotation(m, 0))
+        self.assertEqual(self.board.hash, h)
+
+    def testSideToMove(self):
+        start = self.board.hash
+        self.board.makeMove(Move.fromNotation("g1f3", 0))
+        self.assertEqual(self.board.sideToMove, 1)
+        self.board.sideToMove = 0
+        self.assertEqual(Zobrist.computeHash(self.board), self.board.hash ^ Zobrist.SIDE)
+        self.board.sideToMove = 1
+        for m in ["g8f6", "f3g1", "f6g8"]:
+            self.board.makeMove(Move.fromNotation(m, 0))
+        self.assertEqual(self.board.hash, start)
+
+    def testPass(self):
+        start = self.board.hash
+        self.board.makeMove(Move.fromNotation("e2e4", 0))
+        pushed = self.board.hash
+        # A pass hands over the move and ends the chance of en passant
+        self.board.makeMove(PASS)
+        self.assertEqual(self.board.sideToMove, 0)
+        self.assertEqual(self.board.hash, pushed ^ Zobrist.SIDE ^ Zobrist.ENPASSANT[4])
+        self.assertEqual(self.board.getFEN().split()[1:4], ["w", "-", "-"])
+        self.board.retractMove()
+        self.assertEqual((self.board.hash, self.board.sideToMove), (pushed, 1))
+        self.board.retractMove()
+        self.board.makeMove(PASS)
+        self.assertEqual(self.board.getFEN().split()[1], "b")
+        self.assertEqual(self.board.hash, start ^ Zobrist.SIDE)
+        self.board.retractMove()
+        self.assertEqual((self.board.hash, self.board.sideToMove), (start, 0))
+
+    def testEnPassantFile(self):
+        self.board.clear()
+        self.board.setPiece("a5", Pieces.Pawn(0))
+        self.board.setPiece("b7", Pieces.Pawn(1))
+        self.board.setPiece("c7", Pieces.Pawn(1))
+        before = self.board.hash
+        self.board.makeMove(Move.fromNotation("b7b5", 1))
+        doublePush = self.board.hash
+        self.board.retractMove()
+        self.assertEqual(self.board.hash, before)
+        self.board.makeMove(Move.fromNotation("b7b6", 1))
+        self.board.makeMove(Move.fromNotation("b6b5", 1))
+        # Same pieces, but no en passant possible and one more move made
+        self.assertEqual(self.board.hash, doublePush ^ Zobrist.ENPASSANT[1] ^ Zobrist.SIDE)
+        self.board.makeMove(Move.fromNotation("a5b6", 0))
+        self.board.retractMove()
+        self.board.retractMove()
+        self.board.retractMove()
+        self.board.makeMove(Move.fromNotation("b7b5", 1))
+        self.board.makeMove(Move.fromNotation("a5b6", 0))
+        self.assertEqual(self.board.getNumPieces(1), 1)
+
+    def testVerificationDetectsCorruption(self):
+        self.board.hash ^= 1
+        self.assertRaises(HashError, self.board.makeMove, Move.fromNotation("e2e3", 0))
+
+    def testRandomGames(self):
+        rng = random.Random(7)
+        for game in range(3):
+            setStartPosition(self.board)
+            start = self.board.hash
+            colour = 0
+            made = 0
+            for ply in range(80):
+                moves, _ = self.rules.getAllValidMoves(self.board, colour)
+                if len(moves)==0:
+                    break
+                # makeMove and retractMove check the hash themselves
+                self.board.makeMove(rng.choice(moves))
+                made += 1
+                colour = 1-colour
+            for i in range(made):
+                self.board.retractMove()
+            self.assertEqual(self.board.hash, start)
+
+if __name__=="__main__":
+    unittest.main()